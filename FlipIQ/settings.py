@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import json
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'FlipIQ_APP.middleware.AdmissionControlMiddleware',
+    'FlipIQ_APP.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +84,56 @@ DATABASES = {
     }
 }
 
+# Set FLIPIQ_DB_PROFILE=production when serving real classes. It switches SQLite
+# to WAL (readers no longer block the writer), waits on a busy database instead
+# of failing with "database is locked", keeps connections open between requests
+# and sends the polling views to a separate read-only connection
+# (FlipIQ_APP/routers.py). `manage.py bench_sqlite` compares the two profiles.
+FLIPIQ_DB_PROFILE = os.environ.get('FLIPIQ_DB_PROFILE', 'development')
+FLIPIQ_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable at checkpoints; safe from corruption in WAL mode
+    'busy_timeout': 5000,     # ms
+    'cache_size': -65536,     # KiB (64 MB)
+    'mmap_size': 268435456,   # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+if FLIPIQ_DB_PROFILE == 'production':
+    _init_command = ';'.join(f'PRAGMA {k}={v}' for k, v in FLIPIQ_SQLITE_PRAGMAS.items())
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        # Take the write lock when a transaction starts, so two writers never
+        # deadlock upgrading from a read lock (which busy_timeout can't resolve).
+        'OPTIONS': {'init_command': _init_command, 'transaction_mode': 'IMMEDIATE'},
+    })
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': {'init_command': _init_command + ';PRAGMA query_only=ON'},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['FlipIQ_APP.routers.ReadReplicaRouter']
+
+# One database per school (FlipIQ_APP/tenancy.py). tenants.json maps a school
+# slug to its SQLite file and host names, e.g.
+#   {"lincoln": {"db": "tenants/lincoln.sqlite3", "hosts": ["lincoln.flipiq.app"]}}
+# and is maintained by `manage.py tenants`. Schools not listed use 'default'.
+FLIPIQ_TENANTS_FILE = Path(os.environ.get('FLIPIQ_TENANTS_FILE', BASE_DIR / 'tenants.json'))
+FLIPIQ_TENANTS = json.loads(FLIPIQ_TENANTS_FILE.read_text()) if FLIPIQ_TENANTS_FILE.exists() else {}
+# Host serving the 'default' database, for links from other schools' home pages.
+FLIPIQ_MAIN_HOST = os.environ.get('FLIPIQ_MAIN_HOST', '')
+if FLIPIQ_TENANTS:
+    if DEBUG and not ALLOWED_HOSTS:
+        # Django only falls back to these while ALLOWED_HOSTS is empty; keep them for local development.
+        ALLOWED_HOSTS = ['.localhost', '127.0.0.1', '[::1]']
+    for _school, _tenant in FLIPIQ_TENANTS.items():
+        DATABASES[f'school_{_school}'] = {**DATABASES['default'], 'NAME': BASE_DIR / _tenant['db']}
+        ALLOWED_HOSTS += _tenant.get('hosts', [])
+    DATABASE_ROUTERS = ['FlipIQ_APP.routers.TenantRouter', *globals().get('DATABASE_ROUTERS', [])]
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'),
+                      'FlipIQ_APP.tenancy.TenantMiddleware')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -116,6 +170,19 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+if not DEBUG:
+    # `manage.py collectstatic` fingerprints assets and writes .gz/.br copies;
+    # they're served with far-future immutable caching (FlipIQ_APP/compression.py).
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'FlipIQ_APP.storage.CompressedManifestStaticFilesStorage'},
+    }
+    MIDDLEWARE.insert(0, 'FlipIQ_APP.compression.PrecompressedStaticMiddleware')
+
+# Dynamic HTML/JSON responses smaller than this go out uncompressed.
+FLIPIQ_COMPRESS_MIN_BYTES = 1024
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -124,3 +191,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
+
+
+# Live-session state (FlipIQ_APP/live_state.py): the cache alias holding presence,
+# catalog versions and other short-lived state. With several workers it must be a
+# shared backend, or they serve stale home pages; `manage.py check --deploy` errors
+# on a per-process one. For example:
+#   CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#                         'LOCATION': 'redis://127.0.0.1:6379'}}
+FLIPIQ_LIVE_STATE_CACHE = 'default'
+# Seconds since a student's last heartbeat before they show as idle, then offline (presence.py).
+FLIPIQ_PRESENCE_ONLINE_SECONDS = 10
+FLIPIQ_PRESENCE_IDLE_SECONDS = 60
+
+
+# Admission control (FlipIQ_APP/middleware.py)
+# Requests in flight per worker before new ones get a 429; 0 disables the cap.
+FLIPIQ_MAX_CONCURRENT_REQUESTS = 64
+# 'local' keeps token buckets per worker, 'cache' shares counters through FLIPIQ_LIVE_STATE_CACHE.
+FLIPIQ_RATE_LIMIT_BACKEND = 'local'
+# Per-endpoint overrides, e.g. {'submit_answer': {'user': (4, 10), 'room': (500, 2000)}}
+FLIPIQ_RATE_LIMITS = {}
+
+# Answer analytics (FlipIQ_APP/analytics.py): seconds between background writes
+# of each served process's buffered answer counts.
+FLIPIQ_ANALYTICS_FLUSH_INTERVAL = 5
+
+# Most public decks held in the in-memory typeahead index (FlipIQ_APP/search_index.py).
+FLIPIQ_TYPEAHEAD_MAX_DECKS = 50_000
+
+# Seconds a worker trusts its in-memory leaderboard before reloading it
+# from the database (FlipIQ_APP/leaderboard.py); picks up other workers' answers.
+FLIPIQ_LEADERBOARD_MAX_AGE = 5
+
+# Auditorium sessions (FlipIQ_APP/auditorium.py): joins buffered per worker are
+# bulk-inserted once this many are pending or this many seconds have passed;
+# served processes also flush on that interval from a background thread.
+FLIPIQ_JOIN_FLUSH_EVERY = 200
+FLIPIQ_JOIN_FLUSH_INTERVAL = 1
+# Participants per roster page for hosts and the waiting room.
+FLIPIQ_ROSTER_PAGE_SIZE = 100
+
+# Home page deck grid (FlipIQ_APP/catalog.py): decks per page, the cache alias
+# holding rendered pages, and how long a page may live without a catalog change.
+FLIPIQ_HOME_PAGE_SIZE = 24
+FLIPIQ_HOME_CACHE = 'default'
+FLIPIQ_HOME_CACHE_TIMEOUT = 300
+
+# Session latency trace (FlipIQ_APP/trace.py): events held per worker before
+# the oldest are dropped, and seconds between flushes to SessionTraceEvent.
+FLIPIQ_TRACE_BUFFER = 20_000
+FLIPIQ_TRACE_FLUSH_INTERVAL = 2
+
+# Set FLIPIQ_WARMUP=1 to have the serving process compile templates and load
+# live sessions' caches before serving (FlipIQ_APP/warmup.py); with a preloading
+# server the workers inherit them.
+FLIPIQ_WARMUP = os.environ.get('FLIPIQ_WARMUP', '') not in ('', '0')
+# Most active sessions whose leaderboards a worker loads while warming up.
+FLIPIQ_WARMUP_MAX_SESSIONS = 200
+
+# The app's own log lines (e.g. warm-up timings) go to the console.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'FlipIQ_APP': {'handlers': ['console'], 'level': 'INFO'}},
+}
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FlipIQ.settings')
 
 application = get_wsgi_application()
+
+# Warm up before taking requests when FLIPIQ_WARMUP is set, and start the
+# background flushers on each process's first request (FlipIQ_APP/warmup.py).
+from FlipIQ_APP import warmup  # noqa: E402
+
+warmup.serve()
@@ -0,0 +1,95 @@
+"""
+Per-user activity feed behind the profile page.
+
+Each played submission and each created deck has an ``ActivityEntry`` row
+carrying the deck title, owner and card count it needs for display, so a
+page of the feed is one indexed query no matter how long the history is.
+Rows are written as things happen: ``signals.py`` handles submissions (a
+played row's score is updated when the game finishes) and deck saves, and views that add or remove cards call :func:`cards_changed`
+(``bulk_create`` and queryset deletes don't send signals).
+"""
+from django.db.models import Count, Q
+
+from .models import ActivityEntry, Deck
+
+PAGE_SIZE = 12
+
+
+def deck_created(deck):
+    ActivityEntry.objects.create(
+        user_id=deck.owner_id, kind=ActivityEntry.KIND_CREATED, deck=deck,
+        deck_title=deck.title, deck_owner=deck.owner.username,
+        card_count=0, happened_at=deck.created_at,
+    )
+
+
+def deck_changed(deck):
+    """Copy a renamed deck's title onto every feed row that shows it."""
+    ActivityEntry.objects.filter(deck=deck).exclude(deck_title=deck.title).update(deck_title=deck.title)
+
+
+def cards_changed(deck, count=None):
+    """
+    Refresh the card count shown for ``deck`` and the clones reading its
+    cards; counts its cards unless ``count`` is known.
+    """
+    if count is None:
+        count = deck.get_cards().count()
+    ActivityEntry.objects.filter(Q(deck=deck) | Q(deck__shared_from=deck)).update(card_count=count)
+
+
+def _display_copy(deck_id):
+    # The deck's own "created" row already holds the display copies.
+    copy = (
+        ActivityEntry.objects.filter(deck_id=deck_id, kind=ActivityEntry.KIND_CREATED)
+        .values_list('deck_title', 'deck_owner', 'card_count').first()
+    )
+    if copy is None:
+        copy = (
+            Deck.objects.filter(id=deck_id)
+            .annotate(card_count=Count('cards') + Count('shared_from__cards'))
+            .values_list('title', 'owner__username', 'card_count').get()
+        )
+    return copy
+
+
+def _played_entry(submission, copy):
+    title, owner, card_count = copy
+    return ActivityEntry(
+        user_id=submission.user_id, kind=ActivityEntry.KIND_PLAYED,
+        deck_id=submission.deck_id, submission=submission, session_id=submission.session_id,
+        deck_title=title, deck_owner=owner, card_count=card_count,
+        score=submission.score, total=submission.total, happened_at=submission.submission_time,
+    )
+
+
+def submission_saved(submission, created):
+    """
+    Add the feed row for a new submission. The feed shows results, so the
+    score is copied over when the last card is answered, not on every answer.
+    """
+    if created:
+        _played_entry(submission, _display_copy(submission.deck_id)).save()
+    elif submission.finished_at is not None:
+        ActivityEntry.objects.filter(submission=submission).update(
+            score=submission.score, total=submission.total,
+        )
+
+
+def submissions_created(submissions):
+    """Feed rows for submissions of one deck made with ``bulk_create`` (which sends no signals)."""
+    if not submissions:
+        return
+    copy = _display_copy(submissions[0].deck_id)
+    ActivityEntry.objects.bulk_create([_played_entry(s, copy) for s in submissions], batch_size=500)
+
+
+def feed(user, kind, page=1, per_page=PAGE_SIZE):
+    """One page of ``user``'s feed, newest first, as ``(entries, has_next)``."""
+    page = max(1, page)
+    start = (page - 1) * per_page
+    entries = list(
+        ActivityEntry.objects.filter(user=user, kind=kind)
+        .order_by('-happened_at', '-id')[start:start + per_page + 1]
+    )
+    return entries[:per_page], len(entries) > per_page
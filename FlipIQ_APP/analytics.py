@@ -0,0 +1,152 @@
+"""
+Per-card answer analytics.
+
+``submit_answer`` calls :func:`record` for every answer. Counts are buffered
+in memory and folded into ``CardAnswerStat`` rollups (one row per deck, card
+and choice) in batches, so answering never costs an extra query and the
+analytics page reads a few rows per card instead of raw answers.
+
+Served processes write the buffer from a flusher thread (:func:`start_flusher`,
+started by ``warmup.start_background``) every ``FLIPIQ_ANALYTICS_FLUSH_INTERVAL``
+seconds, so another worker's report is at most that far behind even when
+this one gets no more traffic. The report flushes this worker's own buffer
+first.
+
+Counts belong to the deck that was played, not the deck storing the card: a
+copy-on-write clone answers its source's cards, and its owner's classes must
+not show up in the source's report (or the other way round).
+:func:`move_stats` follows the cards when a clone gets its own copies.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connections
+from django.db.models import Case, F, When
+
+from . import tenancy
+from .models import Card, CardAnswerStat
+
+_lock = threading.Lock()
+_pending = {}  # (database, deck_id, card_id, choice) -> [count, correct]
+_flusher = None
+
+DIFFICULTY_BUCKETS = 10
+
+
+def record(deck_id, card_id, choice, is_correct):
+    """Count an answer to ``card_id`` given while playing deck ``deck_id``."""
+    key = (tenancy.scope(), deck_id, card_id, str(choice)[:255])
+    with _lock:
+        counts = _pending.setdefault(key, [0, 0])
+        counts[0] += 1
+        counts[1] += int(is_correct)
+
+
+def flush():
+    """Write buffered counts to the rollup table with one UPDATE per (deck, card, choice)."""
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    by_database = {}
+    for (alias, deck_id, card_id, choice), counts in batch.items():
+        by_database.setdefault(alias, {})[deck_id, card_id, choice] = counts
+    for alias, counts in by_database.items():
+        with tenancy.routed_to(alias):
+            _write(counts)
+
+
+def _write(batch):
+    # Cards can be deleted (deck re-published) between the answer and the flush.
+    live = set(Card.objects.filter(id__in={card_id for _, card_id, _ in batch}).values_list('id', flat=True))
+    with tenancy.atomic():
+        for (deck_id, card_id, choice), (count, correct) in batch.items():
+            if card_id not in live:
+                continue
+            rows = CardAnswerStat.objects.filter(deck_id=deck_id, card_id=card_id, choice=choice)
+            if rows.update(count=F('count') + count, correct=F('correct') + correct):
+                continue
+            try:
+                with tenancy.atomic():
+                    CardAnswerStat.objects.create(deck_id=deck_id, card_id=card_id, choice=choice,
+                                                  count=count, correct=correct)
+            except IntegrityError:  # another worker created it first
+                rows.update(count=F('count') + count, correct=F('correct') + correct)
+
+
+atexit.register(flush)
+
+
+def start_flusher(interval=None):
+    """Flush buffered counts from a daemon thread every ``interval`` seconds; safe to call more than once."""
+    global _flusher
+    interval = interval or getattr(settings, 'FLIPIQ_ANALYTICS_FLUSH_INTERVAL', 5)
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():  # threads don't survive a fork
+            return
+        _flusher = threading.Thread(target=_flush_forever, args=(interval,), name='flipiq-analytics', daemon=True)
+        _flusher.start()
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        if not _pending:
+            continue
+        try:
+            flush()
+        except Exception as e:
+            print("❌ analytics flush failed:", e)
+        finally:
+            connections.close_all()
+
+
+def move_stats(deck_ids, cards):
+    """
+    Point the counts of ``deck_ids`` at copies of the cards they played, as
+    cloning.py makes them: ``cards`` is ``{shared card id: copy id}``.
+    """
+    flush()
+    if deck_ids and cards:
+        CardAnswerStat.objects.filter(deck_id__in=deck_ids, card_id__in=cards).update(
+            card_id=Case(*[When(card_id=old, then=new) for old, new in cards.items()])
+        )
+
+
+def deck_report(deck, cards):
+    """
+    Item difficulty and distractor frequency for ``cards`` (dicts with id/front/back)
+    as played in ``deck``, computed from the rollups in a single query.
+    """
+    flush()
+    by_card = {c['id']: {**c, 'attempts': 0, 'correct': 0, 'choices': []} for c in cards}
+    stats = (
+        CardAnswerStat.objects.filter(deck=deck, card_id__in=by_card)
+        .values_list('card_id', 'choice', 'count', 'correct')
+    )
+    for card_id, choice, count, correct in stats:
+        item = by_card[card_id]
+        item['attempts'] += count
+        item['correct'] += correct
+        item['choices'].append({'choice': choice, 'count': count, 'is_correct': correct > 0})
+
+    histogram = [0] * DIFFICULTY_BUCKETS
+    for item in by_card.values():
+        attempts = item['attempts']
+        item['percent_correct'] = round(item['correct'] / attempts * 100, 1) if attempts else None
+        for c in item['choices']:
+            c['percent'] = round(c['count'] / attempts * 100, 1)
+        item['choices'].sort(key=lambda c: c['count'], reverse=True)
+        item['top_distractor'] = next((c for c in item['choices'] if not c['is_correct']), None)
+        if attempts:
+            bucket = min(DIFFICULTY_BUCKETS - 1, int(item['correct'] / attempts * DIFFICULTY_BUCKETS))
+            histogram[bucket] += 1
+
+    return {
+        'cards': list(by_card.values()),
+        'histogram': [
+            {'label': f"{i * 100 // DIFFICULTY_BUCKETS}-{(i + 1) * 100 // DIFFICULTY_BUCKETS}%", 'cards': n}
+            for i, n in enumerate(histogram)
+        ],
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FlipiqAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'FlipIQ_APP'
+
+    def ready(self):
+        from . import live_state, middleware, signals  # noqa: F401
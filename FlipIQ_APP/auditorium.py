@@ -0,0 +1,182 @@
+"""
+Auditorium mode: live sessions with hundreds or thousands of students.
+
+* Joins are buffered per worker and written with one ``bulk_create`` per
+  flush instead of a ``get_or_create`` per student. Pending joins are held
+  as ``array('q')`` user ids (8 bytes each) under a per-session card count,
+  and the unique (session, user) constraint absorbs repeats.
+* Hosts get a progress histogram rolled up in SQL and page through the
+  roster, rather than polling every student's row every few seconds.
+
+Anything that reads participants calls :func:`flush` first, so a worker
+never hides its own pending joins from the host or the waiting room. Joins
+buffered in *another* worker show up once that worker flushes: served
+processes run a flusher thread (:func:`start_flusher`, started by
+``warmup.start_background``), so a join is never held longer than
+``FLIPIQ_JOIN_FLUSH_INTERVAL`` seconds, even in a worker that gets no more
+traffic, and a killed worker loses at most that long's joins (the students
+just join again).
+"""
+import atexit
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F, IntegerField, Q
+from django.db.models.functions import Cast, NullIf
+
+from . import presence, tenancy
+from .models import Participant
+
+# Progress is bucketed into tenths; bucket BUCKETS means finished.
+BUCKETS = 10
+
+_lock = threading.Lock()
+_pending = {}  # (database, session_id) -> (total_cards, array('q') of user ids)
+_pending_count = 0
+_last_flush = time.monotonic()
+_flusher = None
+
+
+def page_size():
+    return getattr(settings, 'FLIPIQ_ROSTER_PAGE_SIZE', 100)
+
+
+def queue_join(session_id, user_id, total_cards):
+    """Buffer a join; flushes when the buffer is full or old enough."""
+    global _pending_count
+    key = (tenancy.scope(), session_id)
+    with _lock:
+        entry = _pending.get(key)
+        if entry is None:
+            entry = _pending[key] = (total_cards, array('q'))
+        entry[1].append(user_id)
+        _pending_count += 1
+        due = (_pending_count >= getattr(settings, 'FLIPIQ_JOIN_FLUSH_EVERY', 200)
+               or time.monotonic() - _last_flush >= getattr(settings, 'FLIPIQ_JOIN_FLUSH_INTERVAL', 1))
+    if due:
+        flush()
+
+
+def pending_total_cards(session_id):
+    """Card count recorded with this session's pending joins, if any (saves a COUNT per join)."""
+    with _lock:
+        entry = _pending.get((tenancy.scope(), session_id))
+        return entry[0] if entry else None
+
+
+def flush():
+    """Insert every buffered join; students already in the room are skipped."""
+    global _pending, _pending_count, _last_flush
+    with _lock:
+        batch, _pending = _pending, {}
+        _pending_count = 0
+        _last_flush = time.monotonic()
+    by_database = {}
+    for (alias, session_id), (total_cards, user_ids) in batch.items():
+        by_database.setdefault(alias, []).extend(
+            Participant(session_id=session_id, user_id=user_id, total_cards=total_cards) for user_id in set(user_ids)
+        )
+    for alias, participants in by_database.items():
+        Participant.objects.using(alias).bulk_create(participants, ignore_conflicts=True, batch_size=500)
+
+
+atexit.register(flush)
+
+
+def start_flusher(interval=None):
+    """Flush pending joins from a daemon thread every ``interval`` seconds; safe to call more than once."""
+    global _flusher
+    interval = interval or getattr(settings, 'FLIPIQ_JOIN_FLUSH_INTERVAL', 1)
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():  # threads don't survive a fork
+            return
+        _flusher = threading.Thread(target=_flush_forever, args=(interval,), name='flipiq-joins', daemon=True)
+        _flusher.start()
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        if not _pending:
+            continue
+        try:
+            flush()
+        except Exception as e:
+            print("❌ join flush failed:", e)
+        finally:
+            connections.close_all()
+
+
+def histogram(session, live_presence=False):
+    """
+    ``{"count", "online", "finished", "buckets"}`` for ``session`` in one query;
+    ``buckets[i]`` counts students between i*10% and (i+1)*10% done.
+
+    ``online`` comes from the stored ``Participant.status``, which roster pages
+    keep current. With ``live_presence`` it is read from the presence store
+    instead, for hosts that never page through the roster.
+    """
+    bucket = Cast(F('progress') * BUCKETS / NullIf(F('total_cards'), 0), IntegerField())
+    rows = (
+        Participant.objects.filter(session=session)
+        .annotate(bucket=bucket)
+        .values('bucket')
+        .annotate(n=Count('id'), online=Count('id', filter=Q(status=presence.ONLINE)))
+        .order_by()
+    )
+    buckets = [0] * BUCKETS
+    count = online = finished = 0
+    for row in rows:
+        count += row['n']
+        online += row['online']
+        b = row['bucket'] or 0
+        if b >= BUCKETS:
+            finished += row['n']
+        else:
+            buckets[b] += row['n']
+    if live_presence:
+        user_ids = Participant.objects.filter(session=session).values_list('user_id', flat=True)
+        online = sum(state == presence.ONLINE for state in presence.states(session.id, user_ids).values())
+    return {'count': count, 'online': online, 'finished': finished, 'buckets': buckets}
+
+
+def roster_rows(session, page=1, per_page=None):
+    """
+    One page of raw roster rows, in join order, as ``(rows, has_next)``: SELECTs
+    only, so callers may share the result (see ``views.participants_flight``).
+    Each row is ``(id, user_id, name, progress, total_cards, stored_status)``.
+    """
+    per_page = per_page or page_size()
+    start = (max(1, page) - 1) * per_page
+    rows = list(
+        Participant.objects.filter(session=session).order_by('id').values_list(
+            'id', 'user_id', 'user__first_name', 'user__last_name', 'user__username',
+            'progress', 'total_cards', 'status',
+        )[start:start + per_page + 1]
+    )
+    return [
+        (pid, user_id, f"{first} {last}".strip() or username, progress, total, status)
+        for pid, user_id, first, last, username, progress, total, status in rows[:per_page]
+    ], len(rows) > per_page
+
+
+def roster_page(session, page=1, per_page=None):
+    """
+    One page of the roster, in join order, as ``(rows, has_next)``. Presence is
+    synced for the rows on the page only.
+    """
+    rows, has_next = roster_rows(session, page, per_page)
+    statuses = presence.sync_statuses(session.id, [(r[0], r[1], r[5]) for r in rows])
+    return [
+        {
+            "id": pid,
+            "name": name,
+            "progress": progress,
+            "total": total,
+            "status": statuses[pid],
+        }
+        for pid, user_id, name, progress, total, _ in rows
+    ], has_next
@@ -0,0 +1,192 @@
+"""
+Cached deck grid for the home page.
+
+Public decks change far less often than the home page is loaded, so each
+page of the grid is rendered once per (audience, search query, page) and
+kept as HTML in ``FLIPIQ_HOME_CACHE`` under the current *catalog version*.
+Saving or deleting a public deck (or making one private), or changing the
+cards of a deck that is public or has public clones, bumps the version
+(``signals.py``), which retires every cached page at once without having to
+find them. Private decks never do, and :func:`batch` folds a multi-card edit
+such as a publish into one bump. The version lives in the live-state store,
+which must be shared between workers for them all to see the bump
+(``check --deploy`` enforces it, see live_state.py).
+
+A page is the same for everyone in an audience (guest, student, teacher).
+Which decks the visitor already played is layered on top by the view with
+one query over the deck ids on the page (:func:`played_on_page`).
+
+Counters: ``home_cache.hits``, ``home_cache.misses`` and
+``home_cache.render_us_saved`` (render time the hits didn't spend).
+
+Public decks from other schools' databases (``tenancy.public_decks_elsewhere``)
+are cached the same way by :func:`elsewhere`, under the versions of those
+databases' catalogs.
+"""
+import contextvars
+import hashlib
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+
+from . import live_state, metrics, singleflight, tenancy
+from .models import Deck, Profile, Submission
+
+GUEST = 'guest'
+
+# Concurrent misses for the same page render it once
+_flight = singleflight.Group('home')
+
+# Inside batch(): {database alias: deck ids whose cards changed, or None to bump regardless}
+_batched = contextvars.ContextVar('catalog_batched', default=None)
+
+
+def _version_key(alias=None):
+    return f'catalog:{alias or tenancy.scope()}:version'
+
+
+def _fresh_version():
+    # Start from the clock so a version evicted from the store never comes back.
+    return time.time_ns() // 1000
+
+
+def version(alias=None):
+    store, key = live_state.store(), _version_key(alias)
+    current = store.get(key)
+    if current is None:
+        store.add(key, _fresh_version(), timeout=None)
+        current = store.get(key)
+    return current
+
+
+def bump(alias=None):
+    """Retire every cached page of the public catalog in database ``alias``."""
+    pending = _batched.get()
+    if pending is not None:
+        pending[alias or tenancy.scope()] = None
+        return
+    store, key = live_state.store(), _version_key(alias)
+    try:
+        store.incr(key)
+    except ValueError:
+        store.add(key, _fresh_version(), timeout=None)
+
+
+def cards_changed(deck_id, alias=None):
+    """Bump if deck ``deck_id``, or a clone reading its cards, is listed publicly."""
+    alias = alias or tenancy.scope()
+    pending = _batched.get()
+    if pending is not None:
+        if pending.get(alias, ()) is not None:
+            pending.setdefault(alias, set()).add(deck_id)
+        return
+    _bump_if_listed(alias, {deck_id})
+
+
+def _bump_if_listed(alias, deck_ids):
+    listed = Deck.objects.using(alias).filter(Q(id__in=deck_ids) | Q(shared_from__in=deck_ids), visibility='public')
+    if listed.exists():
+        bump(alias)
+
+
+@contextmanager
+def batch():
+    """Deck and card changes inside the block bump each database at most once, at the end."""
+    token = _batched.set({})
+    try:
+        yield
+    finally:
+        pending = _batched.get()
+        _batched.reset(token)
+        for alias, deck_ids in pending.items():
+            if deck_ids is None:
+                bump(alias)
+            else:
+                _bump_if_listed(alias, deck_ids)
+
+
+def audience(user):
+    if not user.is_authenticated:
+        return GUEST
+    profile = getattr(user, 'profile', None)
+    return profile.role if profile else Profile.ROLE_STUDENT
+
+
+def public_decks(query='', page=1, per_page=24):
+    """One page of public decks, newest first, and whether there is a next page."""
+    decks = (
+        Deck.objects.filter(visibility='public')
+        .select_related('owner')
+        .annotate(card_count=Count('cards') + Count('shared_from__cards'))
+    )
+    if query:
+        decks = decks.filter(
+            Q(title__icontains=query) | Q(subject__icontains=query) | Q(owner__username__icontains=query)
+        )
+    start = (page - 1) * per_page
+    rows = list(decks.order_by('-created_at')[start:start + per_page + 1])
+    return rows[:per_page], len(rows) > per_page
+
+
+def _render(viewer, query, page, per_page):
+    started = time.perf_counter()
+    decks, has_next = public_decks(query, page, per_page)
+    html = render_to_string('FlipIQ_APP/home_decks.html', {'public_decks': decks, 'audience': viewer})
+    return {
+        'html': html,
+        'deck_ids': [deck.id for deck in decks],
+        'has_next': has_next,
+        'render_us': int((time.perf_counter() - started) * 1_000_000),
+    }
+
+
+def grid(viewer, query='', page=1):
+    """
+    ``{'html', 'deck_ids', 'has_next', 'render_us'}`` for one page of the
+    public deck grid as seen by audience ``viewer``.
+    """
+    per_page = getattr(settings, 'FLIPIQ_HOME_PAGE_SIZE', 24)
+    digest = hashlib.md5(query.encode()).hexdigest()
+    key = f'home:{tenancy.scope()}:{version()}:{viewer}:{per_page}:{page}:{digest}'
+    cache = caches[getattr(settings, 'FLIPIQ_HOME_CACHE', 'default')]
+    entry = cache.get(key)
+    if entry is not None:
+        metrics.incr('home_cache.hits')
+        metrics.incr('home_cache.render_us_saved', entry['render_us'])
+        return entry
+    metrics.incr('home_cache.misses')
+    entry = _flight.do(key, lambda: _render(viewer, query, page, per_page))
+    cache.set(key, entry, getattr(settings, 'FLIPIQ_HOME_CACHE_TIMEOUT', 300))
+    return entry
+
+
+def elsewhere(query=''):
+    """``tenancy.public_decks_elsewhere(query)``, cached until one of the other catalogs changes."""
+    if not tenancy.tenants():
+        return []
+    here = tenancy.scope()
+    versions = ':'.join(str(version(alias)) for alias in tenancy.aliases() if alias != here)
+    digest = hashlib.md5(query.encode()).hexdigest()
+    key = f'home-elsewhere:{here}:{versions}:{digest}'
+    cache = caches[getattr(settings, 'FLIPIQ_HOME_CACHE', 'default')]
+    rows = cache.get(key)
+    if rows is None:
+        rows = _flight.do(key, lambda: tenancy.public_decks_elsewhere(query))
+        cache.set(key, rows, getattr(settings, 'FLIPIQ_HOME_CACHE_TIMEOUT', 300))
+    return rows
+
+
+def played_on_page(user, deck_ids):
+    """``{deck_id: session_id}`` of the latest game ``user`` played among ``deck_ids``."""
+    if not user.is_authenticated or not deck_ids:
+        return {}
+    rows = (
+        Submission.objects.filter(user=user, deck_id__in=deck_ids)
+        .order_by('submission_time')
+        .values_list('deck_id', 'session_id')
+    )
+    return dict(rows)
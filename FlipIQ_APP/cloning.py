@@ -0,0 +1,67 @@
+"""
+Copy-on-write deck clones.
+
+Cloning inserts one ``Deck`` row whose ``shared_from`` points at the deck
+that actually stores the cards (always a deck that owns its cards, never
+another clone), so it costs the same for a 5-card deck as for a 500-card
+one. Everything reads cards through ``Deck.get_cards()``, which follows that
+pointer.
+
+A clone reads its source's cards, edits included, until it changes a card
+itself: :func:`materialize` then gives that one clone its own copy, inside
+the clone owner's request. Edits to the source never copy anything, however
+many clones it has.
+
+When the source is deleted, :func:`hand_off` copies its cards once, into
+its oldest clone, and points the other clones at that one.
+
+A clone's answer counts (analytics.py) move to its copies along with it.
+"""
+from . import activity, analytics, tenancy
+from .models import Card, Deck
+
+
+def clone_deck(deck, owner):
+    clone = Deck.objects.create(
+        title=f"{deck.title} (copy)",
+        owner=owner,
+        time_interval=deck.time_interval,
+        subject=deck.subject,
+        grade=deck.grade,
+        visibility='private',
+        shared_from_id=deck.card_source_id,
+    )
+    activity.cards_changed(clone)
+    return clone
+
+
+def materialize(deck):
+    """
+    Give a clone its own copy of the shared cards. Returns
+    ``{shared card id: own card id}`` (empty if ``deck`` isn't a clone).
+    """
+    if deck.shared_from_id is None:
+        return {}
+    with tenancy.atomic():
+        shared = list(Card.objects.filter(deck_id=deck.shared_from_id).order_by('id'))
+        copies = Card.objects.bulk_create(
+            [Card(deck=deck, front=c.front, back=c.back, choices=c.choices) for c in shared]
+        )
+        Deck.objects.filter(id=deck.id).update(shared_from=None)
+        remapped = {c.id: copy.id for c, copy in zip(shared, copies)}
+        analytics.move_stats([deck.id], remapped)
+    deck.shared_from = None
+    return remapped
+
+
+def hand_off(deck):
+    """Before ``deck`` is deleted: copy its cards into its oldest clone and point the rest there."""
+    clone_ids = list(Deck.objects.filter(shared_from_id=deck.id).order_by('id').values_list('id', flat=True))
+    if not clone_ids:
+        return
+    heir, others = Deck(id=clone_ids[0], shared_from_id=deck.id), clone_ids[1:]
+    with tenancy.atomic():
+        remapped = materialize(heir)
+        # Moved off ``deck`` now, so the delete's SET_NULL of shared_from no longer matches them
+        Deck.objects.filter(id__in=others).update(shared_from=heir.id)
+        analytics.move_stats(others, remapped)
@@ -0,0 +1,80 @@
+"""
+Response compression.
+
+* :class:`CompressionMiddleware` gzips dynamic HTML and JSON responses once
+  they're big enough for it to pay off (``FLIPIQ_COMPRESS_MIN_BYTES``).
+* :class:`PrecompressedStaticMiddleware` serves ``collectstatic`` output from
+  ``STATIC_ROOT`` when Django itself is serving static files. It picks the
+  ``.br`` / ``.gz`` sibling written by
+  :class:`~FlipIQ_APP.storage.CompressedManifestStaticFilesStorage` and marks
+  fingerprinted names as immutable. In front of nginx or a CDN, point those
+  at ``STATIC_ROOT`` instead and leave this middleware out.
+"""
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'application/vnd.flipiq.compact+json')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'FLIPIQ_COMPRESS_MIN_BYTES', 1024):
+            return response
+        return super().process_response(request, response)
+
+
+class PrecompressedStaticMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = settings.STATIC_ROOT
+        self._immutable = None
+
+    def __call__(self, request):
+        if self.root and request.path.startswith(self.prefix) and request.method in ('GET', 'HEAD'):
+            return self.serve(request, request.path[len(self.prefix):])
+        return self.get_response(request)
+
+    def immutable_names(self):
+        # Every name listed in the manifest carries a content hash.
+        if self._immutable is None:
+            hashed = getattr(staticfiles_storage, 'hashed_files', {})
+            self._immutable = set(hashed.values())
+        return self._immutable
+
+    def serve(self, request, name):
+        name = posixpath.normpath(name).lstrip('/')
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            raise Http404(name)
+        if not os.path.isfile(path):
+            raise Http404(name)
+
+        accepts = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if candidate in accepts and os.path.isfile(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(open(path, 'rb'), content_type=content_type or 'application/octet-stream',
+                                filename=posixpath.basename(name))
+        if encoding:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Cache-Control'] = IMMUTABLE if name in self.immutable_names() else 'public, max-age=300'
+        return response
@@ -0,0 +1,210 @@
+"""
+Live session leaderboards.
+
+Each worker keeps, per session, the ``(-score, seconds to finish, user_id)``
+keys in sorted order. ``submit_answer`` moves one student's key, and the
+leaderboard poll reads top-k and the student's own rank without sorting or
+touching ``Submission`` rows. With ``sortedcontainers`` installed the keys
+are a ``SortedList`` and a move or rank is O(log n); without it they are a
+plain list, where a move also shifts the keys behind it (O(n) memmove, a few
+microseconds for a classroom of hundreds).
+
+A board is built from the database (one query, one sort) when a worker
+first needs it, e.g. after a restart. Once it is older than
+``FLIPIQ_LEADERBOARD_MAX_AGE`` seconds the next poll refreshes it with the
+submissions whose ``updated_at`` moved since the last sync, so boards in
+multi-worker deployments pick up answers that landed on other workers
+without reloading the room. Concurrent polls share one build or refresh.
+Kicked or departed students are dropped from this worker's board and left
+out of every build.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import singleflight, tenancy
+from .models import Submission
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # optional
+    SortedList = None
+
+MAX_BOARDS = 1000
+UNFINISHED = math.inf
+# Refreshes re-read this far behind the last sync, for clock skew between
+# workers and answers committed just after they were stamped.
+SYNC_OVERLAP = timedelta(seconds=2)
+
+
+class _SortedKeys(list):
+    """The part of ``SortedList``'s interface boards use, over a plain list."""
+
+    def add(self, key):
+        insort(self, key)
+
+    def remove(self, key):
+        del self[self.bisect_left(key)]
+
+    def bisect_left(self, key):
+        return bisect_left(self, key)
+
+
+def _sorted_keys(keys=()):
+    return SortedList(keys) if SortedList is not None else _SortedKeys(sorted(keys))
+
+
+def display_name(first, last, username):
+    return f"{first} {last}".strip() or username
+
+
+def finish_seconds(started_at, finished_at):
+    if finished_at is None or started_at is None:
+        return UNFINISHED
+    return max(0.0, (finished_at - started_at).total_seconds())
+
+
+class Board:
+    def __init__(self, started_at=None):
+        self.keys = _sorted_keys()  # (-score, seconds, user_id)
+        self.by_user = {}  # user_id -> key
+        self.names = {}    # user_id -> display name
+        self.started_at = started_at  # finish times are measured from this
+        self.synced_at = None         # database time of the last build or refresh
+        self.checked_at = time.monotonic()
+
+    def load(self, rows):
+        """Fill an empty board from ``(user_id, score, seconds, name)`` rows with one sort."""
+        for user_id, score, seconds, name in rows:
+            self.by_user[user_id] = (-score, seconds, user_id)
+            self.names[user_id] = name
+        self.keys = _sorted_keys(self.by_user.values())
+
+    def update(self, user_id, score, seconds, name=None):
+        old = self.by_user.get(user_id)
+        if old is not None:
+            self.keys.remove(old)
+        key = (-score, seconds, user_id)
+        self.keys.add(key)
+        self.by_user[user_id] = key
+        if name is not None:
+            self.names[user_id] = name
+
+    def remove(self, user_id):
+        key = self.by_user.pop(user_id, None)
+        if key is not None:
+            self.keys.remove(key)
+        self.names.pop(user_id, None)
+
+    def entry(self, rank, key):
+        score, seconds, user_id = key
+        return {
+            'rank': rank,
+            'user_id': user_id,
+            'name': self.names.get(user_id, ''),
+            'score': -score,
+            'seconds': None if seconds == UNFINISHED else round(seconds, 1),
+        }
+
+    def top(self, k):
+        return [self.entry(i + 1, key) for i, key in enumerate(self.keys[:k])]
+
+    def rank_of(self, user_id):
+        key = self.by_user.get(user_id)
+        if key is None:
+            return None
+        return self.entry(self.keys.bisect_left(key) + 1, key)
+
+
+_lock = threading.Lock()
+_boards = OrderedDict()  # (database, session_id) -> Board, least recently used first
+
+
+_flight = singleflight.Group('leaderboard')
+
+
+def _rows(session, since=None):
+    rows = Submission.objects.filter(session=session, user__participant__session=session)
+    if since is not None:
+        rows = rows.filter(updated_at__gte=since - SYNC_OVERLAP)
+    return [
+        (user_id, score, finish_seconds(session.started_at, finished_at), display_name(first, last, username))
+        for user_id, score, finished_at, first, last, username in rows.values_list(
+            'user_id', 'score', 'finished_at', 'user__first_name', 'user__last_name', 'user__username'
+        )
+    ]
+
+
+def _build(session):
+    board = Board(session.started_at)
+    board.synced_at = timezone.now()
+    board.load(_rows(session))
+    return board
+
+
+def _refresh(session, board):
+    synced_at = timezone.now()
+    rows = _rows(session, since=board.synced_at)
+    with _lock:
+        for user_id, score, seconds, name in rows:
+            board.update(user_id, score, seconds, name)
+        board.synced_at = synced_at
+        board.checked_at = time.monotonic()
+
+
+def board_for(session):
+    max_age = getattr(settings, 'FLIPIQ_LEADERBOARD_MAX_AGE', 5)
+    key = (tenancy.scope(), session.id)
+    with _lock:
+        board = _boards.get(key)
+        if board is not None and board.started_at != session.started_at:
+            board = None  # restarted: every finish time moves
+        if board is not None:
+            _boards.move_to_end(key)
+            if time.monotonic() - board.checked_at < max_age:
+                return board
+    if board is not None:
+        _flight.do(('refresh', session.id), lambda: _refresh(session, board))
+        return board
+    board = _flight.do(('build', session.id), lambda: _build(session))
+    with _lock:
+        _boards[key] = board
+        _boards.move_to_end(key)
+        while len(_boards) > MAX_BOARDS:
+            _boards.popitem(last=False)
+    return board
+
+
+def record(session, submission, user):
+    """Move ``user`` on the session's board if this worker has one loaded."""
+    with _lock:
+        board = _boards.get((tenancy.scope(), session.id))
+        if board is not None:
+            board.update(user.id, submission.score, finish_seconds(session.started_at, submission.finished_at),
+                         display_name(user.first_name, user.last_name, user.username))
+
+
+def drop(session_id, user_id):
+    """Take a kicked or departed student off the session's board on this worker."""
+    with _lock:
+        board = _boards.get((tenancy.scope(), session_id))
+        if board is not None:
+            board.remove(user_id)
+
+
+def forget(session_id):
+    with _lock:
+        _boards.pop((tenancy.scope(), session_id), None)
+
+
+def standings(session, user_id, k=10):
+    """Top ``k`` entries, ``user_id``'s own entry (or None) and the board size."""
+    board = board_for(session)
+    with _lock:
+        return {'top': board.top(k), 'me': board.rank_of(user_id), 'total': len(board.keys)}
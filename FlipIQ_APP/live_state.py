@@ -0,0 +1,38 @@
+"""
+Shared store for short-lived live-session state (presence, counters, ...).
+
+Backed by a Django cache alias so a single worker can use the in-process
+LocMemCache while multi-worker deployments point ``FLIPIQ_LIVE_STATE_CACHE``
+at a shared backend such as Redis or Memcached.
+
+Catalog versions (catalog.py) live here too, so with a per-process store other
+workers keep serving a stale home page until it expires. ``manage.py check
+--deploy`` reports a process-local store (:func:`check_shared_store`); silence
+``FlipIQ_APP.E001`` only when running a single worker.
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def store():
+    return caches[getattr(settings, 'FLIPIQ_LIVE_STATE_CACHE', 'default')]
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_store(app_configs=None, **kwargs):
+    alias = getattr(settings, 'FLIPIQ_LIVE_STATE_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_BACKENDS:
+        return []
+    return [checks.Error(
+        f"FLIPIQ_LIVE_STATE_CACHE ({alias!r}) uses {backend.rsplit('.', 1)[-1]}, which every worker keeps to itself.",
+        hint="Point it at a cache all workers share (Redis, Memcached); otherwise catalog bumps, "
+             "presence and shared rate limits only reach the worker that made them.",
+        id='FlipIQ_APP.E001',
+    )]
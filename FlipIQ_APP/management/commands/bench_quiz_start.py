@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import RequestFactory
+
+from FlipIQ_APP import provisioning, views
+from FlipIQ_APP.models import Card, Deck, Participant, Session
+from FlipIQ_APP.management.commands.bench_sqlite import percentile
+
+
+class Command(BaseCommand):
+    help = ("Measure time to the first card when a whole waiting room opens play_deck at once, with "
+            "rows created lazily per student versus pre-provisioned at start. Runs on a scratch "
+            "SQLite file using the current FLIPIQ_DB_PROFILE.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200, help="Students in the waiting room")
+        parser.add_argument('--cards', type=int, default=20)
+
+    def handle(self, *args, **opts):
+        self.opts = opts
+        with tempfile.TemporaryDirectory() as tmp:
+            connection.close()
+            connections.settings['default']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+            call_command('migrate', verbosity=0)
+            self.seed()
+            rows = [(mode, self.run(mode)) for mode in ('lazy', 'provisioned')]
+            connection.close()
+
+        self.stdout.write(f"{'mode':<12} {'start':>8} {'p50':>8} {'p99':>8} {'max':>8} {'errors':>7}")
+        for mode, r in rows:
+            self.stdout.write(f"{mode:<12} {r['start']:>6.1f}ms {r['p50']:>6.1f}ms {r['p99']:>6.1f}ms "
+                              f"{r['max']:>6.1f}ms {r['errors']:>7}")
+
+    def seed(self):
+        self.host = User.objects.create(username='bench-host')
+        self.deck = Deck.objects.create(title='Bench', owner=self.host)
+        Card.objects.bulk_create([
+            Card(deck=self.deck, front=f'Q{i}', back='a', choices=['a', 'b', 'c', 'd'])
+            for i in range(self.opts['cards'])
+        ])
+        self.students = User.objects.bulk_create(
+            [User(username=f'bench-student-{i}') for i in range(self.opts['students'])]
+        )
+
+    def run(self, mode):
+        Session.objects.filter(deck=self.deck).update(is_active=False)
+        session = Session.objects.create(deck=self.deck, host=self.host)
+        # The waiting room: joined, nothing else yet
+        Participant.objects.bulk_create([Participant(session=session, user=u) for u in self.students])
+
+        began = time.perf_counter()
+        if mode == 'provisioned':
+            provisioning.provision_session(session)
+        Session.objects.filter(id=session.id).update(is_started=True)
+        start_ms = (time.perf_counter() - began) * 1000
+
+        factory = RequestFactory()
+        path = f'/deck/{self.deck.id}/play/{session.id}/'
+        barrier = threading.Barrier(len(self.students))
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def student(user):
+            request = factory.get(path)
+            request.user = user
+            barrier.wait()
+            t = time.perf_counter()
+            try:
+                response = views.play_deck(request, self.deck.id, session.id)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            finally:
+                connection.close()
+            with lock:
+                if ok:
+                    latencies.append((time.perf_counter() - t) * 1000)
+                else:
+                    errors[0] += 1
+
+        threads = [threading.Thread(target=student, args=(u,)) for u in self.students]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return {
+            'start': start_ms,
+            'p50': percentile(latencies, 0.5),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies, default=float('nan')),
+            'errors': errors[0],
+        }
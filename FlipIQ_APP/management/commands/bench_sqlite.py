@@ -0,0 +1,150 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT NOT NULL);
+CREATE TABLE participant (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+                          progress INTEGER NOT NULL DEFAULT 0, total_cards INTEGER NOT NULL);
+CREATE INDEX participant_session ON participant (session_id);
+CREATE TABLE submission (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+                         score INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL);
+"""
+
+
+def percentile(samples, p):
+    if not samples:
+        return float('nan')
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+class Command(BaseCommand):
+    help = ("Measure answer-write throughput and poll latency on SQLite with Django's default "
+            "connection settings and with the production profile (FLIPIQ_DB_PROFILE=production).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help="Run time per profile")
+        parser.add_argument('--writers', type=int, default=8, help="Threads submitting answers")
+        parser.add_argument('--readers', type=int, default=16, help="Threads polling participant lists")
+        parser.add_argument('--sessions', type=int, default=20)
+        parser.add_argument('--students', type=int, default=40, help="Participants per session")
+
+    def handle(self, *args, **opts):
+        self.opts = opts
+        rows = []
+        for profile in ('default', 'production'):
+            with tempfile.TemporaryDirectory() as tmp:
+                rows.append((profile, self.run(profile, os.path.join(tmp, 'bench.sqlite3'))))
+
+        self.stdout.write(f"{'profile':<11} {'writes/s':>9} {'w p50':>8} {'w p99':>8} {'w max':>8} "
+                          f"{'reads/s':>9} {'r p99':>8} {'locked':>7}")
+        for profile, r in rows:
+            self.stdout.write(
+                f"{profile:<11} {r['writes'] / r['elapsed']:>9,.0f} {r['w50']:>6.1f}ms {r['w99']:>6.1f}ms "
+                f"{r['wmax']:>6.1f}ms {r['reads'] / r['elapsed']:>9,.0f} {r['r99']:>6.1f}ms {r['errors']:>7}"
+            )
+
+    def connect(self, profile, path):
+        # Both profiles run in autocommit and open transactions explicitly, as Django does.
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        if profile == 'production':
+            for pragma, value in settings.FLIPIQ_SQLITE_PRAGMAS.items():
+                conn.execute(f"PRAGMA {pragma}={value}")
+        return conn
+
+    def setup_db(self, profile, path):
+        conn = self.connect(profile, path)
+        conn.executescript(SCHEMA)
+        sessions, students = self.opts['sessions'], self.opts['students']
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO user VALUES (?, ?)", ((i, f"student{i}") for i in range(sessions * students)))
+        rows = [(i, i // students, i, 20) for i in range(sessions * students)]
+        conn.executemany("INSERT INTO participant (id, session_id, user_id, total_cards) VALUES (?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO submission (id, session_id, user_id, total) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+        conn.close()
+
+    def run(self, profile, path):
+        self.setup_db(profile, path)
+        begin = "BEGIN IMMEDIATE" if profile == 'production' else "BEGIN"
+        stop = threading.Event()
+        lock = threading.Lock()
+        write_ms, read_ms, errors = [], [], [0]
+        n_participants = self.opts['sessions'] * self.opts['students']
+
+        def writer(seed):
+            rng = random.Random(seed)
+            conn = self.connect(profile, path)
+            local = []
+            while not stop.is_set():
+                pid = rng.randrange(n_participants)
+                started = time.perf_counter()
+                try:
+                    # Shape of submit_answer: read the participant, bump progress and score.
+                    conn.execute(begin)
+                    conn.execute("SELECT progress, total_cards FROM participant WHERE id = ?", (pid,)).fetchone()
+                    conn.execute("UPDATE participant SET progress = progress + 1 WHERE id = ?", (pid,))
+                    conn.execute("UPDATE submission SET score = score + 1 WHERE id = ?", (pid,))
+                    conn.execute("COMMIT")
+                    local.append((time.perf_counter() - started) * 1000)
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    with lock:
+                        errors[0] += 1
+            conn.close()
+            with lock:
+                write_ms.extend(local)
+
+        def reader(seed):
+            rng = random.Random(seed)
+            conn = self.connect(profile, path)
+            if profile == 'production':
+                conn.execute("PRAGMA query_only=ON")
+            local = []
+            while not stop.is_set():
+                session = rng.randrange(self.opts['sessions'])
+                started = time.perf_counter()
+                try:
+                    # Shape of get_participants / get_session_status.
+                    conn.execute(
+                        "SELECT p.id, p.progress, p.total_cards, u.username FROM participant p "
+                        "JOIN user u ON u.id = p.user_id WHERE p.session_id = ?", (session,)
+                    ).fetchall()
+                    local.append((time.perf_counter() - started) * 1000)
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+            conn.close()
+            with lock:
+                read_ms.extend(local)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(self.opts['writers'])]
+        threads += [threading.Thread(target=reader, args=(1000 + i,)) for i in range(self.opts['readers'])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(self.opts['seconds'])
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'elapsed': elapsed,
+            'writes': len(write_ms),
+            'reads': len(read_ms),
+            'errors': errors[0],
+            'w50': statistics.median(write_ms) if write_ms else float('nan'),
+            'w99': percentile(write_ms, 0.99),
+            'wmax': max(write_ms, default=float('nan')),
+            'r99': percentile(read_ms, 0.99),
+        }
@@ -0,0 +1,124 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = ("Time the first requests a fresh worker serves, cold versus after warmup.warm_up(). "
+            "Every round starts new processes against a scratch SQLite file using the current "
+            "FLIPIQ_DB_PROFILE.")
+    # System checks load the URLconf, which would warm the 'cold' worker.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5, help="Fresh processes per mode")
+        parser.add_argument('--students', type=int, default=30, help="Students in the live session")
+        parser.add_argument('--cards', type=int, default=20)
+        # Internal: run as one measured worker
+        parser.add_argument('--worker', choices=['cold', 'warm'], help="(internal)")
+        parser.add_argument('--db', help="(internal)")
+        parser.add_argument('--plan', help="(internal)")
+
+    def handle(self, *args, **opts):
+        if opts['worker']:
+            return self.worker(opts)
+
+        results = {'cold': [], 'warm': []}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            connection.close()
+            self.use_database(path)
+            call_command('migrate', verbosity=0)
+            plan = json.dumps(self.seed(opts))
+            connection.close()
+            for _ in range(opts['rounds']):
+                for mode in results:
+                    out = subprocess.run(
+                        [sys.executable, sys.argv[0], 'bench_warmup', '--worker', mode, '--db', path, '--plan', plan],
+                        capture_output=True, text=True,
+                    )
+                    if out.returncode:
+                        raise CommandError(f"{mode} worker failed:\n{out.stderr}")
+                    results[mode].append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+        labels = [label for label, _, _ in json.loads(plan)]
+        median = lambda mode, key: statistics.median(r[key] for r in results[mode])
+        self.stdout.write(f"{'first request':<22} {'cold':>9} {'warm':>9}")
+        for label in labels:
+            self.stdout.write(f"{label:<22} {median('cold', label):>7.1f}ms {median('warm', label):>7.1f}ms")
+        self.stdout.write(f"{'total':<22} {median('cold', 'total'):>7.1f}ms {median('warm', 'total'):>7.1f}ms")
+        self.stdout.write(f"Warm-up itself took {median('warm', 'warmup'):.1f}ms (median of {opts['rounds']}), "
+                          f"before the worker took requests.")
+
+    def seed(self, opts):
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+
+        from FlipIQ_APP import provisioning
+        from FlipIQ_APP.models import Card, Deck, Participant, Profile, Session
+
+        host = User.objects.create(username='bench-host')
+        Profile.objects.create(user=host, role=Profile.ROLE_TEACHER)
+        deck = Deck.objects.create(title='Bench', owner=host, visibility='public')
+        Card.objects.bulk_create([
+            Card(deck=deck, front=f'Q{i}', back='a', choices=['a', 'b', 'c', 'd']) for i in range(opts['cards'])
+        ])
+        idle = Deck.objects.bulk_create([Deck(title=f'Public {i}', owner=host, visibility='public') for i in range(40)])
+        students = User.objects.bulk_create([User(username=f'bench-student-{i}') for i in range(opts['students'])])
+        Profile.objects.bulk_create([Profile(user=u, role=Profile.ROLE_STUDENT) for u in students])
+        session = Session.objects.create(deck=deck, host=host)
+        Participant.objects.bulk_create([Participant(session=session, user=u) for u in students])
+        provisioning.provision_session(session)
+        Session.objects.filter(id=session.id).update(is_started=True, started_at=timezone.now())
+
+        def login(user):
+            client = Client()
+            client.force_login(user)
+            return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        student, teacher = login(students[0]), login(host)
+        # (label, path, session cookie) in the order a room reconnects after a deploy
+        return [
+            ('play_deck', f'/deck/{deck.id}/play/{session.id}/', student),
+            ('live report', f'/deck/{deck.id}/report/{session.id}/', teacher),
+            ('control panel', f'/deck/{idle[0].id}/', teacher),
+            ('session status', f'/deck/{deck.id}/status/', teacher),
+            ('leaderboard', f'/deck/{deck.id}/leaderboard/{session.id}/', student),
+            ('home', '/', student),
+        ]
+
+    def use_database(self, path):
+        # The production profile's read replica is another connection to the same file.
+        same_file = connections.settings['default']['NAME']
+        for alias, options in connections.settings.items():
+            if options['NAME'] == same_file:
+                options['NAME'] = path
+
+    def worker(self, opts):
+        self.use_database(opts['db'])
+        timings = {}
+        if opts['worker'] == 'warm':
+            from FlipIQ_APP import warmup
+            began = time.perf_counter()
+            warmup.warm_up()
+            timings['warmup'] = (time.perf_counter() - began) * 1000
+
+        for label, path, cookie in json.loads(opts['plan']):
+            client = Client(HTTP_HOST='localhost')
+            client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+            began = time.perf_counter()
+            response = client.get(path)
+            timings[label] = (time.perf_counter() - began) * 1000
+            assert response.status_code == 200, (label, response.status_code)
+        timings['total'] = sum(v for k, v in timings.items() if k != 'warmup')
+        self.stdout.write(json.dumps(timings))
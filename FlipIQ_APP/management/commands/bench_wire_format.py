@@ -0,0 +1,55 @@
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from FlipIQ_APP import wire
+
+
+class Command(BaseCommand):
+    help = ("Compare plain JSON with the compact wire format (FlipIQ_APP/wire.py) for the student-side "
+            "payloads: bytes on the wire, raw and gzipped, and time to parse them back into objects.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100, help="Participants in the roster poll")
+        parser.add_argument('--cards', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=200, help="Parses timed per payload")
+
+    def handle(self, *args, **opts):
+        payloads = {
+            'answer': {"success": True, "is_correct": True, "progress": 7, "total": 20, "score": 5},
+            'session_status': {"is_started": False, "active": True},
+            'roster': {
+                "participants": [{"name": f"Student {i}", "status": ('online', 'offline')[i % 5 == 0]}
+                                 for i in range(opts['students'])],
+                "count": opts['students'],
+            },
+            'cards': {"cards": [
+                {"id": 1000 + i, "front": f"What is {i} + {i}?", "back": str(2 * i),
+                 "choices": [str(2 * i), str(2 * i + 1), str(2 * i - 1), str(i)]}
+                for i in range(opts['cards'])
+            ]},
+        }
+
+        self.stdout.write(f"{'payload':<15} {'json':>8} {'compact':>8} {'gz json':>8} {'gz cmp':>8} "
+                          f"{'parse json':>11} {'parse cmp':>10} {'+decode':>9}")
+        for schema, data in payloads.items():
+            fields = wire.SCHEMAS[schema]
+            plain = json.dumps(data).encode()
+            compact = json.dumps(wire.encode(fields, data)).encode()
+            assert wire.decode(fields, json.loads(compact)) == data
+            plain_us = self.time_parse(lambda: json.loads(plain), opts['repeat'])
+            compact_us = self.time_parse(lambda: json.loads(compact), opts['repeat'])
+            decoded_us = self.time_parse(lambda: wire.decode(fields, json.loads(compact)), opts['repeat'])
+            self.stdout.write(
+                f"{schema:<15} {len(plain):>7}B {len(compact):>7}B {len(gzip.compress(plain)):>7}B "
+                f"{len(gzip.compress(compact)):>7}B {plain_us:>9.1f}us {compact_us:>8.1f}us {decoded_us:>7.1f}us"
+            )
+        self.stdout.write("+decode: parsing plus turning the compact form back into plain objects, as wire.js does.")
+
+    def time_parse(self, fn, repeat):
+        began = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - began) / repeat * 1_000_000
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from FlipIQ_APP.roster import CHUNK_SIZE, import_roster
+
+
+class Command(BaseCommand):
+    help = "Create student accounts (User + Profile) in bulk from a roster CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="CSV with username,password[,first_name,last_name,email] columns")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Processes used for password hashing (default: CPU count)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                            help="Rows hashed and inserted per batch")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8-sig") as f:
+                report = import_roster(f, workers=options["workers"], chunk_size=options["chunk_size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report.created}, skipped {report.skipped}, duplicates {report.duplicates}"
+        ))
@@ -0,0 +1,279 @@
+import json
+import random
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from FlipIQ_APP.models import ActivityEntry, Card, Deck, Profile, Session, Submission
+
+SUBJECTS = ['Math', 'Science', 'English', 'History', 'Geography', 'Filipino', 'Music', 'Other']
+GRADES = ['Grade 7', 'Grade 8', 'Grade 9', 'Grade 10', 'Grade 11', 'Grade 12', 'N/A']
+INTERVALS = ['10 secs', '15 secs', '20 secs', '30 secs', '1 min']
+SEED_PASSWORD = 'flipiq-seed'
+
+
+def spread(total, weights):
+    """Split ``total`` into integer parts proportional to ``weights`` (largest remainder)."""
+    scale = sum(weights) or 1
+    exact = [total * w / scale for w in weights]
+    parts = [int(x) for x in exact]
+    short = total - sum(parts)
+    for i in sorted(range(len(weights)), key=lambda i: exact[i] - parts[i], reverse=True)[:short]:
+        parts[i] += 1
+    return parts
+
+
+def draw_weights(rng, n, distribution):
+    if distribution == 'uniform':
+        return [1.0] * n
+    if distribution == 'zipf':
+        ranks = list(range(1, n + 1))
+        rng.shuffle(ranks)
+        return [1.0 / r for r in ranks]
+    return [rng.lognormvariate(0, 1) for _ in range(n)]
+
+
+def next_id(model):
+    return (model.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = "Generate a large, deterministic dataset for benchmarking and capacity planning."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--decks', type=int, default=20_000)
+        parser.add_argument('--cards', type=int, default=2_000_000)
+        parser.add_argument('--sessions', type=int, default=200_000)
+        parser.add_argument('--submissions', type=int, default=5_000_000)
+        parser.add_argument('--teacher-ratio', type=float, default=0.05,
+                            help="Fraction of users that are teachers (deck owners and session hosts)")
+        parser.add_argument('--public-ratio', type=float, default=0.6,
+                            help="Fraction of decks that are public")
+        parser.add_argument('--deck-size-dist', choices=['uniform', 'lognormal', 'zipf'], default='lognormal',
+                            help="How cards are spread over decks")
+        parser.add_argument('--activity-dist', choices=['uniform', 'lognormal', 'zipf'], default='lognormal',
+                            help="How submissions are spread over students")
+        parser.add_argument('--school', default='',
+                            help="School slug for every seeded profile; `manage.py tenants extract` can then "
+                                 "move them to their own database")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5_000,
+                            help="Rows per bulk_create statement")
+        parser.add_argument('--transaction-size', type=int, default=200_000,
+                            help="Rows committed per transaction")
+
+    def handle(self, *args, **opts):
+        self.opts = opts
+        self.rng = random.Random(opts['seed'])
+        self.prefix = f"seed{opts['seed']}_"
+
+        if opts['users'] < 2 or opts['decks'] < 1 or opts['sessions'] > 10 ** 6:
+            raise CommandError("Need at least 2 users and 1 deck, and at most 1,000,000 sessions (6-digit codes).")
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f"Users with prefix '{self.prefix}' already exist; pick another --seed.")
+
+        # SQLite won't change these inside a transaction (e.g. when called from a test).
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            with connection.cursor() as cursor:
+                # Bulk-load settings for this connection only; durability comes back on the next connection.
+                cursor.execute("PRAGMA synchronous=OFF")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA cache_size=-262144")
+
+        self.started_at = timezone.now()
+        self.now = connection.ops.adapt_datetimefield_value(self.started_at)
+        started = time.perf_counter()
+        total = 0
+        total += self.seed_users()
+        total += self.seed_decks()
+        total += self.seed_cards()
+        total += self.seed_sessions()
+        total += self.seed_submissions()
+        total += self.seed_activity()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {total:,} rows in {elapsed:.1f}s ({total / elapsed * 60:,.0f} rows/min)"
+        ))
+
+    # ----- helpers -----
+
+    def defaults(self, model, fields):
+        """
+        ``(columns, values)`` for the columns of ``model`` not in ``fields``, filled
+        the way ``save()`` would: the field's default, the start time for
+        ``auto_now``/``auto_now_add``, or NULL. Each value is prepared once per
+        table, not per row. A new column without any of those stops the seed
+        here, by name, rather than failing mid-INSERT.
+        """
+        given = {model._meta.get_field(f).column for f in fields}
+        columns, values = [], []
+        for field in model._meta.concrete_fields:
+            if field.column in given or field is model._meta.auto_field:
+                continue
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                value = self.started_at
+            elif field.has_default() or field.null:
+                value = field.get_default()
+            else:
+                raise CommandError(f"seed_scale doesn't fill {model.__name__}.{field.name}, which has no default.")
+            columns.append(connection.ops.quote_name(field.column))
+            values.append(field.get_db_prep_save(value, connection))
+        return columns, tuple(values)
+
+    def insert(self, model, fields, rows):
+        """
+        Insert ``rows`` (tuples matching ``fields``) with batched ``executemany`` calls,
+        committing every --transaction-size rows. Plain tuples skip the per-field
+        value preparation that dominates ``bulk_create`` at this volume; every
+        other column gets its model default (see :meth:`defaults`).
+        """
+        batch_size, txn_size = self.opts['batch_size'], self.opts['transaction_size']
+        table = connection.ops.quote_name(model._meta.db_table)
+        extra_columns, extra = self.defaults(model, fields)
+        columns = [connection.ops.quote_name(model._meta.get_field(f).column) for f in fields] + extra_columns
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+        batches_per_txn = max(1, txn_size // batch_size)
+        rows = iter(rows)
+        count = 0
+        started = time.perf_counter()
+        done = False
+        while not done:
+            with transaction.atomic(), connection.cursor() as cursor:
+                for _ in range(batches_per_txn):
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        done = True
+                        break
+                    cursor.executemany(sql, [row + extra for row in batch] if extra else batch)
+                    count += len(batch)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {model.__name__:<11} {count:>10,} rows  {elapsed:6.1f}s")
+        return count
+
+    # ----- tables -----
+
+    def seed_users(self):
+        n, rng = self.opts['users'], self.rng
+        hashed = make_password(SEED_PASSWORD)  # hashed once, shared by every seeded account
+        self.user_start = next_id(User)
+        self.user_ids = range(self.user_start, self.user_start + n)
+        teachers = max(1, int(n * self.opts['teacher_ratio']))
+        self.teacher_ids = self.user_ids[:teachers]
+        self.student_ids = self.user_ids[teachers:]
+
+        now = self.now
+        users = (
+            (uid, f"{self.prefix}{uid}", hashed, f"First{uid}", f"Last{rng.randrange(10_000)}", '', now)
+            for uid in self.user_ids
+        )
+        count = self.insert(User, ['id', 'username', 'password', 'first_name', 'last_name', 'email',
+                                   'date_joined'], users)
+        school = self.opts['school']
+        profiles = (
+            (uid, Profile.ROLE_TEACHER if uid < self.teacher_ids.stop else Profile.ROLE_STUDENT, school)
+            for uid in self.user_ids
+        )
+        return count + self.insert(Profile, ['user', 'role', 'school'], profiles)
+
+    def seed_decks(self):
+        n, rng = self.opts['decks'], self.rng
+        start = next_id(Deck)
+        self.deck_ids = range(start, start + n)
+        self.deck_owner = [rng.choice(self.teacher_ids) for _ in self.deck_ids]
+        public_ratio = self.opts['public_ratio']
+        decks = (
+            (did, f"Deck {did}", self.deck_owner[i], rng.choice(INTERVALS), rng.choice(SUBJECTS),
+             rng.choice(GRADES), 'public' if rng.random() < public_ratio else 'private', self.now)
+            for i, did in enumerate(self.deck_ids)
+        )
+        return self.insert(Deck, ['id', 'title', 'owner', 'time_interval', 'subject', 'grade',
+                                  'visibility', 'created_at'], decks)
+
+    def seed_cards(self):
+        rng = self.rng
+        self.deck_sizes = spread(self.opts['cards'], draw_weights(rng, len(self.deck_ids), self.opts['deck_size_dist']))
+
+        def cards():
+            for did, size in zip(self.deck_ids, self.deck_sizes):
+                for j in range(size):
+                    answer = str(rng.randrange(100))
+                    choices = [answer, str(rng.randrange(100)), str(rng.randrange(100)), str(rng.randrange(100))]
+                    rng.shuffle(choices)
+                    yield did, f"Question {j + 1} of deck {did}", answer, json.dumps(choices)
+        return self.insert(Card, ['deck', 'front', 'back', 'choices'], cards())
+
+    def seed_sessions(self):
+        n, rng = self.opts['sessions'], self.rng
+        start = next_id(Session)
+        self.session_ids = range(start, start + n)
+        taken = set(Session.objects.values_list('code', flat=True))
+        codes = (c for c in rng.sample(range(10 ** 6), min(10 ** 6, n + len(taken))) if f"{c:06d}" not in taken)
+        # Popular decks get played more often
+        deck_index = rng.choices(range(len(self.deck_ids)), weights=[s + 1 for s in self.deck_sizes], k=n)
+        self.session_deck = [self.deck_ids[i] for i in deck_index]
+        sessions = (
+            (sid, self.session_deck[i], self.deck_owner[deck_index[i]], f"{next(codes):06d}", False, True)
+            for i, sid in enumerate(self.session_ids)
+        )
+        return self.insert(Session, ['id', 'deck', 'host', 'code', 'is_active', 'is_started'], sessions)
+
+    def seed_submissions(self):
+        rng = self.rng
+        students = self.student_ids or self.user_ids
+        sessions = len(self.session_ids)
+        # Each student plays a session at most once, so cap their share at the session count.
+        per_student = [min(k, sessions) for k in
+                       spread(self.opts['submissions'], draw_weights(rng, len(students), self.opts['activity_dist']))]
+        deck_size = dict(zip(self.deck_ids, self.deck_sizes))
+        now = self.now
+
+        def submissions():
+            for uid, k in zip(students, per_student):
+                for i in rng.sample(range(sessions), k):
+                    did = self.session_deck[i]
+                    total = deck_size[did]
+                    yield did, self.session_ids[i], uid, int(rng.random() * (total + 1)), total, now
+        return self.insert(Submission, ['deck', 'session', 'user', 'score', 'total', 'submission_time'],
+                           submissions())
+
+    def seed_activity(self):
+        """Profile feed rows: one per seeded deck, then one per seeded submission copied from its deck's row."""
+        decks = (
+            (self.deck_owner[i], ActivityEntry.KIND_CREATED, did, f"Deck {did}", f"{self.prefix}{self.deck_owner[i]}",
+             size, self.now)
+            for i, (did, size) in enumerate(zip(self.deck_ids, self.deck_sizes))
+        )
+        count = self.insert(ActivityEntry, ['user', 'kind', 'deck', 'deck_title', 'deck_owner', 'card_count',
+                                            'happened_at'], decks)
+
+        started = time.perf_counter()
+        table = connection.ops.quote_name(ActivityEntry._meta.db_table)
+        submissions = connection.ops.quote_name(Submission._meta.db_table)
+        extra_columns, extra = self.defaults(ActivityEntry, [
+            'user', 'kind', 'deck', 'submission', 'session', 'deck_title', 'deck_owner', 'card_count',
+            'score', 'total', 'happened_at',
+        ])
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, kind, deck_id, submission_id, session_id, deck_title, deck_owner,"
+                f" card_count, score, total, happened_at{''.join(', ' + c for c in extra_columns)})"
+                f" SELECT s.user_id, %s, s.deck_id, s.id, s.session_id, a.deck_title, a.deck_owner,"
+                f" a.card_count, s.score, s.total, s.submission_time{', %s' * len(extra)}"
+                f" FROM {submissions} s JOIN {table} a ON a.deck_id = s.deck_id AND a.kind = %s"
+                f" WHERE s.deck_id BETWEEN %s AND %s",
+                [ActivityEntry.KIND_PLAYED, *extra, ActivityEntry.KIND_CREATED,
+                 self.deck_ids.start, self.deck_ids.stop - 1],
+            )
+            played = cursor.rowcount
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {'(played)':<11} {played:>10,} rows  {elapsed:6.1f}s")
+        return count + played
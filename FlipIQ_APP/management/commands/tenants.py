@@ -0,0 +1,118 @@
+import json
+import sqlite3
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from FlipIQ_APP import tenancy
+from FlipIQ_APP.models import Deck, Profile, Session, Submission
+
+
+class Command(BaseCommand):
+    help = ("Manage per-school databases (see FlipIQ_APP/tenancy.py). Changes to tenants.json "
+            "take effect when the app servers restart; stop them before `move`.")
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest='action', required=True)
+        sub.add_parser('list', help="Schools with their own database, and their row counts")
+        sub.add_parser('migrate', help="Apply migrations to every school database")
+
+        extract = sub.add_parser('extract', help="Copy a school out of 'default' into its own database")
+        extract.add_argument('school')
+        extract.add_argument('--db', required=True, help="New SQLite file, relative to the project directory")
+        extract.add_argument('--host', action='append', default=[], help="Host name serving the school (repeatable)")
+        extract.add_argument('--delete-source', action='store_true',
+                             help="Then delete the school's users and their decks from 'default'")
+
+        move = sub.add_parser('move', help="Copy a school's database to a new file and point tenants.json at it")
+        move.add_argument('school')
+        move.add_argument('--db', required=True)
+
+    def handle(self, *args, **opts):
+        getattr(self, opts['action'])(opts)
+
+    # -- tenants.json ---------------------------------------------------
+
+    def load(self):
+        path = Path(settings.FLIPIQ_TENANTS_FILE)
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def save(self, tenants):
+        Path(settings.FLIPIQ_TENANTS_FILE).write_text(json.dumps(tenants, indent=2, sort_keys=True) + "\n")
+
+    def attach(self, alias, db):
+        """Make ``db`` usable as ``alias`` in this process, with the same options as 'default'."""
+        connections.settings[alias] = {**connections.settings['default'], 'NAME': settings.BASE_DIR / db}
+        return alias
+
+    # -- actions ----------------------------------------------------------
+
+    def list(self, opts):
+        tenants = self.load()
+        if not tenants:
+            self.stdout.write("Every school is on 'default'.")
+            return
+        self.stdout.write(f"{'school':<20} {'db':<32} {'users':>7} {'decks':>7} {'sessions':>9} {'answers':>9}  hosts")
+        for school, tenant in sorted(tenants.items()):
+            alias = self.attach(tenancy.PREFIX + school, tenant['db'])
+            counts = [m.objects.using(alias).count() for m in (User, Deck, Session, Submission)]
+            self.stdout.write(f"{school:<20} {tenant['db']:<32} {counts[0]:>7} {counts[1]:>7} {counts[2]:>9} "
+                              f"{counts[3]:>9}  {', '.join(tenant.get('hosts', []))}")
+
+    def migrate(self, opts):
+        for school, tenant in sorted(self.load().items()):
+            self.stdout.write(f"Migrating {school} ({tenant['db']})")
+            call_command('migrate', database=self.attach(tenancy.PREFIX + school, tenant['db']),
+                         verbosity=0, interactive=False)
+
+    def extract(self, opts):
+        school, db = opts['school'], opts['db']
+        tenants = self.load()
+        if school in tenants:
+            raise CommandError(f"{school} already has a database ({tenants[school]['db']}); use `move`.")
+        if (settings.BASE_DIR / db).exists():
+            raise CommandError(f"{db} already exists.")
+        if not Profile.objects.using('default').filter(school=school).exists():
+            raise CommandError(f"No users belong to {school}.")
+
+        (settings.BASE_DIR / db).parent.mkdir(parents=True, exist_ok=True)
+        alias = self.attach(tenancy.PREFIX + school, db)
+        call_command('migrate', database=alias, verbosity=0, interactive=False)
+        copied = tenancy.copy_school(school, 'default', alias)
+        for model, n in copied.items():
+            self.stdout.write(f"  {model:<16} {n:>8}")
+
+        tenants[school] = {'db': db, 'hosts': opts['host']}
+        self.save(tenants)
+
+        if opts['delete_source']:
+            Deck.objects.using('default').filter(owner__profile__school=school).delete()
+            User.objects.using('default').filter(profile__school=school).delete()
+            self.stdout.write("Deleted the school's users and decks from 'default'.")
+        self.stdout.write(self.style.SUCCESS(f"{school} now lives in {db}; restart the app servers."))
+
+    def move(self, opts):
+        school, db = opts['school'], opts['db']
+        tenants = self.load()
+        if school not in tenants:
+            raise CommandError(f"{school} has no database of its own; use `extract`.")
+        old, new = settings.BASE_DIR / tenants[school]['db'], settings.BASE_DIR / db
+        if new.exists():
+            raise CommandError(f"{db} already exists.")
+        new.parent.mkdir(parents=True, exist_ok=True)
+
+        # SQLite's online backup copies a consistent snapshot, WAL included.
+        src, dst = sqlite3.connect(old), sqlite3.connect(new)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+
+        tenants[school]['db'] = db
+        self.save(tenants)
+        self.stdout.write(self.style.SUCCESS(f"{school} copied to {db}; restart the app servers, then remove {old}."))
@@ -0,0 +1,26 @@
+"""
+Process-local counters for the performance features (load shedding, caches, ...).
+
+Cheap enough to bump on every request; read them back through the staff-only
+``/metrics/`` endpoint.
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def snapshot():
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,199 @@
+"""
+Admission control: shed load with ``429 Too Many Requests`` before a view runs.
+
+* A global cap on in-flight requests per worker (``FLIPIQ_MAX_CONCURRENT_REQUESTS``).
+* Token buckets per client and per room for the hot endpoints
+  (``FLIPIQ_RATE_LIMITS``), kept in-process or, with
+  ``FLIPIQ_RATE_LIMIT_BACKEND = 'cache'``, as fixed-window counters in the
+  shared live-state store so every worker sees the same budget.
+
+``user`` buckets belong to the signed-in user, so a school behind one NAT
+address doesn't share a single bucket (anonymous requests fall back to the
+session cookie, or IP). Looking the user up costs the queries the view makes
+anyway; ``client`` buckets skip it and go by cookie or IP alone, for views
+that answer without touching the database.
+Rooms are live sessions: the ``session_id`` (or join ``code``) in the URL,
+or for ``submit_answer`` the ``session_id`` in its JSON body, so two classes
+playing the same deck don't throttle each other. User and room keys carry
+the school's database alias, since ids repeat across databases.
+
+Rules are checked at startup (:func:`check_rate_limits`): every rate must be
+positive and every burst at least one request.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.http import JsonResponse
+
+from . import metrics, tenancy
+from .live_state import store
+
+# url_name -> {"user" or "client": (tokens/sec, burst), "room": (tokens/sec, burst)}
+DEFAULT_RATE_LIMITS = {
+    'join_by_code': {'user': (1, 5)},
+    'submit_answer': {'user': (4, 10), 'room': (500, 2000)},
+    'publish_deck': {'user': (1, 5)},
+    'typeahead': {'client': (10, 20)},  # served from memory, no user lookup
+    # polling endpoints (clients poll every 3-5s)
+    'get_session_status': {'user': (2, 6)},
+    'get_participants': {'user': (2, 6), 'room': (400, 1000)},
+    'check_session_status': {'user': (2, 6)},
+    'heartbeat': {'user': (2, 6)},
+    'host_overview_data': {'user': (2, 6)},
+    'session_leaderboard': {'user': (2, 6), 'room': (400, 1000)},
+}
+MAX_TRACKED_BUCKETS = 50_000
+SCOPES = ('user', 'client', 'room')
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """Consume a token; return 0 if allowed, else seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class LocalLimiter:
+    """In-process token buckets, LRU-capped so idle clients don't accumulate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def hit(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+                if len(self._buckets) > MAX_TRACKED_BUCKETS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+class CacheLimiter:
+    """Fixed-window counters in the shared store: ``burst`` requests per ``burst / rate`` seconds."""
+
+    def hit(self, key, rate, burst):
+        window = max(1, math.ceil(burst / rate))
+        now = time.time()
+        slot = int(now // window)
+        cache_key = f"ratelimit:{key}:{slot}"
+        cache = store()
+        cache.add(cache_key, 0, timeout=window + 1)
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:  # expired between add() and incr()
+            cache.set(cache_key, 1, timeout=window + 1)
+            count = 1
+        if count <= burst:
+            return 0
+        return (slot + 1) * window - now
+
+
+@checks.register()
+def check_rate_limits(app_configs=None, **kwargs):
+    errors = []
+    for name, rule in {**DEFAULT_RATE_LIMITS, **getattr(settings, 'FLIPIQ_RATE_LIMITS', {})}.items():
+        for scope, limit in rule.items():
+            try:
+                rate, burst = limit
+                valid = scope in SCOPES and rate > 0 and burst >= 1
+            except (TypeError, ValueError):
+                valid = False
+            if not valid:
+                errors.append(checks.Error(
+                    f"FLIPIQ_RATE_LIMITS[{name!r}][{scope!r}] is {limit!r}.",
+                    hint=f"Use one of {', '.join(SCOPES)} with (tokens per second > 0, burst >= 1).",
+                    id='FlipIQ_APP.E002',
+                ))
+    return errors
+
+
+def too_many_requests(retry_after, reason):
+    seconds = max(1, math.ceil(retry_after))
+    response = JsonResponse(
+        {"success": False, "error": "Too many requests, please retry shortly.", "reason": reason},
+        status=429,
+    )
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def room_of(request, view_kwargs):
+    """The live session a request belongs to, or None if it doesn't say."""
+    room = view_kwargs.get('session_id') or view_kwargs.get('code')
+    if room is not None or request.content_type != 'application/json':
+        return room
+    try:
+        return int(json.loads(request.body)['session_id'])  # the view reads the cached body again
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        limit = getattr(settings, 'FLIPIQ_MAX_CONCURRENT_REQUESTS', 64)
+        self.slots = threading.BoundedSemaphore(limit) if limit else None
+        self.rules = {**DEFAULT_RATE_LIMITS, **getattr(settings, 'FLIPIQ_RATE_LIMITS', {})}
+        backend = getattr(settings, 'FLIPIQ_RATE_LIMIT_BACKEND', 'local')
+        self.limiter = CacheLimiter() if backend == 'cache' else LocalLimiter()
+
+    def __call__(self, request):
+        if self.slots is None:
+            return self.get_response(request)
+        if not self.slots.acquire(blocking=False):
+            metrics.incr('admission.shed.concurrency')
+            return too_many_requests(1, 'concurrency')
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = request.resolver_match.url_name if request.resolver_match else None
+        rule = self.rules.get(name)
+        if not rule:
+            return None
+
+        client = request.COOKIES.get(settings.SESSION_COOKIE_NAME) or request.META.get('REMOTE_ADDR', '')
+        room = room_of(request, view_kwargs) if 'room' in rule else None
+        db = tenancy.scope()
+        limits = []
+        if 'user' in rule:
+            user = getattr(request, 'user', None)
+            who = f"{db}-{user.id}" if user is not None and user.is_authenticated else client
+            limits.append((f"{name}:user:{who}", rule['user']))
+        if 'client' in rule:
+            limits.append((f"{name}:client:{client}", rule['client']))
+        if 'room' in rule and room is not None:
+            limits.append((f"{name}:room:{db}-{room}", rule['room']))
+
+        for key, (rate, burst) in limits:
+            wait = self.limiter.hit(key, rate, burst)
+            if wait:
+                scope = key.split(':')[1]
+                metrics.incr(f'admission.shed.{name}.{scope}')
+                return too_many_requests(wait, f'{name}:{scope}')
+        metrics.incr(f'admission.admitted.{name}')
+        return None
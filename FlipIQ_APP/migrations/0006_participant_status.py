@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0005_session_is_started'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='status',
+            field=models.CharField(choices=[('online', 'Online'), ('idle', 'Idle'), ('offline', 'Offline')], default='online', max_length=10),
+        ),
+    ]
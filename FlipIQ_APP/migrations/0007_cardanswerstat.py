@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0006_participant_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardAnswerStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choice', models.CharField(blank=True, max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_stats', to='FlipIQ_APP.card')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('card', 'choice'), name='unique_card_choice_stat')],
+            },
+        ),
+    ]
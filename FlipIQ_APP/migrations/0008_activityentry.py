@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Build feed rows for decks and submissions that predate the feed."""
+    Deck = apps.get_model('FlipIQ_APP', 'Deck')
+    Submission = apps.get_model('FlipIQ_APP', 'Submission')
+    ActivityEntry = apps.get_model('FlipIQ_APP', 'ActivityEntry')
+    db = schema_editor.connection.alias
+
+    decks = {}
+    rows = (
+        Deck.objects.using(db).annotate(card_count=models.Count('cards'))
+        .values_list('id', 'owner_id', 'title', 'owner__username', 'card_count', 'created_at')
+    )
+    batch = []
+    for deck_id, owner_id, title, owner, card_count, created_at in rows.iterator():
+        decks[deck_id] = (title, owner, card_count)
+        batch.append(ActivityEntry(user_id=owner_id, kind='created', deck_id=deck_id, deck_title=title,
+                                   deck_owner=owner, card_count=card_count, happened_at=created_at))
+    ActivityEntry.objects.using(db).bulk_create(batch, batch_size=1000)
+
+    batch = []
+    rows = Submission.objects.using(db).values_list('id', 'user_id', 'deck_id', 'session_id', 'score', 'total',
+                                                    'submission_time')
+    for sub_id, user_id, deck_id, session_id, score, total, when in rows.iterator():
+        title, owner, card_count = decks[deck_id]
+        batch.append(ActivityEntry(user_id=user_id, kind='played', deck_id=deck_id, submission_id=sub_id,
+                                   session_id=session_id, deck_title=title, deck_owner=owner,
+                                   card_count=card_count, score=score, total=total, happened_at=when))
+        if len(batch) >= 1000:
+            ActivityEntry.objects.using(db).bulk_create(batch)
+            batch = []
+    ActivityEntry.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0007_cardanswerstat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('played', 'Played'), ('created', 'Created')], max_length=10)),
+                ('deck_title', models.CharField(max_length=255)),
+                ('deck_owner', models.CharField(max_length=150)),
+                ('card_count', models.IntegerField(default=0)),
+                ('score', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('happened_at', models.DateTimeField()),
+                ('deck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='FlipIQ_APP.deck')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='FlipIQ_APP.session')),
+                ('submission', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='FlipIQ_APP.submission')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', '-happened_at'], name='activity_feed_idx')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
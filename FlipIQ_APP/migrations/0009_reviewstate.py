@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0008_activityentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.PositiveIntegerField(default=0)),
+                ('ease', models.PositiveSmallIntegerField(default=2500)),
+                ('reps', models.PositiveSmallIntegerField(default=0)),
+                ('lapses', models.PositiveSmallIntegerField(default=0)),
+                ('due_at', models.DateTimeField()),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to='FlipIQ_APP.card')),
+                ('deck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to='FlipIQ_APP.deck')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'due_at'], name='review_due_idx'), models.Index(fields=['user', 'deck', 'due_at'], name='review_deck_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'card'), name='unique_review_state')],
+            },
+        ),
+    ]
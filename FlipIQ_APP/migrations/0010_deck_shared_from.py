@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0009_reviewstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deck',
+            name='shared_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='clones', to='FlipIQ_APP.deck'),
+        ),
+    ]
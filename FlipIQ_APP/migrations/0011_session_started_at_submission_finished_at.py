@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0010_deck_shared_from'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_participants(apps, schema_editor):
+    """Keep the furthest-along row when a student was recorded twice in one session."""
+    Participant = apps.get_model('FlipIQ_APP', 'Participant')
+    db = schema_editor.connection.alias
+    dupes = (
+        Participant.objects.using(db).values('session_id', 'user_id')
+        .annotate(n=models.Count('id')).filter(n__gt=1)
+    )
+    for row in list(dupes):
+        rows = Participant.objects.using(db).filter(session_id=row['session_id'], user_id=row['user_id'])
+        keep = rows.order_by('-progress', 'id').values_list('id', flat=True).first()
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0011_session_started_at_submission_finished_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='auditorium',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(drop_duplicate_participants, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='participant',
+            constraint=models.UniqueConstraint(fields=('session', 'user'), name='unique_participant'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0012_session_auditorium_unique_participant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='school',
+            field=models.SlugField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def stats_to_card_deck(apps, schema_editor):
+    # Until now a clone's answers were counted on its source's cards; they stay with the source.
+    Card = apps.get_model('FlipIQ_APP', 'Card')
+    CardAnswerStat = apps.get_model('FlipIQ_APP', 'CardAnswerStat')
+    CardAnswerStat.objects.using(schema_editor.connection.alias).update(
+        deck_id=Subquery(Card.objects.filter(id=OuterRef('card_id')).values('deck_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FlipIQ_APP', '0014_sessiontraceevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardanswerstat',
+            name='deck',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answer_stats', to='FlipIQ_APP.deck'),
+        ),
+        migrations.RunPython(stats_to_card_deck, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cardanswerstat',
+            name='deck',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_stats', to='FlipIQ_APP.deck'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='cardanswerstat',
+            name='unique_card_choice_stat',
+        ),
+        migrations.AddConstraint(
+            model_name='cardanswerstat',
+            constraint=models.UniqueConstraint(fields=('deck', 'card', 'choice'), name='unique_deck_card_choice_stat'),
+        ),
+    ]
@@ -17,10 +17,21 @@ class Deck(models.Model):
     grade = models.CharField(max_length=20, default='N/A')
     visibility = models.CharField(max_length=10, choices=VISIBILITY_CHOICES, default='private')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on clones: their cards are read from this deck until the first card
+    # edit gives them their own copy (see cloning.py).
+    shared_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='clones')
 
     def __str__(self):
         return f"{self.title} ({self.owner.username})"
 
+    @property
+    def card_source_id(self):
+        return self.shared_from_id or self.id
+
+    def get_cards(self):
+        """This deck's cards, shared or not. Read cards through this rather than ``deck.cards``."""
+        return Card.objects.filter(deck_id=self.card_source_id)
+
 
 class Card(models.Model):
     deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name='cards')
@@ -32,6 +43,27 @@ class Card(models.Model):
         return f"Card {self.id} - {self.front[:30]}"
 
 
+class CardAnswerStat(models.Model):
+    """
+    Running answer counts for one choice on one card, as played in one deck
+    (see analytics.py). A clone plays its source's cards, so the deck keeps
+    each deck's results apart.
+    """
+    deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name='answer_stats')
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name='answer_stats')
+    choice = models.CharField(max_length=255, blank=True)  # '' = timed out without answering
+    count = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['deck', 'card', 'choice'], name='unique_deck_card_choice_stat'),
+        ]
+
+    def __str__(self):
+        return f"Card {self.card_id} - {self.choice!r}: {self.count}"
+
+
 class Profile(models.Model):
     ROLE_TEACHER = 'teacher'
     ROLE_STUDENT = 'student'
@@ -42,6 +74,8 @@ class Profile(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    # School / organisation slug; decides which database holds the user's data (see tenancy.py).
+    school = models.SlugField(max_length=50, blank=True, default='')
 
     def __str__(self) -> str:
         return f"{self.user.username} ({self.role})"
@@ -54,6 +88,9 @@ class Session(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_started = models.BooleanField(default=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Large-room mode: buffered joins, paginated rosters, histogram for the host (see auditorium.py).
+    auditorium = models.BooleanField(default=False)
 
     def save(self, *args, **kwargs):
         if not self.code:
@@ -71,6 +108,14 @@ class Submission(models.Model):
     score = models.IntegerField(default=0)
     total = models.IntegerField(default=0)
     submission_time = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)  # set when the last card is answered
+    # Lets leaderboards reload only what changed (see leaderboard.py); ``.update()`` must set it too.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', 'updated_at'], name='submission_session_updated_idx'),
+        ]
 
     def percentage(self):
         return round((self.score / self.total) * 100, 1) if self.total > 0 else 0
@@ -80,7 +125,118 @@ class Submission(models.Model):
 
 
 class Participant(models.Model):
+    STATUS_CHOICES = [
+        ('online', 'Online'),
+        ('idle', 'Idle'),
+        ('offline', 'Offline'),
+    ]
+
     session = models.ForeignKey(Session, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     progress = models.IntegerField(default=0)
     total_cards = models.IntegerField(default=0)
+    # Last presence state seen by the host; only written when it changes (see presence.py).
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='online')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'user'], name='unique_participant'),
+        ]
+
+
+class ActivityEntry(models.Model):
+    """
+    One line of a user's profile feed: a deck they played or a deck they created.
+    Deck title, owner and card count are copied in so the feed renders from this
+    table alone; activity.py and signals.py keep the copies current.
+    """
+    KIND_PLAYED = 'played'
+    KIND_CREATED = 'created'
+    KIND_CHOICES = [
+        (KIND_PLAYED, 'Played'),
+        (KIND_CREATED, 'Created'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name='activity')
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, null=True, blank=True,
+                                      related_name='activity')
+    session = models.ForeignKey(Session, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    deck_title = models.CharField(max_length=255)
+    deck_owner = models.CharField(max_length=150)
+    card_count = models.IntegerField(default=0)
+    score = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    happened_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'kind', '-happened_at'], name='activity_feed_idx'),
+        ]
+
+    def percentage(self):
+        return round((self.score / self.total) * 100, 1) if self.total > 0 else 0
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.deck_title}"
+
+
+class ReviewState(models.Model):
+    """A student's self-study schedule for one card (SM-2, see srs.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_states')
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name='review_states')
+    deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name='review_states')
+    interval = models.PositiveIntegerField(default=0)       # days
+    ease = models.PositiveSmallIntegerField(default=2500)   # ease factor x 1000
+    reps = models.PositiveSmallIntegerField(default=0)      # successful reviews in a row
+    lapses = models.PositiveSmallIntegerField(default=0)
+    due_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'card'], name='unique_review_state'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='review_due_idx'),
+            models.Index(fields=['user', 'deck', 'due_at'], name='review_deck_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} card {self.card_id} due {self.due_at:%Y-%m-%d}"
+
+
+class SessionTraceEvent(models.Model):
+    """
+    One moment in a live session's timeline, appended in batches by trace.py.
+    Never updated. No database constraints on the references, so a late flush
+    still lands after the session or student is gone.
+    """
+    KIND_JOIN = 'join'
+    KIND_START = 'start'
+    KIND_PLAY = 'play'
+    KIND_ANSWER = 'answer'
+    KIND_RTT = 'rtt'
+    KIND_FINISH = 'finish'
+    KIND_CHOICES = [
+        (KIND_JOIN, 'Joined'),
+        (KIND_START, 'Host started'),
+        (KIND_PLAY, 'Play screen rendered'),
+        (KIND_ANSWER, 'Answer handled'),
+        (KIND_RTT, 'Answer round trip'),
+        (KIND_FINISH, 'Finished'),
+    ]
+
+    session = models.ForeignKey(Session, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    at = models.DateTimeField()
+    ms = models.FloatField(null=True)  # wait or latency, depending on kind
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', 'at'], name='trace_session_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} {self.kind} {self.user_id}"
@@ -0,0 +1,93 @@
+"""
+Participant presence from heartbeats, kept in the live-state store.
+
+Every student request that proves the tab is still open records a heartbeat
+under ``(session_id, user_id)`` with a TTL, so nothing is written to the
+database per poll. Hosts read the state back as online / idle / offline and
+only persist ``Participant.status`` when it actually changes.
+"""
+import time
+
+from django.conf import settings
+
+from . import tenancy
+from .live_state import store
+from .models import Participant
+
+ONLINE = 'online'
+IDLE = 'idle'
+OFFLINE = 'offline'
+
+# Seen within ONLINE_SECONDS -> online, within IDLE_SECONDS -> idle, else offline.
+ONLINE_SECONDS = getattr(settings, 'FLIPIQ_PRESENCE_ONLINE_SECONDS', 10)
+IDLE_SECONDS = getattr(settings, 'FLIPIQ_PRESENCE_IDLE_SECONDS', 60)
+
+
+def _key(session_id, user_id):
+    return f"presence:{tenancy.scope()}:{session_id}:{user_id}"
+
+
+def heartbeat(session_id, user_id):
+    store().set(_key(session_id, user_id), time.time(), timeout=IDLE_SECONDS)
+
+
+def forget(session_id, user_id):
+    store().delete(_key(session_id, user_id))
+
+
+def state_for(last_seen, now):
+    if last_seen is None:
+        return OFFLINE
+    age = now - last_seen
+    if age <= ONLINE_SECONDS:
+        return ONLINE
+    if age <= IDLE_SECONDS:
+        return IDLE
+    return OFFLINE
+
+
+def states(session_id, user_ids):
+    """Return ``{user_id: state}`` for the given participants in one cache round-trip."""
+    keys = {_key(session_id, uid): uid for uid in user_ids}
+    seen = store().get_many(list(keys))
+    now = time.time()
+    return {uid: state_for(seen.get(key), now) for key, uid in keys.items()}
+
+
+def online_counts(members):
+    """``{session_id: participants online}`` for ``(session_id, user_id)`` pairs, in one cache round-trip."""
+    keys = {_key(session_id, user_id): session_id for session_id, user_id in members}
+    seen = store().get_many(list(keys))
+    now = time.time()
+    counts = {}
+    for key, session_id in keys.items():
+        if state_for(seen.get(key), now) == ONLINE:
+            counts[session_id] = counts.get(session_id, 0) + 1
+    return counts
+
+
+def sync_statuses(session_id, rows):
+    """
+    ``rows`` are ``(participant_id, user_id, stored_status)``. Returns
+    ``{participant_id: state}`` and writes back to the DB only the rows whose
+    state changed since the last poll (one UPDATE per state).
+    """
+    current = states(session_id, [user_id for _, user_id, _ in rows])
+    result = {}
+    changed = {}
+    for pid, user_id, stored in rows:
+        state = result[pid] = current[user_id]
+        if stored != state:
+            changed.setdefault(state, []).append(pid)
+
+    for state, ids in changed.items():
+        Participant.objects.filter(id__in=ids).update(status=state)
+    return result
+
+
+def sync_participants(session_id, participants):
+    """Annotate each participant with ``.status`` from presence (see :func:`sync_statuses`)."""
+    current = sync_statuses(session_id, [(p.id, p.user_id, p.status) for p in participants])
+    for p in participants:
+        p.status = current[p.id]
+    return participants
@@ -0,0 +1,46 @@
+"""
+Participant state for a quiz, created up front when the host presses Start.
+
+Every student in the waiting room is redirected to ``play_deck`` within one
+poll window of the start, so creating their ``Participant``/``Submission``
+rows there means a burst of concurrent write transactions at the worst
+possible moment. :func:`provision_session` creates every missing row in one
+transaction before the session is marked started, and ``play_deck`` only
+reads; :func:`provision_student` remains for students who join late.
+"""
+from . import activity, auditorium, leaderboard, tenancy
+from .models import Participant, Submission
+
+
+def provision_session(session):
+    """
+    Give everyone who has joined ``session`` a submission and an up-to-date
+    card total. Returns the number of submissions created.
+    """
+    auditorium.flush()
+    card_count = session.deck.get_cards().count()
+    with tenancy.atomic():
+        Participant.objects.filter(session=session).exclude(total_cards=card_count).update(total_cards=card_count)
+        have = Submission.objects.filter(session=session).values('user_id')
+        missing = list(
+            Participant.objects.filter(session=session).exclude(user_id__in=have).values_list('user_id', flat=True)
+        )
+        created = Submission.objects.bulk_create(
+            [Submission(deck_id=session.deck_id, session=session, user_id=user_id, score=0, total=card_count)
+             for user_id in missing],
+            batch_size=500,
+        )
+        activity.submissions_created(created)
+    leaderboard.forget(session.id)
+    return len(created)
+
+
+def provision_student(session, user, card_count):
+    """Slow path for one student: ``(participant, submission)``, created if missing."""
+    participant, _ = Participant.objects.get_or_create(
+        session=session, user=user, defaults={'total_cards': card_count, 'progress': 0}
+    )
+    submission, _ = Submission.objects.get_or_create(
+        deck_id=session.deck_id, session=session, user=user, defaults={'score': 0, 'total': card_count}
+    )
+    return participant, submission
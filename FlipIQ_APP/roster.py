@@ -0,0 +1,265 @@
+"""
+Bulk student provisioning from a class roster CSV.
+
+Used by the teacher upload page and the ``import_roster`` management command.
+The CSV is streamed in chunks, passwords are hashed across worker processes
+and each chunk is inserted with ``bulk_create`` instead of one signup at a time.
+
+An upload doesn't hash a class's passwords inside the HTTP request:
+:func:`queue_import` copies the file aside and runs the import on a
+background thread (one import at a time per process), and the page polls
+:func:`job_status`, which lives in the shared live-state store so any worker
+can answer.
+
+The process pool is started by the first import big enough to need it and
+reused by every later one in the same process, so an upload doesn't pay for
+forking workers. Chunks under ``PARALLEL_MIN_ROWS`` are hashed inline.
+
+Expected columns (header row required): ``username``, ``password`` and the
+optional ``first_name``, ``last_name``, ``email`` and ``school``.
+"""
+import csv
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connections
+
+from . import tenancy
+from .live_state import store
+from .models import Profile
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 50
+# Fewer passwords than this are hashed in the calling process.
+PARALLEL_MIN_ROWS = 16
+# How long a finished upload's report stays readable.
+JOB_TTL = 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_jobs = None
+
+
+class RosterReport:
+    """Running totals for one roster import."""
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.errors = []
+
+    def note(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Line {line}: {message}")
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+        }
+
+
+def _init_worker():
+    # Workers started with "spawn" (macOS/Windows) need their own Django setup.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FlipIQ.settings')
+        django.setup()
+
+
+def _executor(workers):
+    """The shared hashing pool, started with ``workers`` processes on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        return _pool
+
+
+def _hash_passwords(passwords, workers):
+    global _pool
+    if workers < 2 or len(passwords) < PARALLEL_MIN_ROWS:
+        return [make_password(p) for p in passwords]
+    executor = _executor(workers)
+    try:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool next time and finish this chunk here.
+        with _pool_lock:
+            if _pool is executor:
+                _pool = None
+        return [make_password(p) for p in passwords]
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean_rows(rows, seen, report):
+    """Drop incomplete rows and usernames already seen earlier in the file."""
+    cleaned = []
+    for line, row in rows:
+        username = (row.get("username") or "").strip()
+        password = row.get("password") or ""
+        if not username or not password:
+            report.skipped += 1
+            report.note(line, "missing username or password")
+            continue
+        if len(username) > 150:
+            report.skipped += 1
+            report.note(line, "username longer than 150 characters")
+            continue
+        if username in seen:
+            report.duplicates += 1
+            report.note(line, f"'{username}' appears more than once in the file")
+            continue
+        seen.add(username)
+        cleaned.append((line, username, password, row))
+    return cleaned
+
+
+def _insert_chunk(rows, hashes):
+    users = [
+        User(
+            username=username,
+            password=hashed,
+            first_name=(row.get("first_name") or "").strip()[:150],
+            last_name=(row.get("last_name") or "").strip()[:150],
+            email=(row.get("email") or username).strip(),
+        )
+        for (line, username, password, row), hashed in zip(rows, hashes)
+    ]
+    with tenancy.atomic():
+        User.objects.bulk_create(users)
+        if any(u.pk is None for u in users):
+            # Older SQLite builds can't return ids from a bulk insert.
+            ids = dict(User.objects.filter(username__in=[u.username for u in users])
+                       .values_list("username", "id"))
+            for u in users:
+                u.pk = ids[u.username]
+        Profile.objects.bulk_create([
+            Profile(user_id=u.pk, role=Profile.ROLE_STUDENT, school=(row.get("school") or "").strip()[:50])
+            for u, (line, username, password, row) in zip(users, rows)
+        ])
+    return len(users)
+
+
+def import_roster(lines, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Create ``User`` + student ``Profile`` rows for every new username in ``lines``
+    (any iterable of CSV text lines, e.g. an open file).
+
+    Usernames that already exist are counted as duplicates and left untouched.
+    """
+    report = RosterReport()
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or not {"username", "password"} <= {f.strip() for f in reader.fieldnames}:
+        raise ValueError("Roster CSV needs a header row with 'username' and 'password' columns.")
+    reader.fieldnames = [f.strip() for f in reader.fieldnames]
+
+    workers = workers or os.cpu_count() or 1
+    seen = set()
+
+    # line 1 is the header
+    numbered = ((reader.line_num, row) for row in reader)
+    for chunk in _chunks(numbered, chunk_size):
+        rows = _clean_rows(chunk, seen, report)
+        if not rows:
+            continue
+
+        existing = set(User.objects.filter(username__in=[r[1] for r in rows])
+                       .values_list("username", flat=True))
+        if existing:
+            for line, username, _, _ in rows:
+                if username in existing:
+                    report.duplicates += 1
+                    report.note(line, f"'{username}' already has an account")
+            rows = [r for r in rows if r[1] not in existing]
+            if not rows:
+                continue
+
+        hashes = _hash_passwords([r[2] for r in rows], workers)
+
+        try:
+            report.created += _insert_chunk(rows, hashes)
+        except IntegrityError:
+            # Someone signed up with one of these usernames mid-import; retry without them.
+            taken = set(User.objects.filter(username__in=[r[1] for r in rows])
+                        .values_list("username", flat=True))
+            keep = [(r, h) for r, h in zip(rows, hashes) if r[1] not in taken]
+            report.duplicates += len(rows) - len(keep)
+            if keep:
+                report.created += _insert_chunk([r for r, _ in keep], [h for _, h in keep])
+
+    return report
+
+
+def _job_runner():
+    """The thread that runs queued uploads, started by the first one."""
+    global _jobs
+    with _pool_lock:
+        if _jobs is None:
+            _jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix='flipiq-roster')
+        return _jobs
+
+
+def _job_key(job_id):
+    return f"roster-job:{job_id}"
+
+
+def queue_import(upload, user_id):
+    """
+    Copy ``upload`` (an ``UploadedFile``) to a temporary file and import it in
+    the background, on the database the request is using. Returns the job id
+    for :func:`job_status`.
+    """
+    with tempfile.NamedTemporaryFile(prefix='flipiq-roster-', suffix='.csv', delete=False) as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+    job_id = uuid.uuid4().hex
+    store().set(_job_key(job_id), {"user": user_id, "state": "running"}, JOB_TTL)
+    _job_runner().submit(_run_job, job_id, user_id, f.name, tenancy.scope())
+    return job_id
+
+
+def _run_job(job_id, user_id, path, alias):
+    status = {"user": user_id, "state": "done"}
+    try:
+        with tenancy.routed_to(alias), open(path, newline='', encoding='utf-8-sig') as f:
+            status["report"] = import_roster(f).as_dict()
+    except (UnicodeDecodeError, ValueError) as e:
+        status.update(state="failed", error=str(e))
+    except Exception:
+        logger.exception("Roster import %s failed", job_id)
+        status.update(state="failed", error="The import stopped unexpectedly; please try again.")
+    finally:
+        os.unlink(path)
+        connections.close_all()
+    store().set(_job_key(job_id), status, JOB_TTL)
+
+
+def job_status(job_id, user_id):
+    """The upload's status dict, or None if it's unknown, expired or someone else's."""
+    status = store().get(_job_key(job_id))
+    if status is None or status["user"] != user_id:
+        return None
+    return status
@@ -0,0 +1,65 @@
+"""
+Database routing.
+
+``TenantRouter`` sends a school's requests to its own database (see
+tenancy.py). It runs first and stays out of the way for schools on ``default``.
+
+Read routing for the production database profile (see ``FLIPIQ_DB_PROFILE``).
+
+Views decorated with :func:`use_read_replica` read through the ``replica``
+alias, a separate read-only connection to the same SQLite file. In WAL mode
+those reads never wait on ``submit_answer`` writes, which keeps the
+every-few-seconds polling off the writer's lock. Writes, and reads from any
+other view, stay on ``default``.
+"""
+import contextvars
+from functools import wraps
+
+from django.db import connections
+
+from . import tenancy
+
+_use_replica = contextvars.ContextVar('flipiq_use_replica', default=False)
+
+REPLICA = 'replica'
+
+
+def use_read_replica(view_func):
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA in connections.settings:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class TenantRouter:
+    def db_for_read(self, model, **hints):
+        return tenancy.current_alias()
+
+    def db_for_write(self, model, **hints):
+        return tenancy.current_alias()
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every tenant database carries the full schema (users and sessions included).
+        if db.startswith(tenancy.PREFIX):
+            return True
+        return None
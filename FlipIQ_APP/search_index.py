@@ -0,0 +1,138 @@
+"""
+In-memory prefix index over public decks for the home page typeahead.
+
+Terms (the whole title, each word of the title and subject, and the owner's
+username) are kept in one sorted list of ``(term, deck_id)`` pairs, so a
+prefix lookup is a ``bisect`` plus a short forward scan and never touches the
+database. The index is filled on first use and then kept current by the
+``Deck`` save/delete signals in ``signals.py``.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .models import Deck
+
+# Stop scanning after this many matching terms; plenty to fill top-k.
+MAX_SCAN = 256
+
+
+def _terms(title, subject, owner):
+    title = (title or '').lower().strip()
+    terms = {title, (owner or '').lower()}
+    terms.update(title.split())
+    terms.update((subject or '').lower().split())
+    terms.discard('')
+    return sorted(terms)
+
+
+class PrefixIndex:
+    def __init__(self, max_decks):
+        self.max_decks = max_decks
+        self._lock = threading.RLock()
+        self._keys = []   # sorted (term, deck_id)
+        self._decks = {}  # deck_id -> (title, subject, owner, created_ts, terms)
+        self.ready = False
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._decks = {}
+            self.ready = False
+
+    def build(self, rows):
+        """Replace the index with ``rows`` of (id, title, subject, owner, created_ts)."""
+        with self._lock:
+            self._keys = []
+            self._decks = {}
+            for row in rows:
+                self._add(*row)
+            self._keys.sort()
+            self.ready = True
+
+    def _add(self, deck_id, title, subject, owner, created):
+        terms = _terms(title, subject, owner)
+        self._decks[deck_id] = (title, subject, owner, created, terms)
+        self._keys.extend((t, deck_id) for t in terms)
+
+    def _remove(self, deck_id):
+        entry = self._decks.pop(deck_id, None)
+        if entry is None:
+            return
+        for term in entry[4]:
+            i = bisect_left(self._keys, (term, deck_id))
+            if i < len(self._keys) and self._keys[i] == (term, deck_id):
+                del self._keys[i]
+
+    def upsert(self, deck_id, title, subject, owner, created):
+        with self._lock:
+            if not self.ready:
+                return
+            self._remove(deck_id)
+            if len(self._decks) >= self.max_decks:
+                oldest = min(self._decks, key=lambda d: self._decks[d][3])
+                if self._decks[oldest][3] > created:
+                    return
+                self._remove(oldest)
+            terms = _terms(title, subject, owner)
+            self._decks[deck_id] = (title, subject, owner, created, terms)
+            for term in terms:
+                insort(self._keys, (term, deck_id))
+
+    def remove(self, deck_id):
+        with self._lock:
+            self._remove(deck_id)
+
+    def search(self, prefix, k=8):
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        with self._lock:
+            keys, decks = self._keys, self._decks
+            matches = {}
+            i = bisect_left(keys, (prefix,))
+            end = min(len(keys), i + MAX_SCAN)
+            while i < end and keys[i][0].startswith(prefix):
+                term, deck_id = keys[i]
+                # Title matches outrank subject/owner matches; newest first within each.
+                title_hit = decks[deck_id][0].lower().startswith(prefix)
+                matches[deck_id] = max(matches.get(deck_id, False), title_hit)
+                i += 1
+            ranked = sorted(matches, key=lambda d: (not matches[d], -decks[d][3]))[:k]
+            return [
+                {'id': d, 'title': decks[d][0], 'subject': decks[d][1], 'owner': decks[d][2]}
+                for d in ranked
+            ]
+
+
+index = PrefixIndex(getattr(settings, 'FLIPIQ_TYPEAHEAD_MAX_DECKS', 50_000))
+_indexes = {'default': index}  # one per database (see tenancy.py)
+
+
+def index_for(alias):
+    found = _indexes.get(alias)
+    if found is None:
+        found = _indexes.setdefault(alias, PrefixIndex(index.max_decks))
+    return found
+
+
+def ensure_built(alias='default'):
+    """Load the newest public decks (up to the memory cap) the first time it's needed."""
+    idx = index_for(alias)
+    if idx.ready:
+        return idx
+    with idx._lock:
+        if idx.ready:
+            return idx
+        rows = (
+            Deck.objects.using(alias).filter(visibility='public')
+            .order_by('-created_at')
+            .values_list('id', 'title', 'subject', 'owner__username', 'created_at')[:idx.max_decks]
+        )
+        idx.build((d, t, s, o, c.timestamp()) for d, t, s, o, c in rows.iterator())
+    return idx
+
+
+def search(prefix, k=8, alias='default'):
+    return ensure_built(alias).search(prefix, k)
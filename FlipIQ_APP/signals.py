@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import activity, catalog, cloning, search_index
+from .models import Card, Deck, Submission
+
+
+@receiver(post_save, sender=Deck)
+def index_deck(sender, instance, using, **kwargs):
+    """Keep the typeahead index in step with public decks."""
+    index = search_index.index_for(using)
+    if instance.visibility == 'public':
+        index.upsert(instance.id, instance.title, instance.subject,
+                     instance.owner.username, instance.created_at.timestamp())
+    else:
+        index.remove(instance.id)
+
+
+@receiver(post_delete, sender=Deck)
+def unindex_deck(sender, instance, using, **kwargs):
+    search_index.index_for(using).remove(instance.id)
+
+
+@receiver(post_init, sender=Deck)
+def remember_listing(sender, instance, **kwargs):
+    # None when visibility wasn't loaded (.only()/.defer()): then any save bumps
+    visibility = instance.__dict__.get('visibility')
+    instance._was_listed = None if visibility is None else visibility == 'public'
+
+
+@receiver(post_save, sender=Deck)
+@receiver(post_delete, sender=Deck)
+def retire_home_pages(sender, instance, using, **kwargs):
+    """Cached home grid pages show public decks' titles and card counts (see catalog.py)."""
+    listed = instance.visibility == 'public'
+    if listed or instance._was_listed is not listed:
+        catalog.bump(using)
+    instance._was_listed = listed
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def retire_home_pages_for_cards(sender, instance, using, **kwargs):
+    catalog.cards_changed(instance.deck_id, using)
+
+
+@receiver(post_save, sender=Deck)
+def deck_activity(sender, instance, created, **kwargs):
+    if created:
+        activity.deck_created(instance)
+    else:
+        activity.deck_changed(instance)
+
+
+@receiver(post_save, sender=Submission)
+def submission_activity(sender, instance, created, **kwargs):
+    activity.submission_saved(instance, created)
+
+
+@receiver(pre_delete, sender=Deck)
+def keep_clone_cards(sender, instance, **kwargs):
+    """Clones reading this deck's cards get a copy before it goes."""
+    cloning.hand_off(instance)
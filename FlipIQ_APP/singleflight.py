@@ -0,0 +1,63 @@
+"""
+Single-flight coalescing for identical concurrent reads.
+
+When a room of students asks for the same thing at the same instant (the
+waiting-room roster, a deck's cards, a page of the home deck grid), only the
+first caller for a key runs the query; callers arriving while it is in
+flight wait and get the same result (or the same exception). Nothing is
+cached afterwards: the next call after it finishes runs again.
+
+Coalesce reads only: ``fn`` must not write, since waiters would get results
+that depend on the leader's side effects and errors from writes they never
+asked for. Results are shared between callers, so treat them as read-only.
+
+Counters, per group: ``singleflight.<name>.calls`` (computations that ran)
+and ``singleflight.<name>.saved`` (callers served by someone else's).
+"""
+import threading
+
+from . import metrics, tenancy
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call
+
+    def do(self, key, fn):
+        """Return ``fn()``, sharing one in-flight call per ``key`` across threads."""
+        key = (tenancy.scope(), key)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr(f'singleflight.{self.name}.saved')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.incr(f'singleflight.{self.name}.calls')
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
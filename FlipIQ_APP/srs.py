@@ -0,0 +1,119 @@
+"""
+Spaced-repetition self-study (SM-2).
+
+Each (student, card) pair that has been reviewed has a ``ReviewState`` row
+with its interval, ease and due time. The study queue is read from the
+``(user, due_at)`` / ``(user, deck, due_at)`` indexes, so it costs the same
+for a student with fifty scheduled cards as for one with a hundred thousand.
+Reviews come in from the client in batches and are written with a single
+upsert.
+"""
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Card, Deck, ReviewState
+
+# Button -> SM-2 quality (0-5)
+GRADES = {'again': 1, 'hard': 3, 'good': 4, 'easy': 5}
+MIN_EASE = 1300
+RELEARN_DELAY = timedelta(minutes=10)
+
+QUEUE_SIZE = 20
+NEW_PER_QUEUE = 10
+MAX_BATCH = 200
+
+
+def studyable_decks(user):
+    return Deck.objects.filter(Q(visibility='public') | Q(owner=user))
+
+
+def schedule(state, quality, now):
+    """Apply one review of ``quality`` (0-5) to ``state`` in place."""
+    if quality < 3:
+        if state.reps:
+            state.lapses += 1
+        state.reps = 0
+        state.interval = 0
+        state.due_at = now + RELEARN_DELAY  # comes back later in the same sitting
+    else:
+        state.reps += 1
+        if state.reps == 1:
+            state.interval = 1
+        elif state.reps == 2:
+            state.interval = 6
+        else:
+            state.interval = max(state.interval + 1, round(state.interval * state.ease / 1000))
+        state.due_at = now + timedelta(days=state.interval)
+    delta = 100 - (5 - quality) * (80 + (5 - quality) * 20)  # SM-2 ease change, x 1000
+    state.ease = max(MIN_EASE, state.ease + delta)
+    return state
+
+
+def due_queue(user, deck_id=None, limit=QUEUE_SIZE, new_limit=NEW_PER_QUEUE, now=None):
+    """
+    Cards to study next, oldest due first, topped up with cards from
+    ``deck_id`` the student hasn't seen yet.
+    """
+    now = now or timezone.now()
+    due = ReviewState.objects.filter(user=user, due_at__lte=now)
+    if deck_id is not None:
+        due = due.filter(deck_id=deck_id)
+    queue = [
+        {'id': card_id, 'deck_id': deck, 'front': front, 'back': back, 'choices': choices, 'new': False}
+        for card_id, deck, front, back, choices in due.order_by('due_at').values_list(
+            'card_id', 'deck_id', 'card__front', 'card__back', 'card__choices'
+        )[:limit]
+    ]
+
+    room = min(new_limit, limit - len(queue))
+    if deck_id is not None and room > 0:
+        seen = ReviewState.objects.filter(user=user, card=OuterRef('pk'))
+        fresh = (
+            Card.objects.filter(deck_id=deck_id).exclude(Exists(seen))
+            .order_by('id').values_list('id', 'front', 'back', 'choices')[:room]
+        )
+        queue += [
+            {'id': card_id, 'deck_id': deck_id, 'front': front, 'back': back, 'choices': choices, 'new': True}
+            for card_id, front, back, choices in fresh
+        ]
+    return queue
+
+
+def record_reviews(user, reviews, now=None):
+    """
+    Apply a batch of ``(card_id, grade)`` reviews, in order, and save them in
+    one statement. Cards outside the decks ``user`` may study are ignored.
+    Returns the number of reviews applied.
+    """
+    now = now or timezone.now()
+    reviews = [(card_id, GRADES[grade]) for card_id, grade in reviews[:MAX_BATCH] if grade in GRADES]
+    card_ids = {card_id for card_id, _ in reviews}
+    decks = dict(
+        Card.objects.filter(id__in=card_ids, deck__in=studyable_decks(user)).values_list('id', 'deck_id')
+    )
+    states = {s.card_id: s for s in ReviewState.objects.filter(user=user, card_id__in=decks)}
+
+    applied = 0
+    for card_id, quality in reviews:
+        if card_id not in decks:
+            continue
+        state = states.get(card_id)
+        if state is None:
+            state = states[card_id] = ReviewState(user=user, card_id=card_id, deck_id=decks[card_id])
+        schedule(state, quality, now)
+        applied += 1
+
+    if states:
+        # Upsert on (user, card) rather than the primary key, so existing rows
+        # and rows another tab created meanwhile are both updated in place.
+        for state in states.values():
+            state.pk = None
+        ReviewState.objects.bulk_create(
+            states.values(),
+            update_conflicts=True,
+            unique_fields=['user', 'card'],
+            update_fields=['interval', 'ease', 'reps', 'lapses', 'due_at'],
+        )
+    return applied
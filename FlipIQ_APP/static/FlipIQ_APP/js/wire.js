@@ -0,0 +1,43 @@
+// Decoder for the compact wire format (see FlipIQ_APP/wire.py).
+// SCHEMAS must match wire.SCHEMAS; keep it on one line, the tests read it.
+const FlipWire = (() => {
+  const COMPACT = "application/vnd.flipiq.compact+json";
+  const SCHEMAS = {"answer": ["success", "is_correct", "progress", "total", "score"], "session_status": ["is_started", "active"], "roster": [["participants", ["name", "status*"]], "count"], "cards": [["cards", ["id", "front", "back", "choices"]]]};
+
+  const nameOf = (field) => Array.isArray(field) ? field[0] : field.replace(/\*$/, "");
+
+  function rows(fields, columns) {
+    const plain = fields.map((field, i) => {
+      const column = columns[i];
+      if (Array.isArray(field)) return column.map(value => rows(field[1], value));
+      if (field.endsWith("*")) return column[1].map(code => column[0][code]);
+      return column;
+    });
+    const count = plain.length ? plain[0].length : 0;
+    const out = new Array(count);
+    for (let r = 0; r < count; r++) {
+      const row = {};
+      fields.forEach((field, i) => { row[nameOf(field)] = plain[i][r]; });
+      out[r] = row;
+    }
+    return out;
+  }
+
+  function decode(schema, values) {
+    const data = {};
+    SCHEMAS[schema].forEach((field, i) => {
+      data[nameOf(field)] = Array.isArray(field) ? rows(field[1], values[i]) : values[i];
+    });
+    return data;
+  }
+
+  // fetch() that asks for the compact form and always resolves to the plain object.
+  async function fetchJSON(url, schema, options = {}) {
+    const headers = Object.assign({}, options.headers, { "Accept": `${COMPACT}, application/json` });
+    const res = await fetch(url, Object.assign({}, options, { headers }));
+    const body = await res.json();
+    return (res.headers.get("Content-Type") || "").startsWith(COMPACT) ? decode(schema, body) : body;
+  }
+
+  return { COMPACT, SCHEMAS, decode, fetchJSON };
+})();
@@ -0,0 +1,50 @@
+"""
+Static files storage for production builds.
+
+``collectstatic`` with :class:`CompressedManifestStaticFilesStorage` writes
+content-hashed copies of every asset plus ``staticfiles.json`` (as Django's
+``ManifestStaticFilesStorage`` does), then a ``.gz`` and, when the optional
+``brotli`` package is installed, a ``.br`` next to each text asset so they
+can be served compressed without per-request work.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.html', '.txt', '.map', '.xml')
+MIN_BYTES = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Templates reference a few assets that aren't in the repo yet; fall back
+    # to the plain name instead of failing the page.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in list(self.hashed_files.values()):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(name) as f:
+                content = f.read()
+            if len(content) < MIN_BYTES:
+                continue
+            for suffix, compressed in self.compressed_variants(content):
+                if len(compressed) < len(content):
+                    if self.exists(name + suffix):
+                        self.delete(name + suffix)
+                    self._save(name + suffix, ContentFile(compressed))
+                    yield name + suffix, name + suffix, True
+
+    def compressed_variants(self, content):
+        yield '.gz', gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            yield '.br', brotli.compress(content, quality=11)
@@ -0,0 +1,199 @@
+"""
+One SQLite database per school.
+
+SQLite allows one writer per database file, so schools that share
+``db.sqlite3`` queue behind each other's ``submit_answer`` writes. A school
+listed in ``FLIPIQ_TENANTS`` (loaded from ``tenants.json``, see settings.py)
+gets its own database file under the alias ``school_<slug>`` and is served on
+its own host names:
+
+* :class:`TenantMiddleware` picks the school from the request's host before
+  sessions and auth run, and
+* ``routers.TenantRouter`` sends every query made during that request to
+  the school's database. Users, sessions, decks, live sessions and answers
+  all live there, so no query crosses databases.
+
+Schools without an entry stay on ``default``. Each file has its own write
+lock, so write throughput grows with the number of tenant databases.
+``manage.py tenants`` moves a school out of ``default`` or to a new file.
+
+Public decks are browsable everywhere: :func:`public_decks_elsewhere`
+reads each of the other databases for the home page (cached by
+``catalog.elsewhere``).
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Deck
+
+PREFIX = 'school_'
+DEFAULT = 'default'
+
+_current = contextvars.ContextVar('flipiq_tenant', default=None)
+
+
+def tenants():
+    return getattr(settings, 'FLIPIQ_TENANTS', {})
+
+
+def aliases():
+    """Every database holding a school's data: 'default' and one per tenant."""
+    return [DEFAULT] + [PREFIX + school for school in tenants()]
+
+
+def alias_for(school):
+    return PREFIX + school if school in tenants() else DEFAULT
+
+
+def school_for_host(host):
+    host = host.split(':', 1)[0].lower()
+    for school, tenant in tenants().items():
+        if host in tenant.get('hosts', ()):
+            return school
+    return None
+
+
+def current_alias():
+    """Database for the school being served, or None outside a tenant's request."""
+    return _current.get()
+
+
+def scope():
+    """
+    Database alias the current request uses. Process-local state keyed by row
+    ids (buffers, boards, indexes) is kept per scope, since ids repeat across
+    databases.
+    """
+    return _current.get() or DEFAULT
+
+
+@contextmanager
+def routed_to(alias):
+    """Route every query in the block to the database ``alias``."""
+    token = _current.set(None if alias == DEFAULT else alias)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def activate(school):
+    """Route every query in the block to ``school``'s database."""
+    return routed_to(alias_for(school) if school else DEFAULT)
+
+
+def atomic():
+    """``transaction.atomic()`` on the current request's database (it defaults to 'default')."""
+    return transaction.atomic(using=scope())
+
+
+class TenantMiddleware:
+    """Must sit above SessionMiddleware so sessions and users load from the school's database."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.school = school_for_host(request.get_host())
+        with activate(request.school):
+            return self.get_response(request)
+
+
+def public_decks_elsewhere(query='', limit=24):
+    """
+    Newest public decks from every database except the one serving this
+    request, as dicts with the school they belong to and a link to play them
+    there. No queries at all when no tenants are configured.
+    """
+    if not tenants():
+        return []
+    here = current_alias() or DEFAULT
+    main_host = getattr(settings, 'FLIPIQ_MAIN_HOST', '')
+    hosts = {DEFAULT: [main_host] if main_host else []}
+    hosts.update({PREFIX + school: tenant.get('hosts', []) for school, tenant in tenants().items()})
+    found = []
+    for alias in hosts:
+        if alias == here:
+            continue
+        decks = Deck.objects.using(alias).filter(visibility='public')
+        if query:
+            decks = decks.filter(title__icontains=query)
+        rows = (
+            decks.annotate(card_count=Count('cards') + Count('shared_from__cards'))
+            .order_by('-created_at')
+            .values('id', 'title', 'subject', 'owner__username', 'card_count', 'created_at')[:limit]
+        )
+        host = (hosts[alias] or [None])[0]
+        for row in rows:
+            row['school'] = alias[len(PREFIX):] if alias != DEFAULT else ''
+            row['url'] = f"//{host}/?flip={row['id']}" if host else None
+            found.append(row)
+    found.sort(key=lambda row: row['created_at'], reverse=True)
+    return found[:limit]
+
+
+def copy_school(school, source, target, chunk_size=2000):
+    """
+    Copy everything ``school`` needs from database ``source`` into ``target``
+    (an empty, migrated database), keeping primary keys: the school's users
+    and their decks, cards, sessions, answers, feed, study state and session
+    traces, plus decks cloned from elsewhere and any outside user those rows
+    refer to.
+    Login sessions are not copied. Returns ``{model name: rows copied}``.
+    """
+    from django.contrib.auth.models import User
+    from django.db.models import Q
+
+    from .models import (
+        ActivityEntry, Card, CardAnswerStat, Participant, Profile, ReviewState, Session, SessionTraceEvent, Submission,
+    )
+
+    own_decks = Deck.objects.using(source).filter(owner__profile__school=school)
+    decks = Deck.objects.using(source).filter(
+        Q(owner__profile__school=school) | Q(id__in=own_decks.values('shared_from'))
+    )
+    sessions = Session.objects.using(source).filter(deck__in=decks.values('id'))
+    participants = Participant.objects.using(source).filter(session__in=sessions.values('id'))
+    submissions = Submission.objects.using(source).filter(deck__in=decks.values('id'))
+    reviews = ReviewState.objects.using(source).filter(deck__in=decks.values('id'))
+    users = User.objects.using(source).filter(
+        Q(profile__school=school)
+        | Q(id__in=decks.values('owner'))
+        | Q(id__in=sessions.values('host'))
+        | Q(id__in=participants.values('user'))
+        | Q(id__in=submissions.values('user'))
+        | Q(id__in=reviews.values('user'))
+    )
+    plan = [
+        users,
+        Profile.objects.using(source).filter(user__in=users.values('id')),
+        decks,
+        Card.objects.using(source).filter(deck__in=decks.values('id')),
+        CardAnswerStat.objects.using(source).filter(deck__in=own_decks.values('id')),
+        sessions,
+        participants,
+        submissions,
+        ActivityEntry.objects.using(source).filter(deck__in=decks.values('id')),
+        reviews,
+        SessionTraceEvent.objects.using(source).filter(session__in=sessions.values('id')),
+    ]
+
+    copied = {}
+    # Foreign keys are checked at commit, so insert order within the transaction doesn't matter.
+    with transaction.atomic(using=target):
+        for queryset in plan:
+            model = queryset.model
+            batch, n = [], 0
+            for obj in queryset.order_by('pk').iterator(chunk_size=chunk_size):
+                batch.append(obj)
+                if len(batch) >= chunk_size:
+                    model.objects.using(target).bulk_create(batch)
+                    n += len(batch)
+                    batch = []
+            model.objects.using(target).bulk_create(batch)
+            copied[model.__name__] = n + len(batch)
+    return copied
@@ -1,3 +1,1433 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.signals import request_started
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from . import (
+    activity, analytics, auditorium, catalog, cloning, leaderboard, live_state, metrics, presence, roster,
+    search_index, singleflight, srs, tenancy, trace, views, warmup, wire,
+)
+from . import urls as app_urls
+from .compression import CompressionMiddleware, PrecompressedStaticMiddleware
+from .management.commands import seed_scale
+from .middleware import AdmissionControlMiddleware, check_rate_limits
+from .routers import ReadReplicaRouter, TenantRouter, use_read_replica
+from .models import (
+    ActivityEntry, Card, CardAnswerStat, Deck, Participant, Profile, ReviewState, Session, SessionTraceEvent,
+    Submission,
+)
+
+
+# Max SQL queries per request, keyed by URL route. Budgets hold for both the host
+# and the student role and at every data size below, so anything that issues a
+# query per deck / card / submission blows through them as soon as N grows.
+QUERY_BUDGETS = {
+    '': 5,
+    'search/typeahead/': 0,
+    'signup/': 0,
+    'profile/': 5,
+    'roster/upload/': 3,
+    'create-deck/': 2,
+    'publish_deck/': 6,
+    'deck/edit/<int:deck_id>/': 3,
+    'deck/delete/<int:deck_id>/': 12,
+    'deck/clone/<int:deck_id>/': 8,
+    'get-deck-data/<int:deck_id>/': 4,
+    'deck/<int:deck_id>/': 6,
+    'deck/<int:deck_id>/analytics/': 5,
+    'update_card/<int:card_id>/': 5,
+    'deck/<int:deck_id>/start_session/': 5,
+    'deck/<int:deck_id>/end_session/': 5,
+    'deck/<int:deck_id>/status/': 6,
+    'host/overview/': 4,
+    'host/overview/data/': 4,
+    'kick_participant/<int:participant_id>/': 4,
+    'join_by_code/': 6,
+    'join/': 2,
+    'check_session/<str:code>/': 3,
+    'deck/<int:deck_id>/waiting/<int:session_id>/': 4,
+    'deck/<int:deck_id>/play/<int:session_id>/': 10,
+    'deck/<int:deck_id>/leave/<int:session_id>/': 4,
+    'deck/<int:deck_id>/participants/<int:session_id>/': 4,
+    'deck/<int:deck_id>/heartbeat/<int:session_id>/': 3,
+    'deck/<int:deck_id>/submit_answer/': 14,
+    'deck/<int:deck_id>/start_quiz/': 11,
+    'deck/<int:deck_id>/report/<int:session_id>/': 5,
+    'deck/<int:deck_id>/leaderboard/<int:session_id>/': 3,
+    'deck/<int:deck_id>/trace/<int:session_id>/': 4,
+    'deck/<int:deck_id>/trace/<int:session_id>/export/': 4,
+    'deck/<int:deck_id>/activate_flag/': 11,
+    'deck/<int:deck_id>/result/<int:session_id>/': 5,
+    'deck/<int:deck_id>/reset_progress/<int:session_id>/': 9,
+    'deck/<int:deck_id>/not_started/': 3,
+    'study/deck/<int:deck_id>/': 5,
+    'study/deck/<int:deck_id>/next/': 5,
+    'study/review/': 5,
+    'metrics/': 2,
+}
+
+# Routes that can't be exercised: both map a URL kwarg the view doesn't accept
+# (start_session() takes deck_id, report_view() needs session_id).
+UNREACHABLE_ROUTES = {
+    'start_session/<int:session_id>/',
+    'deck/<int:deck_id>/report/',
+}
+
+# Peak Python heap allocated while serving one request.
+DEFAULT_ALLOCATION_BUDGET = 512 * 1024
+
+DATA_SIZES = (2, 12)
+ROLES = ('host', 'student')
+
+
+class World:
+    """
+    A classroom with ``n`` students, ``n`` public decks of ``n`` cards each, a
+    finished session per deck that every student played, and one live session
+    on the main deck that every student has joined.
+    """
+
+    def __init__(self, n):
+        self.host = User.objects.create_user(f'host{n}', password='pw')
+        Profile.objects.create(user=self.host, role=Profile.ROLE_TEACHER)
+        students = User.objects.bulk_create(
+            [User(username=f'student{n}_{i}', first_name='Stu', last_name=str(i)) for i in range(n)]
+        )
+        Profile.objects.bulk_create(
+            [Profile(user=s, role=Profile.ROLE_STUDENT) for s in students]
+        )
+        self.student = students[0]
+
+        decks = Deck.objects.bulk_create(
+            [Deck(title=f'Deck {i}', owner=self.host, visibility='public', subject='Math') for i in range(n)]
+        )
+        Card.objects.bulk_create(
+            [Card(deck=d, front=f'Q{j}', back='a', choices=['a', 'b', 'c']) for d in decks for j in range(n)]
+        )
+        self.deck = decks[0]
+        self.played_deck = decks[-1]  # n cards, one finished session, n submissions, nothing live
+        self.card = self.deck.cards.first()
+
+        finished = Session.objects.bulk_create(
+            [Session(deck=d, host=self.host, code=f'{n:02d}{i:04d}', is_active=False, is_started=True)
+             for i, d in enumerate(decks)]
+        )
+        Submission.objects.bulk_create(
+            [Submission(deck=s.deck, session=s, user=u, score=1, total=n) for s in finished for u in students]
+        )
+
+        self.session = Session.objects.create(deck=self.deck, host=self.host, is_started=True)
+        Participant.objects.bulk_create(
+            [Participant(session=self.session, user=u, total_cards=n) for u in students]
+        )
+        Submission.objects.bulk_create(
+            [Submission(deck=self.deck, session=self.session, user=u, total=n) for u in students]
+        )
+
+        now = timezone.now()
+        # Every student has self-studied the main deck; half of it is due now.
+        ReviewState.objects.bulk_create(
+            [ReviewState(user=u, card=c, deck=self.deck, interval=1, due_at=now - timedelta(days=j % 2))
+             for u in students for j, c in enumerate(self.deck.cards.all())]
+        )
+
+        # bulk_create skips the signals that maintain the profile feed
+        ActivityEntry.objects.bulk_create(
+            [ActivityEntry(user=self.host, kind=ActivityEntry.KIND_CREATED, deck=d, deck_title=d.title,
+                           deck_owner=self.host.username, card_count=n, happened_at=now) for d in decks]
+            + [ActivityEntry(user=sub.user, kind=ActivityEntry.KIND_PLAYED, deck=sub.deck, submission=sub,
+                             session=sub.session, deck_title=sub.deck.title, deck_owner=self.host.username,
+                             card_count=n, total=n, happened_at=now)
+               for sub in Submission.objects.select_related('deck', 'session', 'user')]
+        )
+        # ... and the ones that retire cached home pages
+        catalog.bump()
+
+    def user(self, role):
+        return self.host if role == 'host' else self.student
+
+    def spare_deck(self):
+        return Deck.objects.create(title='Spare', owner=self.host)
+
+    def spare_participant(self):
+        extra = User.objects.create_user(f'extra{User.objects.count()}')
+        return Participant.objects.create(session=self.session, user=extra, total_cards=1)
+
+
+def request_for(route, world):
+    """Return ``(method, path, json_body)`` exercising ``route`` against ``world``."""
+    d, s = world.deck.id, world.session.id
+    cases = {
+        '': ('get', '/', None),
+        'search/typeahead/': ('get', '/search/typeahead/?q=dec', None),
+        'signup/': ('get', '/signup/', None),
+        'profile/': ('get', '/profile/', None),
+        'roster/upload/': ('get', '/roster/upload/', None),
+        'create-deck/': ('get', '/create-deck/', None),
+        'publish_deck/': ('post', '/publish_deck/', {
+            'deckTitle': 'New', 'cards': [{'front': 'q', 'back': 'a', 'choices': ['a']}] * 5,
+        }),
+        'deck/edit/<int:deck_id>/': ('get', f'/deck/edit/{d}/', None),
+        'get-deck-data/<int:deck_id>/': ('get', f'/get-deck-data/{d}/', None),
+        'deck/<int:deck_id>/': ('get', f'/deck/{world.played_deck.id}/', None),
+        'deck/<int:deck_id>/analytics/': ('get', f'/deck/{d}/analytics/', None),
+        'update_card/<int:card_id>/': ('post', f'/update_card/{world.card.id}/', {'front': 'Q?'}),
+        'deck/<int:deck_id>/status/': ('get', f'/deck/{d}/status/', None),
+        'host/overview/': ('get', '/host/overview/', None),
+        'host/overview/data/': ('get', '/host/overview/data/', None),
+        'join_by_code/': ('post', '/join_by_code/', {'code': world.session.code}),
+        'join/': ('get', '/join/', None),
+        'check_session/<str:code>/': ('get', f'/check_session/{world.session.code}/', None),
+        'deck/<int:deck_id>/waiting/<int:session_id>/': ('get', f'/deck/{d}/waiting/{s}/', None),
+        'deck/<int:deck_id>/play/<int:session_id>/': ('get', f'/deck/{d}/play/{s}/', None),
+        'deck/<int:deck_id>/participants/<int:session_id>/': ('get', f'/deck/{d}/participants/{s}/', None),
+        'deck/<int:deck_id>/heartbeat/<int:session_id>/': ('post', f'/deck/{d}/heartbeat/{s}/', None),
+        'deck/<int:deck_id>/start_quiz/': ('post', f'/deck/{d}/start_quiz/', None),
+        'deck/<int:deck_id>/report/<int:session_id>/': ('get', f'/deck/{d}/report/{s}/', None),
+        'deck/<int:deck_id>/leaderboard/<int:session_id>/': ('get', f'/deck/{d}/leaderboard/{s}/', None),
+        'deck/<int:deck_id>/trace/<int:session_id>/': ('get', f'/deck/{d}/trace/{s}/', None),
+        'deck/<int:deck_id>/trace/<int:session_id>/export/': ('get', f'/deck/{d}/trace/{s}/export/', None),
+        'deck/<int:deck_id>/activate_flag/': ('post', f'/deck/{d}/activate_flag/', None),
+        'deck/<int:deck_id>/result/<int:session_id>/': ('get', f'/deck/{d}/result/{s}/', None),
+        'deck/<int:deck_id>/reset_progress/<int:session_id>/': ('post', f'/deck/{d}/reset_progress/{s}/', None),
+        'deck/<int:deck_id>/not_started/': ('get', f'/deck/{d}/not_started/', None),
+        'study/deck/<int:deck_id>/': ('get', f'/study/deck/{d}/', None),
+        'study/deck/<int:deck_id>/next/': ('get', f'/study/deck/{d}/next/', None),
+        'study/review/': ('post', '/study/review/', {
+            'reviews': [{'card': c, 'grade': 'good'} for c in world.deck.cards.values_list('id', flat=True)],
+        }),
+        'deck/clone/<int:deck_id>/': ('post', f'/deck/clone/{d}/', None),
+        'metrics/': ('get', '/metrics/', None),
+    }
+    if route in cases:
+        return cases[route]
+
+    # Routes that destroy or replace their target get a fresh one per request.
+    if route == 'deck/delete/<int:deck_id>/':
+        return 'post', f'/deck/delete/{world.spare_deck().id}/', None
+    if route == 'deck/<int:deck_id>/start_session/':
+        return 'post', f'/deck/{world.spare_deck().id}/start_session/', None
+    if route == 'deck/<int:deck_id>/end_session/':
+        spare = world.spare_deck()
+        Session.objects.create(deck=spare, host=world.host)
+        return 'post', f'/deck/{spare.id}/end_session/', None
+    if route == 'kick_participant/<int:participant_id>/':
+        return 'post', f'/kick_participant/{world.spare_participant().id}/', None
+    if route == 'deck/<int:deck_id>/submit_answer/':
+        # A mid-game answer, the hot path, at every data size
+        Participant.objects.filter(session=world.session).update(progress=0)
+        return 'post', f'/deck/{d}/submit_answer/', {'session_id': s, 'card_id': world.card.id, 'choice': 'a'}
+    if route == 'deck/<int:deck_id>/leave/<int:session_id>/':
+        return 'get', f'/deck/{d}/leave/{s}/', None
+    raise KeyError(route)
+
+
+def app_routes():
+    return {str(p.pattern) for p in app_urls.urlpatterns}
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teach', password='pw')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        User.objects.create_user('taken')
+
+    def upload(self, csv_text, run=True):
+        """POST a roster and follow the redirect; ``run`` imports it inline instead of on the job thread."""
+        runner = mock.Mock()
+        if run:
+            runner.submit.side_effect = lambda fn, *args: fn(*args)
+        upload = SimpleUploadedFile('roster.csv', csv_text.encode('utf-8-sig'), content_type='text/csv')
+        with mock.patch.object(roster, '_job_runner', return_value=runner), \
+                mock.patch.object(roster.connections, 'close_all'):  # the test's connection stays open
+            response = self.client.post('/roster/upload/', {'roster': upload})
+        self.assertEqual(runner.submit.call_count, 1)
+        if not run:
+            self.addCleanup(os.unlink, runner.submit.call_args.args[3])
+        return self.client.get(response['Location'])
+
+    def test_upload_creates_students_and_reports_problems(self):
+        csv_text = (
+            " username , password ,first_name,school\n"
+            "ana,pw1,Ana,lincoln\n"
+            "ben,,Ben,lincoln\n"
+            "ana,pw2,Ana,lincoln\n"
+            "taken,pw3,,\n"
+            "cy,pw4,,\n"
+        )
+        self.client.force_login(self.teacher)
+        report = self.upload(csv_text).context['report']
+
+        self.assertEqual((report['created'], report['skipped'], report['duplicates']), (2, 1, 2))
+        self.assertEqual([e.split(':')[0] for e in report['errors']], ['Line 3', 'Line 4', 'Line 5'])
+        ana = User.objects.get(username='ana')
+        self.assertTrue(ana.check_password('pw1'))
+        self.assertEqual((ana.first_name, ana.profile.role, ana.profile.school), ('Ana', 'student', 'lincoln'))
+        self.assertEqual(User.objects.get(username='cy').profile.school, '')
+
+    def test_upload_returns_before_the_import_and_only_its_owner_sees_it(self):
+        self.client.force_login(self.teacher)
+        page = self.upload("username,password\nana,pw\n", run=False)
+        self.assertEqual(page.context['job']['state'], 'running')
+        self.assertContains(page, 'http-equiv="refresh"')
+        self.assertFalse(User.objects.filter(username='ana').exists())
+
+        other = User.objects.create_user('other', password='pw')
+        Profile.objects.create(user=other, role=Profile.ROLE_TEACHER)
+        self.client.force_login(other)
+        self.assertIsNone(self.client.get(f"/roster/upload/?{page.request['QUERY_STRING']}").context['job'])
+
+    def test_unreadable_upload_reports_the_error(self):
+        self.client.force_login(self.teacher)
+        page = self.upload("name,pass\nana,pw\n")
+        self.assertEqual(page.context['job']['state'], 'failed')
+        self.assertIn("'username' and 'password'", str(list(page.context['messages'])[0]))
+
+    def test_hashing_pool_is_started_once_and_reused(self):
+        class InlinePool:
+            def __init__(self, **kwargs):
+                pass
+
+            def map(self, fn, items, chunksize=1):
+                return map(fn, items)
+
+        with mock.patch.object(roster, 'ProcessPoolExecutor', side_effect=InlinePool) as pool, \
+                mock.patch.object(roster, '_pool', None), mock.patch.object(roster, 'PARALLEL_MIN_ROWS', 3):
+            roster.import_roster(["username,password\n", "a1,pw\n", "a2,pw\n"], workers=2)
+            self.assertEqual(pool.call_count, 0)  # too few to be worth the pool
+            for batch in ('b', 'c'):
+                lines = ["username,password\n"] + [f"{batch}{i},pw\n" for i in range(3)]
+                self.assertEqual(roster.import_roster(lines, workers=2).created, 3)
+            self.assertEqual(pool.call_count, 1)
+
+
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.world = World(2)
+        self.session = self.world.session
+        self.participants = list(Participant.objects.filter(session=self.session).order_by('id'))
+
+    def test_heartbeats_go_idle_then_offline_and_only_changes_are_written(self):
+        student = self.participants[0]
+        rows = [(p.id, p.user_id, p.status) for p in self.participants]
+        now = time.time()
+        with mock.patch.object(presence.time, 'time', return_value=now):
+            presence.heartbeat(self.session.id, student.user_id)
+            with self.assertNumQueries(1):  # only the participant who never sent a heartbeat
+                states = presence.sync_statuses(self.session.id, rows)
+        self.assertEqual(states, {self.participants[0].id: 'online', self.participants[1].id: 'offline'})
+
+        for age, expected in ((presence.ONLINE_SECONDS + 1, 'idle'), (presence.IDLE_SECONDS + 1, 'offline')):
+            with mock.patch.object(presence.time, 'time', return_value=now + age):
+                rows = list(Participant.objects.filter(session=self.session).values_list('id', 'user_id', 'status'))
+                self.assertEqual(presence.sync_statuses(self.session.id, rows)[student.id], expected)
+            self.assertEqual(Participant.objects.get(id=student.id).status, expected)
+
+    def test_heartbeat_endpoint_marks_the_student_online_without_writing(self):
+        student = self.world.student
+        self.client.force_login(student)
+        url = f'/deck/{self.world.deck.id}/heartbeat/{self.session.id}/'
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(presence.states(self.session.id, [student.id]), {student.id: 'online'})
+
+    def test_overview_counts_only_students_with_a_live_heartbeat(self):
+        # Both rows still say 'online' from when they joined; one student has since left.
+        self.assertEqual({p.status for p in self.participants}, {'online'})
+        presence.heartbeat(self.session.id, self.participants[0].user_id)
+        self.client.force_login(self.world.host)
+        rooms = self.client.get('/host/overview/data/').json()['sessions']
+        room = next(r for r in rooms if r['session_id'] == self.session.id)
+        self.assertEqual((room['participants'], room['online']), (2, 1))
+
+
+class QueryBudgetTests(TestCase):
+    """Pin the SQL query count and allocation peak of every app URL."""
+
+    def measure(self, world, route, role):
+        self.client.force_login(world.user(role))
+        # Warm up once so template compilation and first-time get_or_create
+        # writes don't count against the steady-state budget.
+        for attempt in range(2):
+            method, path, body = request_for(route, world)
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if body is not None else {}
+            tracemalloc.start()
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.client, method)(path, **kwargs)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertLess(response.status_code, 500, f"{route} as {role}")
+        return len(queries), peak
+
+    def test_every_route_has_a_budget(self):
+        missing = app_routes() - set(QUERY_BUDGETS) - UNREACHABLE_ROUTES
+        self.assertFalse(missing, f"Add a query budget for: {sorted(missing)}")
+
+    def test_query_and_allocation_budgets(self):
+        counts = {}
+        for n in DATA_SIZES:
+            with transaction.atomic():
+                cache.clear()
+                world = World(n)
+                for route in sorted(QUERY_BUDGETS):
+                    for role in ROLES:
+                        queries, peak = self.measure(world, route, role)
+                        with self.subTest(route=route, role=role, size=n):
+                            self.assertLessEqual(queries, QUERY_BUDGETS[route])
+                            self.assertLessEqual(peak, DEFAULT_ALLOCATION_BUDGET)
+                        counts.setdefault((route, role), []).append(queries)
+                transaction.set_rollback(True)
+
+        for (route, role), per_size in counts.items():
+            with self.subTest(route=route, role=role):
+                self.assertEqual(
+                    len(set(per_size)), 1,
+                    f"query count grows with data size: {dict(zip(DATA_SIZES, per_size))}",
+                )
+
+    def test_anonymous_home_budget(self):
+        for n in DATA_SIZES:
+            with transaction.atomic():
+                World(n)
+                self.client.get('/')
+                with self.assertNumQueries(0):
+                    self.client.get('/')
+                transaction.set_rollback(True)
+
+
+class SeedScaleTests(TestCase):
+    def test_small_dataset_fills_every_table(self):
+        call_command('seed_scale', users=20, decks=4, cards=40, sessions=30, submissions=30, seed=7,
+                     school='lincoln', stdout=open(os.devnull, 'w'))
+
+        seeded = User.objects.filter(username__startswith='seed7_')
+        self.assertEqual(seeded.count(), 20)
+        self.assertEqual(Profile.objects.filter(user__in=seeded, school='lincoln').count(), 20)
+        self.assertEqual(Card.objects.filter(deck__owner__in=seeded).count(), 40)
+        self.assertFalse(Session.objects.filter(host__in=seeded, auditorium=True).exists())
+        self.assertEqual(Session.objects.filter(host__in=seeded).count(), 30)
+        self.assertEqual(Submission.objects.filter(user__in=seeded).count(), 30)
+        self.assertFalse(Submission.objects.filter(user__in=seeded, updated_at__isnull=True).exists())
+        self.assertEqual(set(User.objects.filter(id__in=seeded).values_list('is_active', 'is_staff')), {(True, False)})
+        self.assertEqual(set(ActivityEntry.objects.filter(user__in=seeded, kind=ActivityEntry.KIND_CREATED)
+                             .values_list('score', flat=True)), {0})
+
+    def test_columns_left_out_take_model_defaults_or_fail_by_name(self):
+        command = seed_scale.Command()
+        command.started_at = timezone.now()
+        columns, values = command.defaults(Session, ['id', 'deck', 'host', 'code', 'created_at'])
+        self.assertEqual(dict(zip(columns, values)), {
+            '"is_active"': True, '"is_started"': False, '"started_at"': None, '"auditorium"': False,
+        })
+        with self.assertRaisesMessage(CommandError, 'Session.code'):
+            command.defaults(Session, ['deck', 'host'])
+
+
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.world = World(2)
+        self.client.force_login(self.world.student)
+
+    @override_settings(FLIPIQ_RATE_LIMITS={'heartbeat': {'user': (0.1, 2)}})
+    def test_rate_limited_endpoint_returns_429_with_retry_after(self):
+        url = f'/deck/{self.world.deck.id}/heartbeat/{self.world.session.id}/'
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 200)
+
+        with self.assertNumQueries(2):  # login session and user, which the view would load anyway
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(metrics.snapshot()['admission.shed.heartbeat.user'], 1)
+
+    @override_settings(FLIPIQ_RATE_LIMITS={'heartbeat': {'user': (0.1, 1)}})
+    def test_buckets_follow_the_user_not_the_cookie_or_address(self):
+        url = f'/deck/{self.world.deck.id}/heartbeat/{self.world.session.id}/'
+        other = Participant.objects.exclude(user=self.world.student).filter(session=self.world.session).first().user
+        self.assertEqual(self.client.post(url, REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+        self.client.cookies.clear()
+        self.client.force_login(self.world.student)  # a second device: new cookie and address
+        self.assertEqual(self.client.post(url, REMOTE_ADDR='10.0.0.2').status_code, 429)
+
+        self.client.force_login(other)  # a classmate behind the same NAT
+        self.assertEqual(self.client.post(url, REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    @override_settings(FLIPIQ_RATE_LIMITS={'submit_answer': {'room': (0.1, 1)}})
+    def test_answer_room_is_the_live_session_not_the_deck(self):
+        url = f'/deck/{self.world.deck.id}/submit_answer/'
+        second = Session.objects.create(deck=self.world.deck, host=self.world.host, is_started=True)
+        Participant.objects.create(session=second, user=self.world.student, total_cards=2)
+
+        def answer(session):
+            return self.client.post(url, json.dumps({
+                'session_id': session.id, 'card_id': self.world.card.id, 'choice': 'a',
+            }), content_type='application/json').status_code
+
+        self.assertEqual(answer(self.world.session), 200)
+        self.assertEqual(answer(self.world.session), 429)
+        self.assertEqual(answer(second), 200)
+        self.assertEqual(metrics.snapshot()['admission.shed.submit_answer.room'], 1)
+        analytics.flush()  # don't leave buffered counts for the next test's ids
+
+    @override_settings(FLIPIQ_RATE_LIMITS={'heartbeat': {'user': (0.1, 1), 'room': (0.1, 1)}})
+    def test_buckets_are_per_school(self):
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse('ok'))
+        url = f'/deck/{self.world.deck.id}/heartbeat/{self.world.session.id}/'
+
+        def admitted():
+            request = RequestFactory().post(url)
+            request.resolver_match = match = resolve(url)
+            request.user = self.world.student  # same ids in every school's database
+            return middleware.process_view(request, match.func, (), match.kwargs) is None
+
+        self.assertTrue(admitted())
+        self.assertFalse(admitted())
+        with tenancy.routed_to('school_lincoln'):
+            self.assertTrue(admitted())
+
+    def test_rate_limits_are_validated_at_startup(self):
+        self.assertEqual(check_rate_limits(), [])
+        with override_settings(FLIPIQ_RATE_LIMITS={'heartbeat': {'user': (0, 5)}, 'typeahead': {'ip': (1, 1)}}):
+            self.assertEqual([e.id for e in check_rate_limits()], ['FlipIQ_APP.E002'] * 2)
+
+    @override_settings(FLIPIQ_MAX_CONCURRENT_REQUESTS=1)
+    def test_concurrency_limit_sheds_excess_requests(self):
+        inner = []
+
+        def view(request):
+            inner.append(middleware(request))  # a second request while the first is in flight
+            return HttpResponse('ok')
+
+        middleware = AdmissionControlMiddleware(view)
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(inner[0].status_code, 429)
+        self.assertEqual(metrics.snapshot()['admission.shed.concurrency'], 1)
+
+
+class AnalyticsTests(TestCase):
+    def test_answers_roll_up_into_per_choice_counts(self):
+        world = World(2)
+        card = world.card
+        for choice, correct in [('a', True), ('b', False), ('b', False), ('', False)]:
+            analytics.record(world.deck.id, card.id, choice, correct)
+        analytics.flush()
+        analytics.record(world.deck.id, card.id, 'a', True)
+        analytics.flush()
+
+        stats = {s.choice: (s.count, s.correct) for s in CardAnswerStat.objects.filter(card=card)}
+        self.assertEqual(stats, {'a': (2, 2), 'b': (2, 0), '': (1, 0)})
+
+        report = analytics.deck_report(world.deck, [{'id': card.id, 'front': card.front, 'back': card.back}])
+        item = report['cards'][0]
+        self.assertEqual((item['attempts'], item['percent_correct']), (5, 40.0))
+        self.assertEqual(item['top_distractor']['choice'], 'b')
+        self.assertEqual(sum(b['cards'] for b in report['histogram']), 1)
+
+    def test_answers_cost_no_query_and_the_flusher_writes_them(self):
+        world = World(2)
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                analytics.record(world.deck.id, world.card.id, 'a', True)
+
+        # One pass of the background loop; the test's connection stays open.
+        with mock.patch.object(analytics.time, 'sleep', side_effect=[None, InterruptedError]), \
+                mock.patch.object(analytics.connections, 'close_all'):
+            with self.assertRaises(InterruptedError):
+                analytics._flush_forever(1)
+        self.assertEqual(CardAnswerStat.objects.get(card=world.card, choice='a').count, 3)
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        search_index.index.clear()
+        self.host = User.objects.create_user('teach')
+        Deck.objects.create(title='Algebra Basics', subject='Math', owner=self.host, visibility='public')
+        Deck.objects.create(title='World History', subject='History', owner=self.host, visibility='public')
+        Deck.objects.create(title='Secret Algebra', owner=self.host, visibility='private')
+
+    def titles(self, q):
+        return [d['title'] for d in self.client.get('/search/typeahead/', {'q': q}).json()['results']]
+
+    def test_prefix_matches_title_words_subject_and_owner_without_queries(self):
+        self.titles('a')  # first use builds the index
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles('alg'), ['Algebra Basics'])
+            self.assertEqual(self.titles('hist'), ['World History'])
+            self.assertEqual(len(self.titles('teach')), 2)
+
+    def test_signals_keep_index_current(self):
+        self.titles('a')
+        deck = Deck.objects.create(title='Algorithms', owner=self.host, visibility='public')
+        self.assertEqual(self.titles('algo'), ['Algorithms'])
+        deck.visibility = 'private'
+        deck.save()
+        self.assertEqual(self.titles('algo'), [])
+        Deck.objects.get(title='Algebra Basics').delete()
+        self.assertEqual(self.titles('alg'), [])
+
+
+class ActivityFeedTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teach', password='pw')
+        self.student = User.objects.create_user('stu', password='pw')
+        self.deck = Deck.objects.create(title='Fractions', owner=self.teacher)
+        Card.objects.create(deck=self.deck, front='1/2', back='0.5')
+        activity.cards_changed(self.deck)
+
+    def test_feed_follows_submissions_and_deck_changes(self):
+        session = Session.objects.create(deck=self.deck, host=self.teacher)
+        sub = Submission.objects.create(deck=self.deck, session=session, user=self.student, total=2)
+        sub.score = 1
+        with CaptureQueriesContext(connection) as ctx:
+            sub.save()  # mid-game answers leave the feed alone
+        self.assertFalse([q for q in ctx.captured_queries if 'FlipIQ_APP_activityentry' in q['sql']])
+        sub.finished_at = timezone.now()
+        sub.save()
+        self.deck.title = 'Fractions II'
+        self.deck.save()
+        Card.objects.create(deck=self.deck, front='1/4', back='0.25')
+        activity.cards_changed(self.deck)
+
+        played, has_next = activity.feed(self.student, ActivityEntry.KIND_PLAYED)
+        self.assertFalse(has_next)
+        self.assertEqual([(e.deck_title, e.deck_owner, e.card_count, e.score, e.session_id) for e in played],
+                         [('Fractions II', 'teach', 2, 1, session.id)])
+        created, _ = activity.feed(self.teacher, ActivityEntry.KIND_CREATED)
+        self.assertEqual([(e.deck_title, e.card_count) for e in created], [('Fractions II', 2)])
+
+        self.deck.delete()
+        self.assertFalse(ActivityEntry.objects.exists())
+
+    def test_profile_is_paginated_in_constant_queries(self):
+        for i in range(activity.PAGE_SIZE + 3):
+            Deck.objects.create(title=f'Deck {i}', owner=self.teacher)
+        self.client.login(username='teach', password='pw')
+        self.client.get('/profile/')
+        with self.assertNumQueries(QUERY_BUDGETS['profile/']):
+            first = self.client.get('/profile/')
+        self.assertEqual(len(first.context['created_decks']), activity.PAGE_SIZE)
+        self.assertTrue(first.context['created_has_next'])
+        second = self.client.get('/profile/', {'created_page': 2})
+        self.assertEqual(len(second.context['created_decks']), 4)
+        self.assertFalse(second.context['created_has_next'])
+
+
+class CompressionTests(TestCase):
+    def compress(self, body, content_type):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        return CompressionMiddleware(lambda r: HttpResponse(body, content_type=content_type))(request)
+
+    def test_large_html_and_json_are_gzipped(self):
+        body = json.dumps({'cards': [{'front': f'Q{i}', 'back': 'a'} for i in range(200)]})
+        response = self.compress(body, 'application/json')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content).decode(), body)
+        self.assertEqual(self.compress('<p>hi</p>' * 500, 'text/html; charset=utf-8')['Content-Encoding'], 'gzip')
+
+    def test_small_or_other_responses_are_left_alone(self):
+        self.assertFalse(self.compress('{"ok": true}', 'application/json').has_header('Content-Encoding'))
+        self.assertFalse(self.compress('x' * 5000, 'image/svg+xml').has_header('Content-Encoding'))
+
+    def test_precompressed_static_files(self):
+        root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root, 'css'))
+        css = b'body { color: #222; }' * 50
+        for name, data in (('site.abc123.css', css), ('site.abc123.css.gz', gzip.compress(css))):
+            with open(os.path.join(root, 'css', name), 'wb') as f:
+                f.write(data)
+
+        with override_settings(STATIC_ROOT=root, STATIC_URL='/static/'):
+            middleware = PrecompressedStaticMiddleware(lambda r: HttpResponse('view'))
+        middleware._immutable = {'css/site.abc123.css'}
+        factory = RequestFactory()
+
+        response = middleware(factory.get('/static/css/site.abc123.css', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), css)
+        response.close()
+
+        response = middleware(factory.get('/static/css/site.abc123.css'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response.close()
+        self.assertEqual(middleware(factory.get('/profile/')).content, b'view')
+
+
+class ReadReplicaRouterTests(TestCase):
+    def test_only_decorated_views_read_from_the_replica(self):
+        router = ReadReplicaRouter()
+        with mock.patch.dict(connections.settings, {'replica': {}}):
+            self.assertIsNone(router.db_for_read(Deck))
+            self.assertEqual(use_read_replica(lambda: router.db_for_read(Deck))(), 'replica')
+            self.assertIsNone(router.db_for_read(Deck))
+            self.assertEqual(use_read_replica(lambda: router.db_for_write(Deck))(), 'default')
+            self.assertFalse(router.allow_migrate('replica', 'FlipIQ_APP'))
+        # Without the production profile there is no replica to send reads to.
+        self.assertIsNone(use_read_replica(lambda: router.db_for_read(Deck))())
+
+
+class SpacedRepetitionTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teach')
+        self.student = User.objects.create_user('stu', password='pw')
+        self.deck = Deck.objects.create(title='Capitals', owner=self.teacher, visibility='public')
+        self.cards = Card.objects.bulk_create([Card(deck=self.deck, front=f'Q{i}', back='a') for i in range(5)])
+        self.now = timezone.now()
+
+    def test_sm2_intervals_grow_and_lapses_reset(self):
+        state = ReviewState(ease=2500)
+        intervals = [srs.schedule(state, 4, self.now).interval for _ in range(4)]
+        self.assertEqual(intervals, [1, 6, 15, 38])
+        srs.schedule(state, 1, self.now)
+        self.assertEqual((state.reps, state.lapses, state.interval), (0, 1, 0))
+        self.assertEqual(state.due_at, self.now + srs.RELEARN_DELAY)
+        self.assertGreaterEqual(state.ease, srs.MIN_EASE)
+
+    def test_queue_is_due_cards_then_new_ones(self):
+        srs.record_reviews(self.student, [(self.cards[0].id, 'again'), (self.cards[1].id, 'good')], now=self.now)
+        later = self.now + timedelta(minutes=30)
+        queue = srs.due_queue(self.student, self.deck.id, now=later)
+        self.assertEqual([c['id'] for c in queue], [self.cards[0].id] + [c.id for c in self.cards[2:]])
+        self.assertEqual([c['new'] for c in queue], [False, True, True, True])
+        self.assertEqual(srs.due_queue(self.student, now=later)[0]['front'], 'Q0')
+
+    def test_batched_reviews_are_one_upsert_and_respect_access(self):
+        private = Deck.objects.create(title='Mine', owner=self.teacher)
+        hidden = Card.objects.create(deck=private, front='x', back='y')
+        srs.record_reviews(self.student, [(self.cards[0].id, 'good')], now=self.now)
+        reviews = [(c.id, 'good') for c in self.cards] + [(hidden.id, 'easy'), (self.cards[0].id, 'bogus')]
+        with self.assertNumQueries(3):
+            self.assertEqual(srs.record_reviews(self.student, reviews, now=self.now), 5)
+        states = ReviewState.objects.filter(user=self.student)
+        self.assertEqual(states.count(), 5)
+        self.assertEqual(states.get(card=self.cards[0]).reps, 2)
+
+    def test_study_endpoints(self):
+        self.client.login(username='stu', password='pw')
+        self.assertEqual(self.client.get(f'/study/deck/{self.deck.id}/').status_code, 200)
+        response = self.client.post('/study/review/', json.dumps({'reviews': [
+            {'card': self.cards[0].id, 'grade': 'easy'},
+        ]}), content_type='application/json')
+        self.assertEqual(response.json(), {'saved': 1})
+        cards = self.client.get(f'/study/deck/{self.deck.id}/next/').json()['cards']
+        self.assertNotIn(self.cards[0].id, [c['id'] for c in cards])
+        self.assertEqual(self.client.post('/study/review/', 'nope', content_type='application/json').status_code, 400)
+        for grade in (['good'], {'good': 1}, None):
+            body = json.dumps({'reviews': [{'card': self.cards[1].id, 'grade': grade}]})
+            self.assertEqual(self.client.post('/study/review/', body, content_type='application/json').status_code, 400)
+
+
+class CloneDeckTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        self.teacher = User.objects.create_user('teach', password='pw')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        self.source = Deck.objects.create(title='Verbs', owner=self.author, visibility='public')
+        self.cards = Card.objects.bulk_create(
+            [Card(deck=self.source, front=f'Q{i}', back='a', choices=['a', 'b']) for i in range(30)]
+        )
+        self.client.login(username='teach', password='pw')
+
+    def clone(self):
+        response = self.client.post(f'/deck/clone/{self.source.id}/')
+        return Deck.objects.get(id=response.json()['deck_id'])
+
+    def fronts(self, deck):
+        return list(deck.get_cards().order_by('id').values_list('front', flat=True))
+
+    def test_clone_shares_cards_without_copying(self):
+        with CaptureQueriesContext(connection) as ctx:
+            clone = self.clone()
+        self.assertFalse([q for q in ctx.captured_queries if 'INSERT INTO "FlipIQ_APP_card"' in q['sql']])
+        self.assertEqual(Card.objects.count(), 30)
+        self.assertEqual(clone.shared_from, self.source)
+        self.assertEqual(len(self.fronts(clone)), 30)
+        data = self.client.get(f'/get-deck-data/{clone.id}/').json()
+        self.assertEqual(len(data['cards']), 30)
+        self.assertEqual(ActivityEntry.objects.get(deck=clone, kind=ActivityEntry.KIND_CREATED).card_count, 30)
+
+    def test_first_edit_of_a_clone_copies_the_cards(self):
+        clone = self.clone()
+        response = self.client.post(f'/update_card/{self.cards[0].id}/?deck={clone.id}',
+                                    json.dumps({'front': 'Edited'}), content_type='application/json')
+        remapped = {int(k): v for k, v in response.json()['remapped'].items()}
+        self.assertEqual(set(remapped), {c.id for c in self.cards})
+        clone.refresh_from_db()
+        self.assertIsNone(clone.shared_from)
+        self.assertEqual(self.fronts(clone)[0], 'Edited')
+        self.assertEqual(self.fronts(self.source)[0], 'Q0')
+
+    def test_source_edits_reach_clones_without_copying(self):
+        clone = self.clone()
+        self.client.logout()
+        self.client.login(username='author', password='pw')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(f'/update_card/{self.cards[0].id}/', json.dumps({'front': 'Changed'}),
+                             content_type='application/json')
+        self.assertFalse([q for q in ctx.captured_queries if 'INSERT INTO "FlipIQ_APP_card"' in q['sql']])
+        clone.refresh_from_db()
+        self.assertEqual(clone.shared_from, self.source)
+        self.assertEqual(self.fronts(clone)[0], 'Changed')
+
+        self.cards[1].delete()
+        activity.cards_changed(self.source)
+        self.assertEqual(self.fronts(clone)[1], 'Q2')
+        self.assertEqual(ActivityEntry.objects.get(deck=clone, kind=ActivityEntry.KIND_CREATED).card_count, 29)
+
+    def test_deleting_the_source_copies_its_cards_once(self):
+        first, second, third = self.clone(), self.clone(), self.clone()
+        analytics.record(second.id, self.cards[0].id, 'a', True)
+        with CaptureQueriesContext(connection) as ctx:
+            self.source.delete()
+        inserts = [q for q in ctx.captured_queries if 'INSERT INTO "FlipIQ_APP_card"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Card.objects.count(), 30)
+        for deck in (first, second, third):
+            deck.refresh_from_db()
+            self.assertEqual(len(self.fronts(deck)), 30)
+        self.assertIsNone(first.shared_from_id)
+        self.assertEqual((second.shared_from_id, third.shared_from_id), (first.id, first.id))
+        report = analytics.deck_report(second, second.get_cards().order_by('id').values('id', 'front', 'back'))
+        self.assertEqual(report['cards'][0]['attempts'], 1)
+
+    def test_clones_point_at_the_deck_that_stores_the_cards(self):
+        clone = self.clone()
+        again = cloning.clone_deck(clone, self.teacher)
+        self.assertEqual(again.shared_from_id, self.source.id)
+
+    def test_source_and_clone_keep_their_own_analytics(self):
+        clone = self.clone()
+        student = User.objects.create_user('kid', password='pw')
+        card = self.cards[0]
+        for deck, choice in [(self.source, 'a'), (clone, 'b'), (clone, 'b')]:
+            session = Session.objects.create(deck=deck, host=deck.owner, is_started=True)
+            self.client.force_login(student)
+            self.client.post(f'/deck/{deck.id}/submit_answer/', json.dumps(
+                {'session_id': session.id, 'card_id': card.id, 'choice': choice}), content_type='application/json')
+
+        def attempts(deck):
+            report = analytics.deck_report(deck, deck.get_cards().values('id', 'front', 'back'))
+            return {c['choice']: c['count'] for c in report['cards'][0]['choices']}
+
+        self.assertEqual(attempts(self.source), {'a': 1})
+        self.assertEqual(attempts(clone), {'b': 2})
+
+        # The clone's counts follow it onto its own cards; the source keeps its own.
+        self.client.force_login(self.teacher)
+        self.client.post(f'/update_card/{card.id}/?deck={clone.id}', json.dumps({'front': 'Edited'}),
+                         content_type='application/json')
+        clone.refresh_from_db()
+        self.assertEqual(attempts(clone), {'b': 2})
+        self.assertEqual(attempts(self.source), {'a': 1})
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        leaderboard._boards.clear()
+        self.host = User.objects.create_user('host', password='pw')
+        self.deck = Deck.objects.create(title='Sums', owner=self.host)
+        self.cards = Card.objects.bulk_create(
+            [Card(deck=self.deck, front=f'{i}+{i}', back=str(2 * i), choices=[str(2 * i), 'x']) for i in range(3)]
+        )
+        started = timezone.now() - timedelta(minutes=5)
+        self.session = Session.objects.create(deck=self.deck, host=self.host, code='LB1', is_active=True,
+                                              is_started=True, started_at=started)
+        self.students = []
+        for name, score, took in (('ann', 3, 90), ('bob', 3, 60), ('cat', 2, 30), ('dan', 1, None)):
+            user = User.objects.create_user(name, password='pw')
+            Participant.objects.create(session=self.session, user=user, total_cards=3, progress=3 if took else 0)
+            Submission.objects.create(user=user, deck=self.deck, session=self.session, score=score, total=3,
+                                      finished_at=started + timedelta(seconds=took) if took else None)
+            self.students.append(user)
+
+    def standings(self, username, k=10):
+        self.client.login(username=username, password='pw')
+        return self.client.get(f'/deck/{self.deck.id}/leaderboard/{self.session.id}/?k={k}').json()
+
+    def test_ranks_by_score_then_finish_time(self):
+        data = self.standings('cat', k=3)
+        self.assertEqual([(e['name'], e['score'], e['seconds']) for e in data['top']],
+                         [('bob', 3, 60.0), ('ann', 3, 90.0), ('cat', 2, 30.0)])
+        self.assertEqual(data['me']['rank'], 3)
+        self.assertEqual(data['total'], 4)
+        self.assertIsNone(self.standings('host')['me'])
+
+    @override_settings(FLIPIQ_LEADERBOARD_MAX_AGE=3600)  # no refresh however slow the posts are
+    def test_answers_move_the_loaded_board_without_a_rebuild(self):
+        self.standings('dan')
+        self.client.login(username='dan', password='pw')
+        for card in self.cards:
+            self.client.post(f'/deck/{self.deck.id}/submit_answer/', json.dumps({
+                'session_id': self.session.id, 'card_id': card.id, 'choice': card.back,
+            }), content_type='application/json')
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.standings('dan')
+        self.assertFalse([q for q in ctx.captured_queries if 'FlipIQ_APP_submission' in q['sql']])
+        self.assertEqual(data['me']['score'], 4)
+        self.assertEqual(data['me']['rank'], 1)
+
+    def test_board_is_rebuilt_from_the_database(self):
+        self.standings('ann')
+        Submission.objects.filter(user=self.students[2]).update(score=5)
+        leaderboard.forget(self.session.id)
+        self.assertEqual(self.standings('ann')['top'][0]['name'], 'cat')
+
+        # Another worker's answer: refreshed in place, reading only rows changed since the last sync
+        Submission.objects.filter(user=self.students[3]).update(score=9, updated_at=timezone.now())
+        board = leaderboard.board_for(self.session)
+        with override_settings(FLIPIQ_LEADERBOARD_MAX_AGE=0), CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.standings('ann')['top'][0]['name'], 'dan')
+        self.assertIs(leaderboard.board_for(self.session), board)
+        self.assertTrue([q for q in ctx.captured_queries if '"updated_at" >=' in q['sql']])
+
+    def test_kicked_and_departed_students_leave_the_board(self):
+        self.assertEqual(self.standings('ann')['total'], 4)
+        bob = Participant.objects.get(session=self.session, user=self.students[1])
+        self.client.login(username='host', password='pw')
+        self.client.post(f'/kick_participant/{bob.id}/')
+        self.client.login(username='dan', password='pw')
+        self.client.get(f'/deck/{self.deck.id}/leave/{self.session.id}/')
+
+        data = self.standings('ann')
+        self.assertEqual([e['name'] for e in data['top']], ['ann', 'cat'])
+        self.assertEqual((data['me']['rank'], data['total']), (1, 2))
+        leaderboard.forget(self.session.id)
+        self.assertEqual(self.standings('ann')['total'], 2)
+
+    def test_reset_and_restart_keep_ranks_consistent(self):
+        self.assertEqual(self.standings('bob')['me']['rank'], 1)
+        self.client.post(f'/deck/{self.deck.id}/reset_progress/{self.session.id}/')
+        me = self.standings('bob')['me']
+        self.assertEqual((me['score'], me['seconds'], me['rank']), (0, None, 4))
+
+        started_at = self.session.started_at
+        self.client.login(username='host', password='pw')
+        self.client.post(f'/deck/{self.deck.id}/start_quiz/')
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.started_at, started_at)
+        self.assertEqual(self.standings('ann')['me']['seconds'], 90.0)
+
+
+@override_settings(FLIPIQ_JOIN_FLUSH_EVERY=1000, FLIPIQ_JOIN_FLUSH_INTERVAL=3600, FLIPIQ_ROSTER_PAGE_SIZE=5)
+class AuditoriumTests(TestCase):
+    def setUp(self):
+        auditorium._pending.clear()
+        auditorium._pending_count = 0
+        self.host = User.objects.create_user('host', password='pw')
+        self.deck = Deck.objects.create(title='Assembly', owner=self.host)
+        Card.objects.bulk_create([Card(deck=self.deck, front=f'Q{i}', back='a', choices=['a']) for i in range(10)])
+        self.session = Session.objects.create(deck=self.deck, host=self.host, code='AUD001', auditorium=True)
+        self.students = User.objects.bulk_create([User(username=f's{i}') for i in range(12)])
+
+    def join(self, user):
+        self.client.force_login(user)
+        return self.client.post('/join_by_code/', json.dumps({'code': 'AUD001'}), content_type='application/json')
+
+    def test_joins_are_buffered_and_bulk_inserted(self):
+        with CaptureQueriesContext(connection) as ctx:
+            for user in self.students + self.students[:3]:
+                self.assertTrue(self.join(user).json()['success'])
+        self.assertFalse([q for q in ctx.captured_queries if 'INSERT INTO "FlipIQ_APP_participant"' in q['sql']])
+        self.assertEqual(Participant.objects.count(), 0)
+
+        self.client.force_login(self.host)
+        data = self.client.get(f'/deck/{self.deck.id}/status/').json()
+        self.assertEqual(data['count'], 12)
+        self.assertEqual(data['participants'], [])
+        self.assertEqual(Participant.objects.filter(total_cards=10).count(), 12)
+
+    def test_flusher_writes_joins_without_further_traffic(self):
+        for user in self.students[:3]:
+            self.join(user)
+        self.assertEqual(Participant.objects.count(), 0)
+
+        # One pass of the background loop; the test's connection stays open.
+        with mock.patch.object(auditorium.time, 'sleep', side_effect=[None, InterruptedError]), \
+                mock.patch.object(auditorium.connections, 'close_all'):
+            with self.assertRaises(InterruptedError):
+                auditorium._flush_forever(1)
+        self.assertEqual(Participant.objects.filter(session=self.session).count(), 3)
+
+    def test_host_gets_histogram_and_roster_pages(self):
+        Participant.objects.bulk_create(
+            [Participant(session=self.session, user=u, total_cards=10, progress=i % 11) for i, u in enumerate(self.students)]
+        )
+        self.client.force_login(self.host)
+        data = self.client.get(f'/deck/{self.deck.id}/status/').json()
+        self.assertEqual(data['buckets'], [2, 1, 1, 1, 1, 1, 1, 1, 1, 1])
+        self.assertEqual(data['finished'], 1)
+
+        pages = [self.client.get(f'/deck/{self.deck.id}/status/?page={n}').json() for n in (1, 2, 3)]
+        self.assertEqual([len(p['participants']) for p in pages], [5, 5, 2])
+        self.assertEqual([p['has_next'] for p in pages], [True, True, False])
+
+    def test_waiting_room_sends_one_page_and_the_head_count(self):
+        for user in self.students:
+            self.join(user)
+        data = self.client.get(f'/deck/{self.deck.id}/participants/{self.session.id}/').json()
+        self.assertEqual(len(data['participants']), 5)
+        self.assertEqual(data['count'], 12)
+
+    def test_waiting_room_poll_shares_only_selects(self):
+        for user in self.students[:3]:
+            self.join(user)
+        shared = []
+        do = views.participants_flight.do
+
+        def spy(key, fn):
+            with CaptureQueriesContext(connection) as ctx:
+                result = do(key, fn)
+            shared.extend(q['sql'] for q in ctx.captured_queries)
+            return result
+
+        with mock.patch.object(views.participants_flight, 'do', side_effect=spy):
+            data = self.client.get(f'/deck/{self.deck.id}/participants/{self.session.id}/').json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['participants'][2]['status'], 'online')
+        self.assertTrue(shared)
+        self.assertTrue(all(sql.startswith('SELECT') for sql in shared), shared)
+
+
+class ProvisioningTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user('host', password='pw')
+        self.deck = Deck.objects.create(title='Start', owner=self.host)
+        Card.objects.bulk_create([Card(deck=self.deck, front=f'Q{i}', back='a', choices=['a']) for i in range(4)])
+        self.session = Session.objects.create(deck=self.deck, host=self.host, code='GO0001')
+        self.students = User.objects.bulk_create([User(username=f's{i}') for i in range(20)])
+        Participant.objects.bulk_create([Participant(session=self.session, user=u) for u in self.students])
+
+    def start(self):
+        self.client.force_login(self.host)
+        return self.client.post(f'/deck/{self.deck.id}/start_quiz/')
+
+    def test_start_creates_rows_for_the_whole_room(self):
+        Submission.objects.create(deck=self.deck, session=self.session, user=self.students[0], score=2, total=4)
+        self.start()
+        self.assertEqual(Submission.objects.filter(session=self.session).count(), 20)
+        self.assertEqual(Submission.objects.get(user=self.students[0]).score, 2)
+        self.assertEqual(Participant.objects.filter(session=self.session, total_cards=4).count(), 20)
+        self.assertEqual(ActivityEntry.objects.filter(session=self.session, kind=ActivityEntry.KIND_PLAYED).count(), 20)
+
+    def test_play_deck_only_reads_after_start(self):
+        self.start()
+        self.client.force_login(self.students[5])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/deck/{self.deck.id}/play/{self.session.id}/')
+        self.assertEqual(response.status_code, 200)
+        writes = [q['sql'] for q in ctx.captured_queries
+                  if q['sql'].startswith(('INSERT', 'UPDATE')) and 'django_session' not in q['sql']]
+        self.assertEqual(writes, [])
+
+    def test_late_joiner_still_gets_rows(self):
+        self.start()
+        late = User.objects.create_user('late', password='pw')
+        self.client.force_login(late)
+        self.assertEqual(self.client.get(f'/deck/{self.deck.id}/play/{self.session.id}/').status_code, 200)
+        self.assertTrue(Participant.objects.filter(session=self.session, user=late, total_cards=4).exists())
+        self.assertTrue(Submission.objects.filter(session=self.session, user=late).exists())
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.group = singleflight.Group('test')
+
+    def wait_for_saved(self, n):
+        deadline = time.monotonic() + 5
+        while metrics.snapshot().get('singleflight.test.saved', 0) < n and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_concurrent_threads_share_one_call(self):
+        release = threading.Event()
+        calls, results = [], []
+
+        def load():
+            calls.append(1)
+            release.wait(5)
+            return ['card']
+
+        threads = [threading.Thread(target=lambda: results.append(self.group.do('deck:1', load))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        self.wait_for_saved(7)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['card']] * 8)
+        self.assertEqual(metrics.snapshot()['singleflight.test.saved'], 7)
+        self.assertEqual(self.group.do('deck:1', lambda: 'fresh'), 'fresh')  # nothing is cached
+
+    def test_waiters_get_the_leaders_exception(self):
+        release = threading.Event()
+        errors = []
+
+        def fail():
+            release.wait(5)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                self.group.do('k', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for t in threads:
+            t.start()
+        self.wait_for_saved(2)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(errors), 3)
+
+
+class TenantTests(TestCase):
+    """
+    A second school database on a scratch file, attached and migrated before
+    the test transaction opens. It isn't in settings, so the runner never sees it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        connections.settings['school_lincoln'] = {
+            **connections.settings['default'], 'NAME': os.path.join(cls.tmp.name, 'lincoln.sqlite3'), 'TEST': {'MIRROR': None},
+        }
+        call_command('migrate', database='school_lincoln', verbosity=0)
+        cls.databases = {'default', 'school_lincoln'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['school_lincoln'].close()
+        del connections.settings['school_lincoln']
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.teacher = User.objects.create_user('lincoln-teacher', password='pw')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER, school='lincoln')
+        self.deck = Deck.objects.create(title='Lincoln Fractions', owner=self.teacher, visibility='public')
+        Card.objects.bulk_create([Card(deck=self.deck, front=f'Q{i}', back='a', choices=['a']) for i in range(3)])
+        other = User.objects.create_user('elsewhere', password='pw')
+        Deck.objects.create(title='Shared Verbs', owner=other, visibility='public')
+
+    tenants = {'lincoln': {'db': 'lincoln.sqlite3', 'hosts': ['lincoln.testserver']}}
+
+    def test_router_follows_the_active_school(self):
+        router = TenantRouter()
+        with override_settings(FLIPIQ_TENANTS=self.tenants):
+            self.assertEqual(tenancy.school_for_host('lincoln.testserver:8000'), 'lincoln')
+            self.assertIsNone(router.db_for_write(Deck))
+            with tenancy.activate('lincoln'):
+                self.assertEqual(router.db_for_write(Deck), 'school_lincoln')
+                self.assertEqual(tenancy.scope(), 'school_lincoln')
+            with tenancy.activate('unknown'):
+                self.assertIsNone(router.db_for_read(Deck))
+        self.assertTrue(router.allow_migrate('school_lincoln', 'auth'))
+
+    def test_copy_school_and_serve_it_from_its_own_database(self):
+        copied = tenancy.copy_school('lincoln', 'default', 'school_lincoln')
+        self.assertEqual((copied['User'], copied['Deck'], copied['Card']), (1, 1, 3))
+        self.assertFalse(Deck.objects.using('school_lincoln').filter(title='Shared Verbs').exists())
+
+        middleware = ['FlipIQ_APP.tenancy.TenantMiddleware', *settings.MIDDLEWARE]
+        with override_settings(FLIPIQ_TENANTS=self.tenants, ALLOWED_HOSTS=['lincoln.testserver', 'testserver'],
+                               MIDDLEWARE=middleware, DATABASE_ROUTERS=['FlipIQ_APP.routers.TenantRouter']):
+            with tenancy.activate('lincoln'):
+                self.client.force_login(User.objects.get(username='lincoln-teacher'))
+            response = self.client.get('/', HTTP_HOST='lincoln.testserver')
+        self.assertEqual([d.title for d in response.context['public_decks']], ['Lincoln Fractions'])
+        self.assertEqual([d['title'] for d in response.context['other_schools']],
+                         ['Shared Verbs', 'Lincoln Fractions'])
+
+    def test_other_schools_decks_are_cached_until_their_catalog_changes(self):
+        tenancy.copy_school('lincoln', 'default', 'school_lincoln')
+        cache.clear()
+        with override_settings(FLIPIQ_TENANTS=self.tenants):
+            with tenancy.activate('lincoln'):
+                self.assertEqual(len(catalog.elsewhere()), 2)
+                with CaptureQueriesContext(connections['default']) as ctx:
+                    self.assertEqual(len(catalog.elsewhere()), 2)
+                self.assertEqual(len(ctx.captured_queries), 0)
+
+            Deck.objects.create(title='New in default', owner=self.teacher, visibility='public')
+            with tenancy.activate('lincoln'):
+                self.assertEqual(catalog.elsewhere()[0]['title'], 'New in default')
+
+
+@override_settings(FLIPIQ_HOME_PAGE_SIZE=2)
+class HomeCatalogCacheTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.teacher = User.objects.create_user('teach')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        self.student = User.objects.create_user('stu')
+        Profile.objects.create(user=self.student, role=Profile.ROLE_STUDENT)
+        self.decks = [
+            Deck.objects.create(title=f'Deck {i}', owner=self.teacher, visibility='public') for i in range(3)
+        ]
+        self.session = Session.objects.create(deck=self.decks[2], host=self.teacher, is_started=True)
+        Submission.objects.create(deck=self.decks[2], session=self.session, user=self.student, score=1, total=1)
+
+    def test_pages_are_rendered_once_and_played_decks_layered_per_user(self):
+        self.client.force_login(self.student)
+        self.client.get('/')
+        with self.assertNumQueries(4):  # session, user, profile, played decks on the page
+            response = self.client.get('/')
+        self.assertEqual(response.context['grid']['deck_ids'], [self.decks[2].id, self.decks[1].id])
+        self.assertTrue(response.context['grid']['has_next'])
+        self.assertEqual(response.context['played'], {self.decks[2].id: self.session.id})
+        self.assertNotContains(response, 'Copy to my decks')
+
+        older = self.client.get('/', {'page': 2})
+        self.assertEqual(older.context['grid']['deck_ids'], [self.decks[0].id])
+        self.assertEqual(older.context['played'], {})
+
+        counters = metrics.snapshot()
+        self.assertEqual(counters['home_cache.hits'], 1)
+        self.assertEqual(counters['home_cache.misses'], 2)
+        self.assertGreater(counters['home_cache.render_us_saved'], 0)
+
+    def test_audiences_get_their_own_page(self):
+        self.client.get('/')
+        self.client.force_login(self.teacher)
+        self.assertContains(self.client.get('/'), 'Copy to my decks')
+        self.assertEqual(metrics.snapshot()['home_cache.misses'], 2)
+
+    def test_deck_and_card_changes_retire_cached_pages(self):
+        self.assertContains(self.client.get('/'), 'Deck 2')
+        self.decks[2].title = 'Renamed'
+        self.decks[2].save()
+        self.assertContains(self.client.get('/'), 'Renamed')
+
+        self.assertContains(self.client.get('/'), '0 cards')
+        card = Card.objects.create(deck=self.decks[2], front='Q', back='a', choices=['a'])
+        self.assertContains(self.client.get('/'), '1 cards')
+        card.delete()
+        self.decks[1].delete()
+        response = self.client.get('/')
+        self.assertEqual(response.context['grid']['deck_ids'], [self.decks[2].id, self.decks[0].id])
+        self.assertEqual(metrics.snapshot().get('home_cache.hits', 0), 1)
+
+    def test_only_public_changes_retire_pages_once_per_publish(self):
+        version = catalog.version()
+        private = Deck.objects.create(title='Draft', owner=self.teacher)
+        Card.objects.create(deck=private, front='Q', back='a', choices=['a'])
+        private.title = 'Still a draft'
+        private.save()
+        self.assertEqual(catalog.version(), version)
+
+        self.client.force_login(self.teacher)
+        self.client.post('/publish_deck/', json.dumps({
+            'deckId': self.decks[0].id, 'deckTitle': 'Deck 0', 'visibility': 'public',
+            'cards': [{'front': f'q{i}', 'back': 'a', 'choices': ['a']} for i in range(5)],
+        }), content_type='application/json')
+        self.client.post('/publish_deck/', json.dumps({
+            'deckId': self.decks[0].id, 'deckTitle': 'Deck 0', 'visibility': 'public',
+            'cards': [{'front': 'q', 'back': 'a', 'choices': ['a']}],
+        }), content_type='application/json')
+        self.assertEqual(catalog.version(), version + 2)
+
+        self.decks[1].visibility = 'private'  # leaving the catalog retires it too
+        self.decks[1].save()
+        self.assertEqual(catalog.version(), version + 3)
+
+    def test_deploy_check_requires_a_shared_version_store(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://127.0.0.1:6379'}}
+        with override_settings(CACHES=local):
+            self.assertEqual([e.id for e in live_state.check_shared_store()], ['FlipIQ_APP.E001'])
+        with override_settings(CACHES=shared):
+            self.assertEqual(live_state.check_shared_store(), [])
+
+
+class WireFormatTests(TestCase):
+    def setUp(self):
+        self.world = World(3)
+        self.client.force_login(self.world.student)
+        self.compact = {'HTTP_ACCEPT': f'{wire.COMPACT}, application/json'}
+
+    def assert_same_data(self, url, schema, method='get', **kwargs):
+        plain = getattr(self.client, method)(url, **kwargs)
+        compact = getattr(self.client, method)(url, **kwargs, **self.compact)
+        self.assertEqual(plain['Content-Type'], 'application/json')
+        self.assertEqual(compact['Content-Type'], wire.COMPACT)
+        self.assertIn('Accept', compact['Vary'])
+        self.assertLess(len(compact.content), len(plain.content))
+        return plain.json(), wire.decode(wire.SCHEMAS[schema], compact.json())
+
+    def test_client_helper_carries_the_same_schemas(self):
+        path = os.path.join(os.path.dirname(__file__), 'static', 'FlipIQ_APP', 'js', 'wire.js')
+        with open(path) as f:
+            line = next(line for line in f if 'const SCHEMAS = ' in line)
+        self.assertEqual(json.loads(line.split('=', 1)[1].strip().rstrip(';')), wire.SCHEMAS)
+
+    def test_roster_columns_round_trip_with_enum_status(self):
+        data = {'participants': [{'name': 'A', 'status': 'online'}, {'name': 'B', 'status': 'offline'},
+                                 {'name': 'C', 'status': 'online'}], 'count': 3}
+        values = wire.encode(wire.SCHEMAS['roster'], data)
+        self.assertEqual(values, [[['A', 'B', 'C'], [['online', 'offline'], [0, 1, 0]]], 3])
+        self.assertEqual(wire.decode(wire.SCHEMAS['roster'], values), data)
+        self.assertEqual(wire.decode(wire.SCHEMAS['roster'], wire.encode(wire.SCHEMAS['roster'],
+                                                                         {'participants': [], 'count': 0})),
+                         {'participants': [], 'count': 0})
+
+    def test_polling_endpoints_negotiate(self):
+        session = self.world.session
+        plain, decoded = self.assert_same_data(f'/deck/{self.world.deck.id}/participants/{session.id}/', 'roster')
+        self.assertEqual(decoded, plain)
+        plain, decoded = self.assert_same_data(f'/check_session/{session.code}/', 'session_status')
+        self.assertEqual(decoded, plain)
+
+    def test_submit_answer_negotiates_and_errors_stay_plain(self):
+        url = f'/deck/{self.world.deck.id}/submit_answer/'
+        body = json.dumps({'session_id': self.world.session.id, 'card_id': self.world.card.id, 'choice': 'a'})
+        plain, decoded = self.assert_same_data(url, 'answer', method='post', data=body,
+                                               content_type='application/json')
+        self.assertEqual(decoded['score'], plain['score'] + 1)
+        self.assertEqual(set(decoded), set(plain))
+
+        bad = self.client.post(url, data='nope', content_type='application/json', **self.compact)
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(bad['Content-Type'], 'application/json')
+
+
+class SessionTraceTests(TestCase):
+    def setUp(self):
+        trace._buffer.clear()
+        self.host = User.objects.create_user('host')
+        self.deck = Deck.objects.create(title='Fractions', owner=self.host)
+        self.cards = Card.objects.bulk_create([Card(deck=self.deck, front=f'Q{i}', back='a', choices=['a', 'b'])
+                                               for i in range(2)])
+        self.session = Session.objects.create(deck=self.deck, host=self.host, code='TRC001')
+        self.students = User.objects.bulk_create([User(username=f's{i}') for i in range(3)])
+
+    def as_user(self, user):
+        self.client.force_login(user)
+        return self.client
+
+    def answer(self, user, card, rtt_ms=None):
+        return self.as_user(user).post(f'/deck/{self.deck.id}/submit_answer/', json.dumps({
+            'session_id': self.session.id, 'card_id': card.id, 'choice': 'a', 'rtt_ms': rtt_ms,
+        }), content_type='application/json')
+
+    def test_lifecycle_is_buffered_then_summarised(self):
+        for user in self.students:
+            self.as_user(user).post('/join_by_code/', json.dumps({'code': 'TRC001'}), content_type='application/json')
+        self.as_user(self.host).post(f'/deck/{self.deck.id}/activate_flag/')
+        for user in self.students[:2]:
+            self.as_user(user).get(f'/deck/{self.deck.id}/play/{self.session.id}/')
+            self.answer(user, self.cards[0])
+            self.answer(user, self.cards[1], rtt_ms=42)
+        self.assertFalse(SessionTraceEvent.objects.exists())
+
+        summary = self.as_user(self.host).get(f'/deck/{self.deck.id}/trace/{self.session.id}/').context['summary']
+        self.assertEqual(summary['joined'], 3)
+        self.assertEqual(summary['wait_to_first_card_ms']['n'], 2)
+        self.assertEqual(summary['answer_server_ms']['n'], 4)
+        self.assertEqual(summary['answer_round_trip_ms'], {'n': 2, 'p50': 42.0, 'p95': 42.0, 'max': 42.0})
+        self.assertEqual(summary['finish_ms']['n'], 2)
+        self.assertEqual(summary['stragglers'], [
+            {'user_id': self.students[2].id, 'name': 's2', 'reason': 'never reached a card', 'ms': None},
+        ])
+        self.assertEqual(SessionTraceEvent.objects.filter(session=self.session).count(), 3 + 1 + 2 + 4 + 2 + 2)
+
+    def test_export_is_a_json_download_for_the_host_only(self):
+        trace.record(self.session.id, SessionTraceEvent.KIND_JOIN, self.students[0].id)
+        self.assertEqual(self.as_user(self.students[0]).get(f'/deck/{self.deck.id}/trace/{self.session.id}/export/')
+                         .status_code, 404)
+        response = self.as_user(self.host).get(f'/deck/{self.deck.id}/trace/{self.session.id}/export/')
+        self.assertIn('attachment', response['Content-Disposition'])
+        data = response.json()
+        self.assertEqual([(e['kind'], e['user__username']) for e in data['events']], [('join', 's0')])
+        self.assertEqual(data['summary']['joined'], 1)
+
+    def test_slow_finishers_are_stragglers(self):
+        for user, ms in zip(self.students, (1000, 1200, 5000)):
+            trace.record(self.session.id, SessionTraceEvent.KIND_PLAY, user.id, 100)
+            trace.record(self.session.id, SessionTraceEvent.KIND_FINISH, user.id, ms)
+        summary = trace.summary(self.session, trace.events(self.session))
+        self.assertEqual([(s['name'], s['reason'], s['ms']) for s in summary['stragglers']],
+                         [('s2', 'slow finish', 5000.0)])
+
+    def test_full_ring_buffer_drops_the_oldest(self):
+        metrics.reset()
+        with mock.patch.object(trace, '_buffer', deque(maxlen=2)):
+            for user in self.students:
+                trace.record(self.session.id, SessionTraceEvent.KIND_JOIN, user.id)
+            rows = trace.events(self.session)
+        self.assertEqual([row['user_id'] for row in rows], [u.id for u in self.students[1:]])
+        self.assertEqual(metrics.snapshot()['trace.dropped'], 1)
+
+
+class WarmupTests(TestCase):
+    def test_warm_up_compiles_templates_and_loads_live_sessions(self):
+        leaderboard._boards.clear()
+        search_index.index.clear()
+        world = World(2)
+        Session.objects.filter(id=world.session.id).update(is_active=True, started_at=timezone.now())
+
+        self.assertIn('FlipIQ_APP/play_deck.html', warmup.template_names())
+        self.assertIn('report_view.html', warmup.template_names())
+        self.assertEqual(set(warmup.warm_up()), {'urls', 'templates', 'connections', 'caches'})
+        self.assertIn(('default', world.session.id), leaderboard._boards)
+        self.assertTrue(search_index.index.ready)
+
+        # Nothing left to load on the first poll
+        self.client.force_login(world.student)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/deck/{world.deck.id}/leaderboard/{world.session.id}/')
+        self.assertFalse([q for q in ctx.captured_queries if 'FlipIQ_APP_submission' in q['sql']])
+
+    @override_settings(FLIPIQ_WARMUP=True)
+    def test_serve_hands_no_connection_or_thread_across_a_fork(self):
+        self.addCleanup(request_started.disconnect, dispatch_uid='flipiq-start-background')
+        with mock.patch.object(warmup, 'warm_up', return_value={}), \
+                mock.patch.object(warmup.connections, 'close_all') as close_all, \
+                mock.patch.object(warmup, '_background_pid', None), \
+                mock.patch.object(warmup.trace, 'start_flusher'), \
+                mock.patch.object(warmup.auditorium, 'start_flusher'), \
+                mock.patch.object(warmup.analytics, 'start_flusher') as start:
+            warmup.serve()
+            close_all.assert_called_once()
+            start.assert_not_called()
+
+            self.client.get('/join/')
+            self.client.get('/join/')
+            self.assertEqual(start.call_count, 1)
+            warmup._background_pid = -1  # as inherited by a forked worker
+            self.client.get('/join/')
+            self.assertEqual(start.call_count, 2)
@@ -0,0 +1,169 @@
+"""
+Per-session latency trace of the classroom lifecycle.
+
+Endpoint metrics say how the server did; this records what one class
+experienced. Views call :func:`record` at the moments that matter:
+
+* ``join``: a student joined with the code,
+* ``start``: the host started the quiz,
+* ``play``: a play screen rendered, with the wait since the start in ``ms``,
+* ``answer``: ``submit_answer`` handled an answer, with its server time,
+* ``rtt``: the round trip the play screen measured for its previous answer,
+* ``finish``: a student answered their last card, with time since the start.
+
+Recording appends a tuple to an in-memory ring buffer (no lock, no query).
+When it is full the oldest events are dropped and counted as
+``trace.dropped``. Served processes start a flusher thread (see
+:func:`start_flusher`, started by ``warmup.start_background``) that moves the buffer
+into the append-only ``SessionTraceEvent`` table every
+``FLIPIQ_TRACE_FLUSH_INTERVAL`` seconds. Readers flush first, like the other
+buffers, so a host never misses their own worker's latest events.
+
+:func:`summary` turns a session's events into the numbers a host wants
+after a slow lesson: wait to first card, answer latency, finish times and
+stragglers.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from . import metrics, tenancy
+from .models import SessionTraceEvent
+
+# Finishing or starting more than this many times the class median makes a straggler.
+STRAGGLER_FACTOR = 2
+
+_buffer = deque(maxlen=getattr(settings, 'FLIPIQ_TRACE_BUFFER', 20_000))
+_lock = threading.Lock()
+_flusher = None
+
+
+def record(session_id, kind, user_id=None, ms=None):
+    if len(_buffer) == _buffer.maxlen:
+        metrics.incr('trace.dropped')
+    _buffer.append((tenancy.scope(), session_id, user_id, kind, timezone.now(), ms))
+
+
+def since(started_at):
+    """Milliseconds from ``started_at`` to now, or None before the quiz started."""
+    if started_at is None:
+        return None
+    return (timezone.now() - started_at).total_seconds() * 1000
+
+
+def flush():
+    """Write everything buffered so far, one ``bulk_create`` per database."""
+    by_database = {}
+    for _ in range(len(_buffer)):
+        try:
+            alias, session_id, user_id, kind, at, ms = _buffer.popleft()
+        except IndexError:
+            break
+        by_database.setdefault(alias, []).append(
+            SessionTraceEvent(session_id=session_id, user_id=user_id, kind=kind, at=at, ms=ms)
+        )
+    for alias, events in by_database.items():
+        SessionTraceEvent.objects.using(alias).bulk_create(events, batch_size=500)
+        metrics.incr('trace.flushed', len(events))
+
+
+def start_flusher(interval=None):
+    """
+    Flush from a daemon thread from now on, and once more at exit; safe to
+    call more than once. Without it (tests, management commands) events stay
+    in the ring buffer until something reads them.
+    """
+    global _flusher
+    interval = interval or getattr(settings, 'FLIPIQ_TRACE_FLUSH_INTERVAL', 2)
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():  # threads don't survive a fork
+            return
+        _flusher = threading.Thread(target=_flush_forever, args=(interval,), name='flipiq-trace', daemon=True)
+        _flusher.start()
+    atexit.register(flush)
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception as e:
+            print("❌ trace flush failed:", e)
+        finally:
+            # This thread's own connections; the next flush opens fresh ones.
+            connections.close_all()
+
+
+def events(session):
+    flush()
+    return list(
+        SessionTraceEvent.objects.filter(session_id=session.id)
+        .order_by('at', 'id')
+        .values('at', 'kind', 'user_id', 'user__username', 'ms')
+    )
+
+
+def _stats(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    pick = lambda p: round(samples[min(len(samples) - 1, int(len(samples) * p))], 1)
+    return {'n': len(samples), 'p50': pick(0.5), 'p95': pick(0.95), 'max': round(samples[-1], 1)}
+
+
+def summary(session, rows):
+    """Aggregate ``rows`` from :func:`events` into per-phase latency stats and a straggler list."""
+    names, joined, first_play, finished = {}, {}, {}, {}
+    answers, rtts, start_times, hosts = [], [], [], set()
+    for row in rows:
+        user_id, kind, ms = row['user_id'], row['kind'], row['ms']
+        if user_id is not None:
+            names[user_id] = row['user__username'] or str(user_id)
+        if kind == SessionTraceEvent.KIND_JOIN:
+            joined.setdefault(user_id, row['at'])
+        elif kind == SessionTraceEvent.KIND_START:
+            start_times.append(row['at'])
+            hosts.add(user_id)
+        elif kind == SessionTraceEvent.KIND_PLAY and ms is not None:
+            first_play.setdefault(user_id, ms)
+        elif kind == SessionTraceEvent.KIND_ANSWER and ms is not None:
+            answers.append(ms)
+        elif kind == SessionTraceEvent.KIND_RTT and ms is not None:
+            rtts.append(ms)
+        elif kind == SessionTraceEvent.KIND_FINISH and ms is not None:
+            finished.setdefault(user_id, ms)
+
+    wait, finish = _stats(list(first_play.values())), _stats(list(finished.values()))
+    stragglers = []
+    for user_id, name in names.items():
+        if user_id in hosts:
+            continue
+        reason, ms = None, None
+        if user_id in finished:
+            if finished[user_id] > STRAGGLER_FACTOR * finish['p50']:
+                reason, ms = 'slow finish', finished[user_id]
+        elif start_times:
+            reason = 'did not finish' if user_id in first_play else 'never reached a card'
+        if reason is None and user_id in first_play and first_play[user_id] > STRAGGLER_FACTOR * wait['p50']:
+            reason, ms = 'slow start', first_play[user_id]
+        if reason:
+            stragglers.append({'user_id': user_id, 'name': name, 'reason': reason,
+                               'ms': None if ms is None else round(ms, 1)})
+
+    joins = sorted(joined.values())
+    return {
+        'joined': len(joined),
+        'join_span_s': round((joins[-1] - joins[0]).total_seconds(), 1) if joins else None,
+        'started_at': start_times[0] if start_times else session.started_at,
+        'wait_to_first_card_ms': wait,
+        'answer_server_ms': _stats(answers),
+        'answer_round_trip_ms': _stats(rtts),
+        'finish_ms': finish,
+        'stragglers': stragglers,
+    }
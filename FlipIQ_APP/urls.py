@@ -3,18 +3,24 @@ from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('search/typeahead/', views.typeahead, name='typeahead'),
     path('signup/', views.signup, name='signup'),
     path('profile/', views.profile, name='profile'),
+    path('roster/upload/', views.upload_roster, name='upload_roster'),
     path('create-deck/', views.create_deck, name='create_deck'),
     path('publish_deck/', views.publish_deck, name='publish_deck'),
     path('deck/edit/<int:deck_id>/', views.edit_deck, name='edit_deck'),
     path('deck/delete/<int:deck_id>/', views.delete_deck, name='delete_deck'),
+    path('deck/clone/<int:deck_id>/', views.clone_deck, name='clone_deck'),
     path('get-deck-data/<int:deck_id>/', views.get_deck_data, name='get_deck_data'),
     path('deck/<int:deck_id>/', views.control_panel_deck, name='control_panel_decks'),
+    path('deck/<int:deck_id>/analytics/', views.deck_analytics, name='deck_analytics'),
     path('update_card/<int:card_id>/', views.update_card, name='update_card'),
     path('deck/<int:deck_id>/start_session/', views.start_session, name='start_session'),
     path('deck/<int:deck_id>/end_session/', views.end_session, name='end_session'),
     path('deck/<int:deck_id>/status/', views.get_session_status, name='get_session_status'),
+    path('host/overview/', views.host_overview, name='host_overview'),
+    path('host/overview/data/', views.host_overview_data, name='host_overview_data'),
     path('kick_participant/<int:participant_id>/', views.kick_participant, name='kick_participant'),
     path('join_by_code/', views.join_deck_by_code, name='join_by_code'),
     path('join/', views.join_deck_page, name='join_deck_page'),
@@ -27,10 +33,14 @@ urlpatterns = [
 
     path('deck/<int:deck_id>/leave/<int:session_id>/', views.leave_deck, name='leave_deck'),
     path('deck/<int:deck_id>/participants/<int:session_id>/', views.get_participants, name='get_participants'),
+    path('deck/<int:deck_id>/heartbeat/<int:session_id>/', views.heartbeat, name='heartbeat'),
     
     path('deck/<int:deck_id>/submit_answer/', views.submit_answer, name='submit_answer'),
     path('deck/<int:deck_id>/start_quiz/', views.start_quiz, name='start_quiz'),
     path('deck/<int:deck_id>/report/<int:session_id>/', views.report_view, name='report_view'),
+    path('deck/<int:deck_id>/leaderboard/<int:session_id>/', views.session_leaderboard, name='session_leaderboard'),
+    path('deck/<int:deck_id>/trace/<int:session_id>/', views.session_trace, name='session_trace'),
+    path('deck/<int:deck_id>/trace/<int:session_id>/export/', views.session_trace_export, name='session_trace_export'),
     path('deck/<int:deck_id>/report/', views.report_view, name='report_view'),
     path('deck/<int:deck_id>/activate_flag/', views.activate_flag, name='activate_flag'),
     path('check_session/<str:code>/', views.check_session_status, name="check_session_status"),
@@ -38,4 +48,8 @@ urlpatterns = [
     path('deck/<int:deck_id>/result/<int:session_id>/', views.deck_result, name='deck_result'),
     path('deck/<int:deck_id>/reset_progress/<int:session_id>/', views.reset_progress, name='reset_progress'),
     path('deck/<int:deck_id>/not_started/', views.deck_not_started, name='deck_not_started'),
+    path('study/deck/<int:deck_id>/', views.study_deck, name='study_deck'),
+    path('study/deck/<int:deck_id>/next/', views.study_next, name='study_next'),
+    path('study/review/', views.study_review, name='study_review'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
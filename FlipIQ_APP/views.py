@@ -1,17 +1,26 @@
 import json
+import time
 from django.http import JsonResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
 from django.shortcuts import redirect, render, get_object_or_404
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods, require_POST
-from .models import Profile, Deck, Card, Submission, Session, Participant
+from .models import ActivityEntry, Profile, Deck, Card, Submission, Session, SessionTraceEvent, Participant
+from . import activity, analytics, auditorium, catalog, cloning, leaderboard, metrics, presence, provisioning, roster, search_index, singleflight, srs, tenancy, trace, wire
+from .routers import use_read_replica
 from django.utils import timezone
-from django.db import transaction
-from django.db.models import Prefetch, Q 
+from django.db.models import Count, F, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
+
+# Hot reads shared by everyone in a room at the same instant (see singleflight.py)
+cards_flight = singleflight.Group('cards')
+participants_flight = singleflight.Group('participants')
 
 
 # ===============================
@@ -27,35 +36,47 @@ def publish_deck(request):
             data = json.loads(request.body.decode("utf-8"))
             print("✅ Parsed JSON data:", data)
 
-            deck_id = data.get("deckId")
-            if deck_id:
-                # --- Editing existing deck ---
-                deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
-                deck.title = data.get("deckTitle", deck.title)
-                deck.time_interval = data.get("interval", deck.time_interval)
-                deck.subject = data.get("subject", deck.subject)
-                deck.visibility = data.get("visibility", deck.visibility)
-                deck.save()
-                deck.cards.all().delete()  # Clear old cards
-                print(f"✏️ Updated deck: {deck.title}")
-            else:
-                # --- Creating a new deck ---
-                deck = Deck.objects.create(
-                    title=data.get("deckTitle", "Untitled Deck"),
-                    owner=request.user,
-                    time_interval=data.get("interval", "10 secs"),
-                    subject=data.get("subject", "Other"),
-                    visibility=data.get("visibility", "private"),
-                )
-                print(f"🆕 Created new deck: {deck.title}")
-
-            for c in data.get("cards", []):
-                Card.objects.create(
-                    deck=deck,
-                    front=c.get("front", ""),
-                    back=c.get("back", ""),
-                    choices=c.get("choices", [])
-                )
+            with catalog.batch():  # one catalog bump for the deck and all its cards
+                deck_id = data.get("deckId")
+                if deck_id:
+                    # --- Editing existing deck ---
+                    deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
+                    deck.title = data.get("deckTitle", deck.title)
+                    deck.time_interval = data.get("interval", deck.time_interval)
+                    deck.subject = data.get("subject", deck.subject)
+                    deck.visibility = data.get("visibility", deck.visibility)
+                    # The posted cards replace the deck's cards: a clone stops sharing,
+                    # and clones of this deck see the new ones.
+                    deck.shared_from = None
+                    deck.save()
+                    deck.cards.all().delete()  # Clear old cards
+                    print(f"✏️ Updated deck: {deck.title}")
+                else:
+                    # --- Creating a new deck ---
+                    deck = Deck.objects.create(
+                        title=data.get("deckTitle", "Untitled Deck"),
+                        owner=request.user,
+                        time_interval=data.get("interval", "10 secs"),
+                        subject=data.get("subject", "Other"),
+                        visibility=data.get("visibility", "private"),
+                    )
+                    print(f"🆕 Created new deck: {deck.title}")
+
+                cards = Card.objects.bulk_create([
+                    Card(
+                        deck=deck,
+                        front=c.get("front", ""),
+                        back=c.get("back", ""),
+                        choices=c.get("choices", [])
+                    )
+                    for c in data.get("cards", [])
+                ])
+                activity.cards_changed(deck, len(cards))
+                # bulk_create sends no signals; a new deck has no clones to look up
+                if deck.visibility == 'public':
+                    catalog.bump()
+                elif deck_id:
+                    catalog.cards_changed(deck.id)
 
             return JsonResponse({"success": True, "deck_id": deck.id})
 
@@ -67,31 +88,12 @@ def publish_deck(request):
 
 
 def home(request):
-    """Show all public decks on homepage with search, participation info, and smart Flip logic."""
+    """Show public decks on homepage a page at a time with search, participation info, and smart Flip logic."""
     query = request.GET.get("q", "")  # 🔍 Search query
-    decks = Deck.objects.filter(visibility='public')
-
-    # 🔍 If there's a search query, filter decks by title, subject, or owner's username
-    if query:
-        decks = decks.filter(
-            Q(title__icontains=query) |
-            Q(subject__icontains=query) |
-            Q(owner__username__icontains=query)
-        )
-
-    public_decks = decks.order_by('-created_at')
-
-    # Track user's submissions (for decks they've played)
-    user_submissions = {}
-    if request.user.is_authenticated:
-        submissions = Submission.objects.filter(user=request.user).select_related('deck', 'session')
-        for sub in submissions:
-            user_submissions[sub.deck.id] = sub.session.id  # Store their latest session_id for that deck
-
-    # Attach info to each deck (used in template)
-    for deck in public_decks:
-        deck.played = deck.id in user_submissions
-        deck.session_id = user_submissions.get(deck.id)
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
 
     # 🟡 Handle Flip button click (?flip=<deck_id>)
     deck_id = request.GET.get('flip')
@@ -112,13 +114,31 @@ def home(request):
         # 3️⃣ Otherwise → deck not started page
         return redirect('deck_not_started', deck_id=deck.id)
 
+    # The deck grid is cached HTML shared by everyone in the same audience (see catalog.py);
+    # only the user's own played decks on this page are looked up per request.
+    grid = catalog.grid(catalog.audience(request.user), query, page)
+    played = catalog.played_on_page(request.user, grid['deck_ids'])
+
     return render(request, 'FlipIQ_APP/home.html', {
-        'public_decks': public_decks,
+        'grid': grid,
+        'played': played,
+        'page': page,
+        # Public decks kept in other schools' databases (see tenancy.py), cached like the grid
+        'other_schools': catalog.elsewhere(query),
         'query': query,
     })
 
 
 
+def typeahead(request):
+    """AJAX: top matching public decks for the home search box, served from memory."""
+    try:
+        k = max(1, min(int(request.GET.get("k", 8)), 20))
+    except ValueError:
+        k = 8
+    return JsonResponse({"results": search_index.search(request.GET.get("q", ""), k, alias=tenancy.scope())})
+
+
 @require_http_methods(["GET", "POST"])
 def signup(request):
     """Handles user signup with role selection."""
@@ -146,22 +166,59 @@ def signup(request):
 
 @login_required
 def profile(request):
-    """Display user profile with created decks and recent played history."""
-    created_decks = Deck.objects.filter(owner=request.user).order_by('-created_at')
-
-    # 🕒 Get user's most recent submissions (limit to last 10)
-    recent_submissions = (
-        Submission.objects.filter(user=request.user)
-        .select_related('deck', 'session')
-        .order_by('-submission_time')[:10]
-    )
+    """Display user profile with created decks and recent played history, one page of each."""
+    def page_arg(name):
+        try:
+            return max(1, int(request.GET.get(name, 1)))
+        except ValueError:
+            return 1
+
+    history_page, created_page = page_arg('history_page'), page_arg('created_page')
+    recent_submissions, history_has_next = activity.feed(request.user, ActivityEntry.KIND_PLAYED, history_page)
+    created_decks, created_has_next = activity.feed(request.user, ActivityEntry.KIND_CREATED, created_page)
 
     return render(request, 'FlipIQ_APP/profile.html', {
         'created_decks': created_decks,
         'recent_submissions': recent_submissions,
+        'history_page': history_page,
+        'history_has_next': history_has_next,
+        'created_page': created_page,
+        'created_has_next': created_has_next,
+        'active_tab': 'created' if 'created_page' in request.GET else 'history',
     })
 
 
+def is_teacher(user):
+    profile = getattr(user, 'profile', None)
+    return profile is not None and profile.role == Profile.ROLE_TEACHER
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def upload_roster(request):
+    """Teachers upload a class roster CSV to create student accounts in bulk."""
+    if not is_teacher(request.user):
+        return redirect('home')
+
+    if request.method == 'POST':
+        upload = request.FILES.get('roster')
+        if not upload:
+            messages.error(request, "Please choose a CSV file to upload.")
+        else:
+            # Hashing a class's passwords takes seconds; run it off the request and poll.
+            job_id = roster.queue_import(upload, request.user.id)
+            return redirect(f"{reverse('upload_roster')}?job={job_id}")
+
+    job = None
+    if request.GET.get('job'):
+        job = roster.job_status(request.GET['job'], request.user.id)
+        if job is None:
+            messages.error(request, "That upload has expired; please upload the roster again.")
+        elif job['state'] == 'failed':
+            messages.error(request, f"Could not read roster: {job['error']}")
+    return render(request, 'FlipIQ_APP/upload_roster.html', {'job': job, 'report': job and job.get('report')})
+
+
 @login_required
 def create_deck(request):
     """Render deck creation page. Works for both new & edit modes."""
@@ -179,7 +236,7 @@ def edit_deck(request, deck_id):
 def get_deck_data(request, deck_id):
     """Returns deck info + cards in JSON for pre-filling."""
     deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
-    cards = list(deck.cards.values('id', 'front', 'back', 'choices'))
+    cards = list(deck.get_cards().values('id', 'front', 'back', 'choices'))
     data = {
         "id": deck.id,
         "title": deck.title,
@@ -201,25 +258,37 @@ def delete_deck(request, deck_id):
     return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
 
 
+@csrf_exempt
+@login_required
+@require_POST
+def clone_deck(request, deck_id):
+    """Teachers copy a public (or their own) deck to edit; cards are shared until first edit."""
+    if not is_teacher(request.user):
+        return JsonResponse({"success": False, "error": "Only teachers can clone decks"}, status=403)
+    deck = get_object_or_404(srs.studyable_decks(request.user), id=deck_id)
+    clone = cloning.clone_deck(deck, request.user)
+    return JsonResponse({"success": True, "deck_id": clone.id})
+
+
 @login_required
 def control_panel_deck(request, deck_id):
     """Render the Control Panel for deck management."""
     deck = get_object_or_404(Deck, id=deck_id)
-    if deck.owner != request.user:
+    if deck.owner_id != request.user.id:
         return redirect('home')
 
-    # ✅ Fetch real submissions from the database
-    submissions = (
+    # ✅ Fetch real submissions from the database (once: the page lists them all anyway)
+    submissions = list(
         deck.submissions
         .select_related('user', 'session')
         .order_by('-submission_time')
     )
 
     # ✅ Compute total distinct participants
-    total_students = submissions.values('user').distinct().count()
+    total_students = len({s.user_id for s in submissions})
 
     # ✅ Compute average completion rate
-    total_submissions = submissions.count()
+    total_submissions = len(submissions)
     avg_completion = round(
         sum(s.percentage() for s in submissions) / total_submissions,
         1
@@ -232,10 +301,24 @@ def control_panel_deck(request, deck_id):
 
     return render(request, 'FlipIQ_APP/control_panel_decks.html', {
         'deck': deck,
+        'cards': list(deck.get_cards()),
         'submissions': submissions,
         'total_students': total_students,
         'avg_completion': avg_completion,
-        'has_submissions': submissions.exists()
+        'has_submissions': bool(submissions)
+    })
+
+
+
+@login_required
+def deck_analytics(request, deck_id):
+    """Item difficulty and distractor frequency for every card, across all sessions."""
+    deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
+    report = analytics.deck_report(deck, deck.get_cards().values('id', 'front', 'back'))
+    return render(request, 'FlipIQ_APP/deck_analytics.html', {
+        'deck': deck,
+        'cards': report['cards'],
+        'histogram': report['histogram'],
     })
 
 
@@ -266,7 +349,9 @@ def add_card(request, deck_id):
     """AJAX: Add a new card dynamically."""
     if request.method == 'POST':
         deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
+        cloning.materialize(deck)
         card = Card.objects.create(deck=deck, front="", back="", choices=[])
+        activity.cards_changed(deck)
         return JsonResponse({"success": True, "card_id": card.id})
     return JsonResponse({"error": "Invalid method"}, status=405)
 
@@ -274,15 +359,25 @@ def add_card(request, deck_id):
 @csrf_exempt
 @login_required
 def update_card(request, card_id):
-    """AJAX: Update a card’s content instantly."""
+    """AJAX: Update a card’s content instantly (?deck=<id> when editing from a deck page)."""
     if request.method == 'POST':
-        card = get_object_or_404(Card, id=card_id, deck__owner=request.user)
+        deck = None
+        if request.GET.get("deck"):
+            deck = get_object_or_404(Deck, id=request.GET["deck"], owner=request.user)
+        remapped = {}
+        if deck is not None and deck.shared_from_id:
+            # First edit of a clone: copy the shared cards, then edit the copy
+            get_object_or_404(Card, id=card_id, deck_id=deck.shared_from_id)
+            remapped = cloning.materialize(deck)
+            card = Card.objects.get(id=remapped[card_id])
+        else:
+            card = get_object_or_404(Card, id=card_id, deck__owner=request.user)
         data = json.loads(request.body.decode("utf-8"))
         card.front = data.get("front", card.front)
         card.back = data.get("back", card.back)
         card.choices = data.get("choices", card.choices)
         card.save()
-        return JsonResponse({"success": True})
+        return JsonResponse({"success": True, "card_id": card.id, "remapped": remapped})
     return JsonResponse({"error": "Invalid method"}, status=405)
 
 
@@ -293,6 +388,7 @@ def delete_card(request, card_id):
     if request.method == 'POST':
         card = get_object_or_404(Card, id=card_id, deck__owner=request.user)
         card.delete()
+        activity.cards_changed(card.deck)
         return JsonResponse({"success": True})
     return JsonResponse({"error": "Invalid method"}, status=405)
 
@@ -340,8 +436,12 @@ def start_quiz(request, deck_id):
     if not session:
         return JsonResponse({"error": "No active session found"}, status=404)
 
+    provisioning.provision_session(session)
     session.is_started = True
+    # Finish times count from the first start; pressing Start again mustn't move it.
+    session.started_at = session.started_at or timezone.now()
     session.save()
+    trace.record(session.id, SessionTraceEvent.KIND_START, request.user.id)
 
     return JsonResponse({
         "success": True,
@@ -366,24 +466,88 @@ def end_session(request, deck_id):
 
 
 @login_required
+@use_read_replica
 def get_session_status(request, deck_id):
-    """Return all participants and progress info for the active session."""
+    """
+    Progress histogram plus one page (``?page=``) of participants for the active
+    session. Auditorium sessions only send the roster when a page is asked for.
+    """
     deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
     session = Session.objects.filter(deck=deck, is_active=True).last()
     if not session:
         return JsonResponse({"active": False})
 
-    participants = Participant.objects.filter(session=session).select_related("user")
-    data = [
+    auditorium.flush()
+    data = {"active": True, "code": session.code, "auditorium": session.auditorium}
+    if session.auditorium and "page" not in request.GET:
+        data.update(auditorium.histogram(session, live_presence=True))
+        data.update(participants=[], page=None, has_next=data["count"] > 0)
+        return JsonResponse(data)
+
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
+    data["participants"], data["has_next"] = auditorium.roster_page(session, page)
+    data["page"] = page
+    data.update(auditorium.histogram(session))
+    return JsonResponse(data)
+
+
+def host_sessions_overview(host):
+    """
+    Every active session hosted by ``host`` with participant counts and progress
+    rolled up in SQL, so the cost is two queries no matter how many rooms are live.
+    Who is online comes from the presence store, like the host panel: the stored
+    ``Participant.status`` only changes when a host polls that room.
+    """
+    sessions = (
+        Session.objects.filter(host=host, is_active=True)
+        .select_related("deck")
+        .annotate(
+            participant_count=Count("participant"),
+            finished_count=Count(
+                "participant",
+                filter=Q(participant__total_cards__gt=0,
+                         participant__progress__gte=F("participant__total_cards")),
+            ),
+            progress_done=Coalesce(Sum("participant__progress"), 0),
+            progress_total=Coalesce(Sum("participant__total_cards"), 0),
+        )
+        .order_by("-created_at")
+    )
+    online = presence.online_counts(
+        Participant.objects.filter(session__host=host, session__is_active=True).values_list("session_id", "user_id")
+    )
+    return [
         {
-            "name": f"{p.user.first_name} {p.user.last_name}".strip() or p.user.username,
-            "progress": p.progress,
-            "total": p.total_cards,
+            "session_id": s.id,
+            "deck_id": s.deck_id,
+            "deck_title": s.deck.title,
+            "code": s.code,
+            "is_started": s.is_started,
+            "participants": s.participant_count,
+            "online": online.get(s.id, 0),
+            "finished": s.finished_count,
+            "progress": round(s.progress_done / s.progress_total * 100, 1) if s.progress_total else 0,
         }
-        for p in participants
+        for s in sessions
     ]
 
-    return JsonResponse({"active": True, "code": session.code, "participants": data})
+
+@login_required
+def host_overview(request):
+    """One page for a host running several live rooms at once."""
+    return render(request, 'FlipIQ_APP/host_overview.html', {
+        'sessions': host_sessions_overview(request.user),
+    })
+
+
+@login_required
+@use_read_replica
+def host_overview_data(request):
+    """AJAX: polled by host_overview.html instead of one status poll per deck."""
+    return JsonResponse({"sessions": host_sessions_overview(request.user)})
 
 
 @csrf_exempt
@@ -393,6 +557,8 @@ def kick_participant(request, participant_id):
     try:
         participant = get_object_or_404(Participant, id=participant_id)
         participant.delete()
+        presence.forget(participant.session_id, participant.user_id)
+        leaderboard.drop(participant.session_id, participant.user_id)
         return JsonResponse({"success": True})
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
@@ -408,15 +574,24 @@ def join_deck_by_code(request):
             if not code:
                 return JsonResponse({"success": False, "error": "No code entered"})
 
-            session = Session.objects.filter(code=code, is_active=True).first()
+            session = Session.objects.select_related("deck").filter(code=code, is_active=True).first()
             if not session:
                 return JsonResponse({"success": False, "error": "Invalid or inactive code"})
 
-            # Prevent duplicates
-            participant, created = Participant.objects.get_or_create(
-                session=session, user=request.user,
-                defaults={"total_cards": session.deck.cards.count()}
-            )
+            if session.auditorium:
+                # Buffered and bulk-inserted; see auditorium.py
+                total_cards = auditorium.pending_total_cards(session.id)
+                if total_cards is None:
+                    total_cards = session.deck.get_cards().count()
+                auditorium.queue_join(session.id, request.user.id, total_cards)
+            else:
+                # Prevent duplicates
+                participant, created = Participant.objects.get_or_create(
+                    session=session, user=request.user,
+                    defaults={"total_cards": session.deck.get_cards().count()}
+                )
+            presence.heartbeat(session.id, request.user.id)
+            trace.record(session.id, SessionTraceEvent.KIND_JOIN, request.user.id)
 
             return JsonResponse({
                 "success": True,
@@ -457,55 +632,60 @@ def join_waiting(request, deck_id, session_id):
 def leave_deck(request, deck_id, session_id):
     session = get_object_or_404(Session, id=session_id, deck_id=deck_id)
     if request.user.is_authenticated:
+        auditorium.flush()
         Participant.objects.filter(session=session, user=request.user).delete()
+        presence.forget(session.id, request.user.id)
+        leaderboard.drop(session.id, request.user.id)
     return redirect('home') 
 
 @login_required
+@use_read_replica
 def get_participants(request, deck_id, session_id):
-    """Return the list of participants for a given session."""
-    from .models import Participant  # ensure it's imported properly
+    """Waiting room: the first page of participants plus the head count."""
     session = get_object_or_404(Session, id=session_id, deck_id=deck_id)
-    participants = Participant.objects.filter(session=session).select_related("user")
-
-    data = [
-        {
-            "name": f"{p.user.first_name} {p.user.last_name}".strip() or p.user.username
-        }
-        for p in participants
-    ]
-
-    return JsonResponse({"participants": data})
+    presence.heartbeat(session.id, request.user.id)
+    auditorium.flush()  # a write, so it stays out of the shared flight below
+    rows, count = participants_flight.do(session.id, lambda: waiting_room_roster(session))
+    # Statuses come from the presence cache per caller; the host views are the
+    # ones that persist them (auditorium.roster_page).
+    statuses = presence.states(session.id, [user_id for user_id, _ in rows])
+    data = [{"name": name, "status": statuses[user_id]} for user_id, name in rows]
+    return wire.respond(request, 'roster', {"participants": data, "count": count})
+
+
+def waiting_room_roster(session):
+    """SELECTs only: concurrent polls for one session share this result."""
+    rows, has_next = auditorium.roster_rows(session)
+    count = Participant.objects.filter(session=session).count() if has_next else len(rows)
+    return [(user_id, name) for _, user_id, name, _, _, _ in rows], count
 
 # PLAY view: render the play screen for a participant
 @login_required
 def play_deck(request, deck_id, session_id):
-    deck = get_object_or_404(Deck, id=deck_id)
-    session = get_object_or_404(Session, id=session_id, deck=deck, is_active=True)
-
-    # Ensure participant entry exists (create if not)
-    participant, created = Participant.objects.get_or_create(
-        session=session,
-        user=request.user,
-        defaults={'total_cards': deck.cards.count(), 'progress': 0}
-    )
-    # Ensure total_cards kept up-to-date
-    if participant.total_cards != deck.cards.count():
-        participant.total_cards = deck.cards.count()
-        participant.save()
+    session = get_object_or_404(Session.objects.select_related('deck'), id=session_id, deck_id=deck_id, is_active=True)
+    deck = session.deck
+    presence.heartbeat(session.id, request.user.id)
 
-    # Ensure Submission exists for this session+user (we use this as the live score container)
-    submission, _ = Submission.objects.get_or_create(
-        deck=deck, session=session, user=request.user,
-        defaults={'score': 0, 'total': deck.cards.count()}
-    )
+    # Fast path: rows were created for the whole room when the host started (see provisioning.py)
+    participant = Participant.objects.filter(session=session, user=request.user).first()
+    submission = Submission.objects.filter(session=session, user=request.user).first()
+    if participant is None or submission is None:
+        # Joined late, or the quiz hasn't started yet
+        participant, submission = provisioning.provision_student(session, request.user, deck.get_cards().count())
 
-    if not session or not session.is_started:
+    if not session.is_started:
         # ⚠️ Deck not started yet
         return render(request, 'FlipIQ_APP/deck_not_started.html', {'deck': deck})
 
+    # Time from the host's start to this screen: what the student actually waited
+    trace.record(session.id, SessionTraceEvent.KIND_PLAY, request.user.id, trace.since(session.started_at))
 
     # Prepare card data for the front-end
-    cards = list(deck.cards.values('id', 'front', 'back', 'choices'))
+    cards = cards_flight.do(deck.card_source_id, lambda: list(deck.get_cards().values('id', 'front', 'back', 'choices')))
+    if participant.total_cards != len(cards):
+        # Cards changed since the rows were provisioned
+        participant.total_cards = len(cards)
+        participant.save(update_fields=['total_cards'])
     # time interval -> convert to seconds (if stored as "10 secs", "1 min" etc.)
     interval_str = deck.time_interval or "10 secs"
     # simple parser:
@@ -531,7 +711,8 @@ def play_deck(request, deck_id, session_id):
         'session': session,
         'participant': participant,
         'submission': submission,
-        'cards_json': json.dumps(cards),
+        # Columnar, decoded in the page by wire.js
+        'cards_json': json.dumps(wire.encode(wire.SCHEMAS['cards'], {'cards': cards})),
         'interval_seconds': interval_seconds,
         'cards_count': len(cards)
     })
@@ -550,41 +731,57 @@ def submit_answer(request, deck_id):
       "choice": "4"
     }
     """
+    received = time.perf_counter()
     try:
         data = json.loads(request.body.decode('utf-8'))
         session_id = int(data.get('session_id'))
         card_id = int(data.get('card_id'))
         choice = data.get('choice', '').strip()
+        rtt_ms = data.get('rtt_ms')  # the play screen's timing of its previous answer
+        rtt_ms = float(rtt_ms) if rtt_ms is not None else None
     except Exception as e:
         return JsonResponse({"success": False, "error": "Invalid payload"}, status=400)
 
-    session = get_object_or_404(Session, id=session_id, deck_id=deck_id, is_active=True)
-    card = get_object_or_404(Card, id=card_id, deck_id=deck_id)
+    session = get_object_or_404(Session.objects.select_related('deck'), id=session_id, deck_id=deck_id, is_active=True)
+    card = get_object_or_404(Card, id=card_id, deck_id=session.deck.card_source_id)
 
     # find participant
     participant = Participant.objects.filter(session=session, user=request.user).first()
     if not participant:
         # create participant if not exists (rare)
-        participant = Participant.objects.create(session=session, user=request.user, total_cards=session.deck.cards.count(), progress=0)
+        participant = Participant.objects.create(session=session, user=request.user, total_cards=session.deck.get_cards().count(), progress=0)
+
+    presence.heartbeat(session.id, request.user.id)
 
     # determine correctness: card.back holds correct answer (string)
     is_correct = (str(card.back).strip() == str(choice).strip())
+    analytics.record(session.deck_id, card.id, choice, is_correct)
 
     # update participant and submission atomically
-    with transaction.atomic():
+    with tenancy.atomic():
         # increment progress but ensure does not exceed total_cards
         participant.progress = min(participant.total_cards, participant.progress + 1)
         participant.save()
 
         submission, created = Submission.objects.get_or_create(deck=session.deck, session=session, user=request.user,
-                                                               defaults={'score': 0, 'total': session.deck.cards.count()})
+                                                               defaults={'score': 0, 'total': session.deck.get_cards().count()})
         if is_correct:
             submission.score = submission.score + 1
         # keep total in-sync
-        submission.total = session.deck.cards.count()
+        submission.total = session.deck.get_cards().count()
+        just_finished = participant.progress >= participant.total_cards and submission.finished_at is None
+        if just_finished:
+            submission.finished_at = timezone.now()
         submission.save()
 
-    return JsonResponse({
+    leaderboard.record(session, submission, request.user)
+    if just_finished:
+        trace.record(session.id, SessionTraceEvent.KIND_FINISH, request.user.id, trace.since(session.started_at))
+    if rtt_ms is not None:
+        trace.record(session.id, SessionTraceEvent.KIND_RTT, request.user.id, rtt_ms)
+    trace.record(session.id, SessionTraceEvent.KIND_ANSWER, request.user.id, (time.perf_counter() - received) * 1000)
+
+    return wire.respond(request, 'answer', {
         "success": True,
         "is_correct": is_correct,
         "progress": participant.progress,
@@ -592,6 +789,15 @@ def submit_answer(request, deck_id):
         "score": submission.score
     })
 
+@csrf_exempt
+@login_required
+@require_POST
+def heartbeat(request, deck_id, session_id):
+    """Players ping this while the play screen is open so the host sees them online."""
+    session = get_object_or_404(Session, id=session_id, deck_id=deck_id, is_active=True)
+    presence.heartbeat(session.id, request.user.id)
+    return JsonResponse({"success": True})
+
 @login_required
 def report_view(request, deck_id, session_id):
     deck = get_object_or_404(Deck, id=deck_id, owner=request.user)
@@ -605,6 +811,62 @@ def report_view(request, deck_id, session_id):
         
     })
 
+@login_required
+@use_read_replica
+def session_leaderboard(request, deck_id, session_id):
+    """AJAX: top scorers (score, then time to finish) plus the caller's own rank."""
+    session = get_object_or_404(Session, id=session_id, deck_id=deck_id)
+    try:
+        k = max(1, min(int(request.GET.get("k", 10)), 100))
+    except ValueError:
+        k = 10
+    return JsonResponse(leaderboard.standings(session, request.user.id, k))
+
+
+def traced_session(request, deck_id, session_id):
+    """The session, if the caller hosted it or is staff."""
+    session = get_object_or_404(Session.objects.select_related('deck'), id=session_id, deck_id=deck_id)
+    if session.deck.owner_id != request.user.id and not request.user.is_staff:
+        raise Http404("Session not found")
+    return session
+
+
+@login_required
+def session_trace(request, deck_id, session_id):
+    """Host/staff: what the class experienced (waits, answer latency, stragglers), see trace.py."""
+    session = traced_session(request, deck_id, session_id)
+    events = trace.events(session)
+    summary = trace.summary(session, events)
+    return render(request, 'FlipIQ_APP/session_trace.html', {
+        'deck': session.deck,
+        'session': session,
+        'summary': summary,
+        'phases': [
+            ('Start → first card', summary['wait_to_first_card_ms']),
+            ('Answer (server)', summary['answer_server_ms']),
+            ('Answer (round trip)', summary['answer_round_trip_ms']),
+            ('Start → finished', summary['finish_ms']),
+        ],
+        'events': events,
+    })
+
+
+@login_required
+def session_trace_export(request, deck_id, session_id):
+    """Host/staff: the session's trace and summary as a JSON download."""
+    session = traced_session(request, deck_id, session_id)
+    events = trace.events(session)
+    response = JsonResponse({
+        'session_id': session.id,
+        'deck_id': session.deck_id,
+        'code': session.code,
+        'summary': trace.summary(session, events),
+        'events': events,
+    })
+    response['Content-Disposition'] = f'attachment; filename="session-{session.id}-trace.json"'
+    return response
+
+
 @csrf_exempt
 @login_required
 def start_session(request, deck_id):
@@ -614,8 +876,13 @@ def start_session(request, deck_id):
     # End any existing sessions for this deck
     Session.objects.filter(deck=deck, is_active=True).update(is_active=False)
 
+    try:
+        options = json.loads(request.body or b"{}")
+    except ValueError:
+        options = {}
+
     # Create a new session
-    session = Session.objects.create(deck=deck, host=request.user)
+    session = Session.objects.create(deck=deck, host=request.user, auditorium=bool(options.get("auditorium")))
     return JsonResponse({"success": True, "code": session.code, "session_id": session.id})
 
 
@@ -629,8 +896,11 @@ def activate_flag(request, deck_id):
         if not session:
             return JsonResponse({"success": False, "error": "No active session found."})
 
+        provisioning.provision_session(session)
         session.is_started = True
+        session.started_at = session.started_at or timezone.now()
         session.save()
+        trace.record(session.id, SessionTraceEvent.KIND_START, request.user.id)
 
         # ✅ Return session_id for redirect
         return JsonResponse({"success": True, "session_id": session.id})
@@ -638,11 +908,14 @@ def activate_flag(request, deck_id):
     return JsonResponse({"error": "Invalid method"}, status=405)
 
 
+@use_read_replica
 def check_session_status(request, code):
     """Students call this to check if the host has started the quiz."""
     try:
         session = Session.objects.get(code=code)
-        return JsonResponse({
+        if request.user.is_authenticated:
+            presence.heartbeat(session.id, request.user.id)
+        return wire.respond(request, 'session_status', {
             "is_started": session.is_started,
             "active": session.is_active,
         })
@@ -650,6 +923,7 @@ def check_session_status(request, code):
         raise Http404("Session not found")
 
 @login_required
+@use_read_replica
 def deck_status(request, deck_id):
     """
     Returns the current state of the deck/session for the player.
@@ -698,10 +972,12 @@ def reset_progress(request, deck_id, session_id):
         participant.progress = 0
         participant.save()
 
-        # Reset submission score
+        # Reset submission score, and the student's place on the leaderboard
         if submission:
             submission.score = 0
+            submission.finished_at = None
             submission.save()
+            leaderboard.record(session, submission, request.user)
 
         return JsonResponse({"success": True})
     except Participant.DoesNotExist:
@@ -713,3 +989,49 @@ def deck_not_started(request, deck_id):
     """Display a message when a deck session is not yet started."""
     deck = get_object_or_404(Deck, id=deck_id)
     return render(request, 'FlipIQ_APP/deck_not_started.html', {'deck': deck})
+
+
+# ===============================
+# 📚 SELF-STUDY (spaced repetition)
+# ===============================
+
+@login_required
+def study_deck(request, deck_id):
+    """Drill a public (or own) deck on a spaced-repetition schedule."""
+    deck = get_object_or_404(srs.studyable_decks(request.user).select_related('owner'), id=deck_id)
+    return render(request, 'FlipIQ_APP/study_deck.html', {
+        'deck': deck,
+        'queue': srs.due_queue(request.user, deck.card_source_id),
+    })
+
+
+@login_required
+def study_next(request, deck_id):
+    """AJAX: the next cards due for this deck."""
+    deck = get_object_or_404(srs.studyable_decks(request.user), id=deck_id)
+    return JsonResponse({"cards": srs.due_queue(request.user, deck.card_source_id)})
+
+
+@csrf_exempt
+@login_required
+@require_POST
+def study_review(request):
+    """AJAX: save a batch of reviews: {"reviews": [{"card": id, "grade": "good"}, ...]}."""
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        reviews = [(int(r["card"]), r["grade"]) for r in data.get("reviews", [])]
+        if not all(isinstance(grade, str) for _, grade in reviews):
+            raise TypeError("grade must be a string")  # srs looks grades up in a dict
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": "Invalid reviews"}, status=400)
+    return JsonResponse({"saved": srs.record_reviews(request.user, reviews)})
+
+
+# ===============================
+# 📈 OPERATIONS
+# ===============================
+
+@staff_member_required
+def metrics_view(request):
+    """Staff-only: process-local performance counters (load shed, cache hits, ...)."""
+    return JsonResponse({"counters": metrics.snapshot()})
@@ -0,0 +1,129 @@
+"""
+Worker warm-up.
+
+A fresh worker pays for a lot on its first requests: building the URL
+resolver (and importing every view module behind it), compiling templates
+such as ``control_panel_decks.html`` and ``play_deck.html``, opening database
+connections, and filling the in-process caches (leaderboards, the typeahead
+index, the home deck grid). After a deploy every worker does this at once,
+just as classes reconnect.
+
+wsgi.py and asgi.py call :func:`serve` once the application is built. With
+``FLIPIQ_WARMUP`` set it runs :func:`warm_up` there, before the server hands
+out requests, so that work happens before the worker counts as ready.
+``manage.py bench_warmup`` measures first-request latency with and without
+it.
+
+The module may be imported by a master that then forks its workers
+(``gunicorn --preload``): what is warmed in memory is inherited, but neither
+database connections nor threads survive a fork safely. So :func:`serve`
+closes the connections it opened (each worker reconnects on its first query)
+and leaves the background flushers (trace, auditorium joins, answer
+analytics) to :func:`start_background`, which runs on each process's first
+request.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.template import engines
+from django.urls import URLResolver, get_resolver, reverse
+
+from . import analytics, auditorium, catalog, leaderboard, search_index, tenancy, trace
+from .models import Session
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_background_pid = None  # process whose flushers are running
+
+
+def template_names():
+    """This project's templates: the app's own and any in TEMPLATES' DIRS (not Django admin's)."""
+    dirs = {os.path.join(apps.get_app_config('FlipIQ_APP').path, 'templates')}
+    for engine in settings.TEMPLATES:
+        dirs.update(str(d) for d in engine.get('DIRS', []))
+    names = set()
+    for root in dirs:
+        for folder, _, files in os.walk(root):
+            for name in files:
+                if name.endswith('.html'):
+                    names.add(os.path.relpath(os.path.join(folder, name), root).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def _compile_patterns(resolver):
+    for pattern in resolver.url_patterns:  # the first access imports the view modules
+        pattern.pattern.regex  # compiled lazily otherwise, on the first request that reaches it
+        if isinstance(pattern, URLResolver):
+            _compile_patterns(pattern)
+
+
+def _urls():
+    _compile_patterns(get_resolver())
+    reverse('home')  # builds the reverse lookup tables
+
+
+def _templates():
+    # The cached loader keeps what it compiles for the life of the process.
+    for name in template_names():
+        for engine in engines.all():
+            engine.get_template(name)
+
+
+def _connections():
+    for alias in connections:
+        connection = connections[alias]
+        connection.ensure_connection()  # runs the profile's PRAGMAs (see settings.py)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def _caches():
+    limit = getattr(settings, 'FLIPIQ_WARMUP_MAX_SESSIONS', 200)
+    for alias in tenancy.aliases():
+        with tenancy.routed_to(alias):
+            search_index.ensure_built(alias)
+            catalog.grid(catalog.GUEST)
+            live = Session.objects.filter(is_active=True, is_started=True).order_by('-id')[:limit]
+            for session in live:
+                leaderboard.board_for(session)
+
+
+PHASES = [('urls', _urls), ('templates', _templates), ('connections', _connections), ('caches', _caches)]
+
+
+def warm_up():
+    """Run every phase; returns ``{phase: milliseconds}``."""
+    timings = {}
+    for name, phase in PHASES:
+        began = time.perf_counter()
+        phase()
+        timings[name] = round((time.perf_counter() - began) * 1000, 1)
+    return timings
+
+
+def serve():
+    """Prepare a process that is about to serve requests (see the module docstring)."""
+    if settings.FLIPIQ_WARMUP:
+        logger.info("Warm-up (ms): %s", warm_up())
+        connections.close_all()  # don't hand connections to forked workers
+    request_started.connect(start_background, dispatch_uid='flipiq-start-background')
+
+
+def start_background(**kwargs):
+    """Start this process's flusher threads, once per process (forked workers included)."""
+    global _background_pid
+    pid = os.getpid()
+    with _lock:
+        if _background_pid == pid:
+            return
+        _background_pid = pid
+    trace.start_flusher()
+    auditorium.start_flusher()
+    analytics.start_flusher()
@@ -0,0 +1,107 @@
+"""
+Compact encoding for the student-side polling and play APIs.
+
+The plain JSON from these endpoints repeats every key for every item (each
+waiting-room participant, each card), which adds up on congested school
+networks. A client that sends ``Accept: application/vnd.flipiq.compact+json``
+gets the same data positionally instead:
+
+* a record is a list of its values in schema order,
+* a list of records is sent column by column, and
+* columns marked ``*`` (a handful of repeated strings, e.g. presence status)
+  are sent as ``[distinct values, index of each row's value]``.
+
+The schemas below are the only key names either side needs; the client
+helper ``static/FlipIQ_APP/js/wire.js`` carries the same ``SCHEMAS`` and
+must be kept in step (the tests compare them). Any other client keeps
+getting plain JSON; error responses are always plain JSON.
+
+``manage.py bench_wire_format`` measures the size and parse-time savings.
+"""
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+COMPACT = 'application/vnd.flipiq.compact+json'
+
+# A field is a name, a name ending in '*' (enum column, only meaningful inside
+# a list of records) or [name, fields] for a list of records sent columnar.
+SCHEMAS = {
+    'answer': ['success', 'is_correct', 'progress', 'total', 'score'],
+    'session_status': ['is_started', 'active'],
+    'roster': [['participants', ['name', 'status*']], 'count'],
+    'cards': [['cards', ['id', 'front', 'back', 'choices']]],
+}
+
+
+def accepts_compact(request):
+    return COMPACT in request.headers.get('Accept', '')
+
+
+def _column(values, enum):
+    if not enum:
+        return values
+    codes, index = {}, []
+    for value in values:
+        index.append(codes.setdefault(value, len(codes)))
+    return [list(codes), index]
+
+
+def encode_rows(fields, rows):
+    """``rows`` (a list of dicts) as one list per field."""
+    columns = []
+    for field in fields:
+        if isinstance(field, list):
+            name, sub = field
+            columns.append([encode_rows(sub, row[name]) for row in rows])
+        else:
+            name = field.rstrip('*')
+            columns.append(_column([row[name] for row in rows], field.endswith('*')))
+    return columns
+
+
+def encode(fields, data):
+    """The dict ``data`` as a list of values in ``fields`` order."""
+    values = []
+    for field in fields:
+        if isinstance(field, list):
+            name, sub = field
+            values.append(encode_rows(sub, data[name]))
+        else:
+            values.append(data[field.rstrip('*')])
+    return values
+
+
+def decode_rows(fields, columns):
+    """Inverse of :func:`encode_rows`."""
+    plain = []
+    for field, column in zip(fields, columns):
+        if isinstance(field, list):
+            plain.append([decode_rows(field[1], value) for value in column])
+        elif field.endswith('*'):
+            distinct, index = column
+            plain.append([distinct[i] for i in index])
+        else:
+            plain.append(column)
+    names = [field[0] if isinstance(field, list) else field.rstrip('*') for field in fields]
+    return [dict(zip(names, row)) for row in zip(*plain)]
+
+
+def decode(fields, values):
+    """Inverse of :func:`encode`."""
+    data = {}
+    for field, value in zip(fields, values):
+        if isinstance(field, list):
+            data[field[0]] = decode_rows(field[1], value)
+        else:
+            data[field.rstrip('*')] = value
+    return data
+
+
+def respond(request, schema, data, **kwargs):
+    """``JsonResponse(data)``, or its compact form when the client asked for it."""
+    if accepts_compact(request):
+        response = JsonResponse(encode(SCHEMAS[schema], data), safe=False, content_type=COMPACT, **kwargs)
+    else:
+        response = JsonResponse(data, **kwargs)
+    patch_vary_headers(response, ['Accept'])
+    return response